@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+
+# Configuração do gunicorn para produção: gunicorn -c gunicorn.conf.py
+
+# Os módulos do backend ficam em src/; o banco continua relativo ao diretório de execução
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# SERVIDOR_MODO=wsgi (Flask em threads) ou asgi (rotas de IA assíncronas sob uvicorn)
+SERVIDOR_MODO = os.getenv('SERVIDOR_MODO', 'wsgi').lower()
+wsgi_app = 'asgi:create_asgi_app()' if SERVIDOR_MODO == 'asgi' else 'main:create_app()'
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+
+# Processos (prefork) x threads: as chamadas à IA passam a maior parte do tempo esperando rede
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4)))
+worker_class = 'uvicorn.workers.UvicornWorker' if SERVIDOR_MODO == 'asgi' else 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Cada worker importa a aplicação depois do fork (SQLite e threads não sobrevivem ao fork)
+preload_app = False
+
+# Workers ociosos por mais que isso são reiniciados; respostas em streaming mantêm o worker ativo
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+# Tempo para terminar as requisições em andamento ao receber SIGTERM
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recicla os workers periodicamente para conter vazamentos de memória
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Limites do cabeçalho da requisição (o corpo é limitado por MAX_CONTENT_LENGTH no Flask)
+limit_request_line = 4094
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+def worker_exit(server, worker):
+    """Grava o que ainda estiver pendente no buffer de progresso antes de o worker sair"""
+    from database import fechar_pools
+    try:
+        import planos
+        if planos.plano_service.buffer_progresso:
+            planos.plano_service.buffer_progresso.flush()
+    except Exception as e:
+        server.log.warning(f"Erro ao gravar progresso pendente: {e}")
+    fechar_pools()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import Headers, MultiDict
+from main import create_app
+
+# Modo ASGI: as rotas de geração por IA rodam como corrotinas (chamadas à IA
+# sem bloquear e SQLite no executor dedicado), de modo que um processo
+# sustenta centenas de gerações simultâneas. As demais rotas, o streaming e
+# os pedidos {"async": true} continuam na aplicação Flask, via WsgiToAsgi.
+#
+#   gunicorn -c gunicorn.conf.py  (com SERVIDOR_MODO=asgi)
+#   uvicorn --factory asgi:create_asgi_app --app-dir src
+
+class _Pedido:
+    """O mínimo de um request do Flask usado por quer_streaming e quer_assincrono"""
+
+    def __init__(self, scope):
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope.get('headers', [])])
+
+def _rotas_assincronas():
+    from planos import gerar_plano_async, gerar_sugestoes_async
+    from jogos import gerar_questoes_lote_async, montar_simulado_async
+    # (handler, token): None = sem autenticação, 'opcional' ou 'obrigatorio',
+    # como requer_autenticacao nas rotas equivalentes do Flask
+    return {
+        ('POST', '/api/planos/gerar'): (gerar_plano_async, 'opcional'),
+        ('POST', '/api/planos/sugestoes'): (gerar_sugestoes_async, 'opcional'),
+        ('POST', '/api/jogos/questoes/gerar'): (gerar_questoes_lote_async, 'opcional'),
+        ('POST', '/api/jogos/simulado'): (montar_simulado_async, 'obrigatorio')
+    }
+
+async def _ler_corpo(receive, limite):
+    """Lê o corpo da requisição; retorna None se passar de `limite` bytes"""
+    partes = []
+    tamanho = 0
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'http.disconnect':
+            return b''
+        corpo = mensagem.get('body', b'')
+        tamanho += len(corpo)
+        if tamanho > limite:
+            return None
+        partes.append(corpo)
+        if not mensagem.get('more_body', False):
+            return b''.join(partes)
+
+async def _usuario(pedido, exigido):
+    """uid do token Bearer (None sem token); levanta PermissionError se faltar um token exigido ou ele for inválido"""
+    from autenticacao import verificar_token
+    cabecalho = pedido.headers.get('Authorization', '')
+    token = cabecalho[7:].strip() if cabecalho.lower().startswith('bearer ') else ''
+    if not token:
+        if exigido:
+            raise PermissionError("Token não fornecido")
+        return None
+    try:
+        # A verificação pode ir à rede (firebase_admin): fora do event loop
+        claims = await asyncio.get_running_loop().run_in_executor(None, verificar_token, token)
+    except Exception as e:
+        raise PermissionError(str(e))
+    return claims.get('uid') or claims.get('sub')
+
+async def _responder_json(send, status, dados):
+    corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(corpo)).encode()),
+            # Mesmo comportamento do CORS(app) do Flask: qualquer origem
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
+
+def create_asgi_app():
+    """Cria a aplicação ASGI que envolve a aplicação Flask de create_app()"""
+    from streaming import quer_streaming
+    from jobs import quer_assincrono
+
+    flask_app = create_app()
+    wsgi = WsgiToAsgi(flask_app)
+    rotas = _rotas_assincronas()
+    limite = flask_app.config['MAX_CONTENT_LENGTH']
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                mensagem = await receive()
+                if mensagem['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif mensagem['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        rota = rotas.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if rota is None:
+            return await wsgi(scope, receive, send)
+        handler, token = rota
+
+        corpo = await _ler_corpo(receive, limite)
+        if corpo is None:
+            return await _responder_json(send, 413, {"error": "Corpo da requisição muito grande"})
+        try:
+            data = json.loads(corpo) if corpo else {}
+        except ValueError:
+            return await _responder_json(send, 400, {"error": "JSON inválido"})
+        if not isinstance(data, dict):
+            return await _responder_json(send, 400, {"error": "Corpo deve ser um objeto JSON"})
+
+        pedido = _Pedido(scope)
+        if quer_streaming(pedido, data) or quer_assincrono(pedido, data):
+            # Repassa ao Flask o corpo já lido
+            entregue = False
+            async def reenviar():
+                nonlocal entregue
+                if entregue:
+                    return await receive()
+                entregue = True
+                return {'type': 'http.request', 'body': corpo, 'more_body': False}
+            return await wsgi(scope, reenviar, send)
+
+        if token is not None:
+            try:
+                data['user_id'] = await _usuario(pedido, token == 'obrigatorio')
+            except PermissionError as e:
+                return await _responder_json(send, 401, {"error": str(e)})
+
+        try:
+            resultado = await handler(data)
+        except Exception as e:
+            return await _responder_json(send, 500, {"error": str(e)})
+        await _responder_json(send, 200, resultado)
+
+    return app
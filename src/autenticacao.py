@@ -0,0 +1,198 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import g, jsonify, request
+from firebase_admin import auth
+from chaves_firebase import RepositorioChaves
+
+# Tokens já verificados ficam em memória até perto do próprio `exp`
+AUTH_CACHE_MAX_ENTRADAS = int(os.getenv('AUTH_CACHE_MAX_ENTRADAS', 10000))
+# Teto de validade no cache: limita por quanto tempo uma revogação passa despercebida
+AUTH_CACHE_TTL_MAX = float(os.getenv('AUTH_CACHE_TTL_MAX', 300))
+# Folga antes do `exp` para não aceitar um token prestes a expirar
+AUTH_CACHE_MARGEM = float(os.getenv('AUTH_CACHE_MARGEM', 30))
+# Verificar a assinatura localmente com as chaves em cache em vez de firebase_admin
+FIREBASE_VERIFICACAO_LOCAL = os.getenv('FIREBASE_VERIFICACAO_LOCAL', 'true').lower() == 'true'
+# uids com acesso às rotas administrativas, além dos que têm a custom claim `admin`
+ADMIN_UIDS = {uid.strip() for uid in os.getenv('ADMIN_UIDS', '').split(',') if uid.strip()}
+
+class CacheTokens:
+    """Cache LRU de ID tokens do Firebase já verificados.
+
+    A chave é o hash do token (o token em si não fica em memória). Cada
+    entrada vale até o menor entre o `exp` do token (menos `margem`) e
+    `ttl_max`. `invalidar_usuario` descarta todas as entradas de um uid,
+    para ser chamado quando as sessões dele forem revogadas; com
+    `revogado_em`, os tokens emitidos antes disso passam a ser recusados
+    por `revogado` mesmo que a assinatura ainda seja válida.
+    """
+
+    def __init__(self, max_entradas=None, ttl_max=None, margem=None):
+        self.max_entradas = max_entradas or AUTH_CACHE_MAX_ENTRADAS
+        self.ttl_max = ttl_max if ttl_max is not None else AUTH_CACHE_TTL_MAX
+        self.margem = margem if margem is not None else AUTH_CACHE_MARGEM
+        self._entradas = OrderedDict()
+        self._por_usuario = {}
+        self._revogados = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def gerar_chave(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        """Retorna as claims do token se ele estiver no cache e válido"""
+        chave = self.gerar_chave(token)
+        agora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] > agora:
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return dict(entrada[1])
+            if entrada is not None:
+                self._remover(chave)
+            self.misses += 1
+            return None
+
+    def set(self, token, claims):
+        """Guarda as claims de um token recém-verificado"""
+        agora = time.time()
+        validade = min(float(claims.get('exp', agora)) - self.margem, agora + self.ttl_max)
+        if validade <= agora:
+            return
+
+        chave = self.gerar_chave(token)
+        uid = claims.get('uid') or claims.get('sub')
+        with self._lock:
+            self._remover(chave)
+            self._entradas[chave] = (validade, dict(claims), uid)
+            self._por_usuario.setdefault(uid, set()).add(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._remover(next(iter(self._entradas)))
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        chaves = self._por_usuario.get(entrada[2])
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._por_usuario[entrada[2]]
+
+    def invalidar_token(self, token):
+        """Descarta um token específico (ex.: logout)"""
+        with self._lock:
+            self._remover(self.gerar_chave(token))
+
+    def invalidar_usuario(self, uid, revogado_em=None):
+        """Descarta todos os tokens de um usuário (ex.: sessões revogadas, conta desativada)"""
+        with self._lock:
+            for chave in list(self._por_usuario.get(uid, ())):
+                self._remover(chave)
+            if revogado_em is not None:
+                self._revogados[uid] = max(revogado_em, self._revogados.get(uid, 0))
+
+    def revogado(self, claims):
+        """Indica se o token foi emitido antes da última revogação das sessões do usuário"""
+        uid = claims.get('uid') or claims.get('sub')
+        with self._lock:
+            limite = self._revogados.get(uid)
+        return limite is not None and float(claims.get('auth_time', claims.get('iat', 0))) < limite
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_usuario.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total * 100) if total > 0 else 0
+            }
+
+cache_tokens = CacheTokens()
+repositorio_chaves = RepositorioChaves()
+
+def verificacao_local():
+    """Indica se os tokens são verificados com as chaves locais (requer FIREBASE_PROJECT_ID)"""
+    return FIREBASE_VERIFICACAO_LOCAL and bool(os.getenv('FIREBASE_PROJECT_ID'))
+
+def iniciar_renovacao_chaves():
+    """Liga a renovação em segundo plano dos certificados usados na verificação local"""
+    if verificacao_local():
+        repositorio_chaves.iniciar()
+
+def verificar_token(token):
+    """Verifica um ID token do Firebase, consultando primeiro o cache de tokens verificados"""
+    claims = cache_tokens.get(token)
+    if claims is None:
+        if verificacao_local():
+            claims = repositorio_chaves.verificar(token, os.getenv('FIREBASE_PROJECT_ID'))
+        else:
+            claims = auth.verify_id_token(token)
+        cache_tokens.set(token, claims)
+
+    if cache_tokens.revogado(claims):
+        cache_tokens.invalidar_token(token)
+        raise ValueError("Sessão revogada")
+    return claims
+
+def revogar_sessoes(uid):
+    """Revoga os refresh tokens do usuário no Firebase e descarta os tokens dele do cache.
+
+    Os ID tokens já emitidos continuam com assinatura válida até o `exp`;
+    este processo passa a recusá-los na hora (os demais, no máximo após
+    `AUTH_CACHE_TTL_MAX`, quando a entrada do cache deles expira).
+    """
+    auth.revoke_refresh_tokens(uid)
+    # auth_time do Firebase tem resolução de segundos
+    cache_tokens.invalidar_usuario(uid, revogado_em=int(time.time()))
+
+def token_da_requisicao():
+    """Extrai o token do header Authorization: Bearer <token>"""
+    cabecalho = request.headers.get('Authorization', '')
+    if cabecalho.lower().startswith('bearer '):
+        return cabecalho[7:].strip() or None
+    return None
+
+def eh_admin(claims):
+    """Indica se o usuário tem a custom claim `admin` ou está em ADMIN_UIDS"""
+    return bool(claims) and (claims.get('admin') is True or (claims.get('uid') or claims.get('sub')) in ADMIN_UIDS)
+
+def requer_autenticacao(funcao=None, opcional=False, admin=False):
+    """Decorator de rota: verifica o token e disponibiliza as claims em `g.usuario`.
+
+    Com `opcional=True` a rota também é atendida sem token (g.usuario = None),
+    mas um token inválido continua sendo recusado. Com `admin=True` só
+    administradores (`eh_admin`) passam; os demais recebem 403.
+    """
+    def decorator(funcao):
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            token = token_da_requisicao()
+            if not token:
+                if opcional:
+                    g.usuario = None
+                    return funcao(*args, **kwargs)
+                return jsonify({"error": "Token não fornecido"}), 401
+            try:
+                g.usuario = verificar_token(token)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 401
+            if admin and not eh_admin(g.usuario):
+                return jsonify({"error": "Acesso restrito a administradores"}), 403
+            return funcao(*args, **kwargs)
+        return wrapper
+
+    return decorator(funcao) if funcao is not None else decorator
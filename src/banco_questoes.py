@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from database import obter_pool
+
+class BancoQuestoes:
+    """Banco persistente de questões pré-geradas.
+
+    Cada linha é uma questão já interpretada, agrupada em "baldes" por
+    (tipo, tema, dificuldade, area). As requisições sorteiam questões ainda
+    não vistas pelo usuário com uma única consulta indexada, e uma thread de
+    reposição mantém cada balde acima de `minimo` questões. Só são repostos
+    os baldes aceitos por `permitido(tipo, tema, dificuldade, area)`, e no
+    máximo `max_pendentes` baldes aguardam reposição ao mesmo tempo.
+    """
+
+    def __init__(self, db_path="planos.db", minimo=None, lote=None, intervalo=None,
+                 permitido=None, max_pendentes=None):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.minimo = minimo if minimo is not None else int(os.getenv('BANCO_QUESTOES_MINIMO', 30))
+        self.lote = lote if lote is not None else int(os.getenv('BANCO_QUESTOES_LOTE', 10))
+        self.intervalo = intervalo if intervalo is not None else float(os.getenv('BANCO_QUESTOES_INTERVALO', 300))
+        self.max_pendentes = max_pendentes if max_pendentes is not None else int(os.getenv('BANCO_QUESTOES_MAX_PENDENTES', 20))
+        self.permitido = permitido or (lambda tipo, tema, dificuldade, area: True)
+        self._pendentes = set()
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._thread = None
+        self.init_database()
+
+    def init_database(self):
+        """Cria as tabelas do banco de questões"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS banco_questoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tipo TEXT NOT NULL,
+                    tema TEXT NOT NULL,
+                    dificuldade TEXT NOT NULL,
+                    area TEXT NOT NULL DEFAULT '',
+                    conteudo TEXT NOT NULL,
+                    hash_conteudo TEXT NOT NULL UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_banco_questoes_balde
+                ON banco_questoes (tipo, tema, dificuldade, area, id)
+            """)
+
+            # Questões já entregues a cada usuário
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS questoes_vistas (
+                    user_id TEXT NOT NULL,
+                    questao_id INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, questao_id)
+                ) WITHOUT ROWID
+            """)
+
+    def adicionar_questoes(self, tipo, tema, dificuldade, questoes, area=''):
+        """Insere questões no balde, ignorando duplicadas. Retorna o id de cada questão, na mesma ordem."""
+        ids = []
+        with self.pool.conexao() as conn:
+            for questao in questoes:
+                conteudo = json.dumps(questao, ensure_ascii=False, sort_keys=True)
+                hash_conteudo = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO banco_questoes (tipo, tema, dificuldade, area, conteudo, hash_conteudo)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (tipo, tema, dificuldade, area, conteudo, hash_conteudo))
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+                else:
+                    row = conn.execute("SELECT id FROM banco_questoes WHERE hash_conteudo = ?", (hash_conteudo,)).fetchone()
+                    ids.append(row[0])
+        return ids
+
+    def sortear_questoes(self, tipo, tema, dificuldade, quantidade, area='', user_id=None):
+        """Retorna `quantidade` questões não vistas pelo usuário, ou None se o balde não tiver o suficiente.
+
+        A leitura começa em um id sorteado do balde e dá a volta até o início,
+        então chamadas sem `user_id` não recebem sempre as mesmas questões.
+        """
+        balde = (tipo, tema, dificuldade, area)
+        with self.pool.conexao() as conn:
+            menor, maior = conn.execute("""
+                SELECT MIN(id), MAX(id) FROM banco_questoes
+                WHERE tipo = ? AND tema = ? AND dificuldade = ? AND area = ?
+            """, balde).fetchone()
+            rows = []
+            if menor is not None:
+                inicio = random.randint(menor, maior)
+                for condicao in ("q.id >= ?", "q.id < ?"):
+                    rows += conn.execute(f"""
+                        SELECT q.id, q.conteudo FROM banco_questoes q
+                        WHERE q.tipo = ? AND q.tema = ? AND q.dificuldade = ? AND q.area = ? AND {condicao}
+                          AND NOT EXISTS (
+                              SELECT 1 FROM questoes_vistas v
+                              WHERE v.user_id = ? AND v.questao_id = q.id
+                          )
+                        ORDER BY q.id
+                        LIMIT ?
+                    """, (*balde, inicio, user_id or '', quantidade - len(rows))).fetchall()
+                    if len(rows) >= quantidade:
+                        break
+
+        if len(rows) < quantidade:
+            self.solicitar_reposicao(tipo, tema, dificuldade, area)
+            return None
+
+        self.marcar_vistas(user_id, [row[0] for row in rows])
+        return [dict(json.loads(row[1]), banco_id=row[0]) for row in rows]
+
+    def obter_questoes(self, questao_ids, conn=None):
+        """Retorna {id: (area, questão)} das questões informadas (sem área, o tema do balde).
+
+        Com `conn`, usa a conexão (e a transação) do chamador em vez de pegar outra do pool.
+        """
+        if not questao_ids:
+            return {}
+        if conn is None:
+            with self.pool.conexao() as conn:
+                return self._ler_questoes(conn, list(set(questao_ids)))
+        return self._ler_questoes(conn, list(set(questao_ids)))
+
+    @staticmethod
+    def _ler_questoes(conn, ids):
+        questoes = {}
+        # Em blocos, abaixo do limite de parâmetros do SQLite
+        for inicio in range(0, len(ids), 500):
+            bloco = ids[inicio:inicio + 500]
+            rows = conn.execute(f"""
+                SELECT id, COALESCE(NULLIF(area, ''), tema), conteudo FROM banco_questoes
+                WHERE id IN ({','.join('?' * len(bloco))})
+            """, bloco).fetchall()
+            for questao_id, area, conteudo in rows:
+                questoes[questao_id] = (area, json.loads(conteudo))
+        return questoes
+
+    def marcar_vistas(self, user_id, questao_ids):
+        """Registra que o usuário já recebeu essas questões"""
+        if not user_id or not questao_ids:
+            return
+
+        with self.pool.conexao() as conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO questoes_vistas (user_id, questao_id) VALUES (?, ?)
+            """, [(user_id, questao_id) for questao_id in questao_ids])
+
+    def contar_questoes(self, tipo, tema, dificuldade, area=''):
+        """Retorna quantas questões existem no balde"""
+        with self.pool.conexao() as conn:
+            return conn.execute("""
+                SELECT COUNT(*) FROM banco_questoes
+                WHERE tipo = ? AND tema = ? AND dificuldade = ? AND area = ?
+            """, (tipo, tema, dificuldade, area)).fetchone()[0]
+
+    def baldes_abaixo_do_minimo(self):
+        """Retorna os baldes permitidos que estão abaixo do mínimo"""
+        with self.pool.conexao() as conn:
+            baldes = set(conn.execute("""
+                SELECT tipo, tema, dificuldade, area FROM banco_questoes
+                GROUP BY tipo, tema, dificuldade, area
+                HAVING COUNT(*) < ?
+            """, (self.minimo,)).fetchall())
+
+        with self._lock:
+            baldes |= self._pendentes
+            self._pendentes = set()
+        return {balde for balde in baldes if self.permitido(*balde)}
+
+    def solicitar_reposicao(self, tipo, tema, dificuldade, area=''):
+        """Marca um balde para ser reabastecido pela thread de reposição.
+
+        Baldes fora de `permitido` são ignorados, assim como novos baldes quando
+        já há `max_pendentes` na fila. Retorna se o balde ficou pendente.
+        """
+        balde = (tipo, tema, dificuldade, area)
+        if not self.permitido(*balde):
+            return False
+        with self._lock:
+            if balde not in self._pendentes and len(self._pendentes) >= self.max_pendentes:
+                return False
+            self._pendentes.add(balde)
+        self._evento.set()
+        return True
+
+    def repor(self, gerador):
+        """Completa os baldes abaixo do mínimo usando `gerador(tipo, tema, dificuldade, area, quantidade)`"""
+        for tipo, tema, dificuldade, area in self.baldes_abaixo_do_minimo():
+            tentativas = 0
+            while self.contar_questoes(tipo, tema, dificuldade, area) < self.minimo and tentativas < 3:
+                tentativas += 1
+                try:
+                    questoes = gerador(tipo, tema, dificuldade, area, self.lote)
+                    self.adicionar_questoes(tipo, tema, dificuldade, questoes, area)
+                except Exception as e:
+                    print(f"Erro ao repor banco de questões ({tipo}/{tema}/{area}): {e}")
+                    break
+
+    def iniciar_reposicao(self, gerador):
+        """Inicia a thread de reposição em segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                self._evento.wait(timeout=self.intervalo)
+                self._evento.clear()
+                self.repor(gerador)
+
+        self._thread = threading.Thread(target=loop, name="reposicao-banco-questoes", daemon=True)
+        self._thread.start()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from database import obter_pool
+
+class CacheQuestoes:
+    """Cache persistente (SQLite) das respostas da IA para geração de questões.
+
+    A chave é o hash do modelo, das mensagens (system + prompt renderizado) e
+    dos parâmetros de amostragem. Entradas expiram após `ttl` segundos e, ao
+    passar de `max_entradas`, as menos usadas recentemente são removidas.
+    """
+
+    def __init__(self, db_path="planos.db", ttl=None, max_entradas=None):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.ttl = ttl if ttl is not None else int(os.getenv('QUESTOES_CACHE_TTL', 7 * 24 * 3600))
+        self.max_entradas = max_entradas if max_entradas is not None else int(os.getenv('QUESTOES_CACHE_MAX_ENTRADAS', 5000))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.init_database()
+
+    def init_database(self):
+        """Cria a tabela do cache se não existir"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_questoes (
+                    chave TEXT PRIMARY KEY,
+                    resposta TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_questoes_last_access
+                ON cache_questoes (last_access)
+            """)
+
+    @staticmethod
+    def gerar_chave(model, messages, **parametros):
+        """Retorna o hash que identifica uma geração"""
+        payload = json.dumps({
+            "model": model,
+            "messages": messages,
+            "parametros": parametros
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, chave):
+        """Retorna a resposta em cache ou None"""
+        agora = time.time()
+        with self.pool.conexao() as conn:
+            row = conn.execute("""
+                SELECT resposta, created_at FROM cache_questoes WHERE chave = ?
+            """, (chave,)).fetchone()
+
+            if row and agora - row[1] <= self.ttl:
+                conn.execute("""
+                    UPDATE cache_questoes SET last_access = ? WHERE chave = ?
+                """, (agora, chave))
+                with self._lock:
+                    self.hits += 1
+                return row[0]
+
+            if row:
+                # Entrada expirada
+                conn.execute("DELETE FROM cache_questoes WHERE chave = ?", (chave,))
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, chave, resposta):
+        """Armazena uma resposta e aplica o limite de tamanho (LRU)"""
+        agora = time.time()
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO cache_questoes (chave, resposta, created_at, last_access)
+                VALUES (?, ?, ?, ?)
+            """, (chave, resposta, agora, agora))
+
+            excedente = conn.execute("SELECT COUNT(*) FROM cache_questoes").fetchone()[0] - self.max_entradas
+            if excedente > 0:
+                conn.execute("""
+                    DELETE FROM cache_questoes WHERE chave IN (
+                        SELECT chave FROM cache_questoes ORDER BY last_access ASC LIMIT ?
+                    )
+                """, (excedente,))
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self.pool.conexao() as conn:
+            conn.execute("DELETE FROM cache_questoes")
+
+    def stats(self):
+        """Retorna contadores de acertos e falhas do cache"""
+        with self.pool.conexao() as conn:
+            entradas = conn.execute("SELECT COUNT(*) FROM cache_questoes").fetchone()[0]
+
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total * 100) if total > 0 else 0,
+                "entradas": entradas,
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl
+            }
@@ -0,0 +1,100 @@
+import sqlite3
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class CacheCatalogo:
+    """Cache em memória (read-through) das respostas JSON do catálogo de planos.
+
+    Guarda o corpo já serializado (bytes) e o ETag de cada plano e de cada
+    página da listagem. As entradas são descartadas quando o catálogo muda:
+    imediatamente nas escritas feitas por este processo (`invalidar`) e, para
+    escritas de outros processos, por uma verificação periódica de
+    `PRAGMA data_version` seguida da leitura da versão do catálogo
+    (mantida por triggers na tabela planos).
+    """
+
+    def __init__(self, db_path, max_entradas=1000, intervalo_verificacao=1.0):
+        self.max_entradas = max_entradas
+        self.intervalo_verificacao = intervalo_verificacao
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.geracao = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Conexão dedicada: data_version só é comparável na mesma conexão
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn_lock = threading.Lock()
+        self._data_version = None
+        self._versao_catalogo = None
+        self._ultima_verificacao = 0.0
+
+    def _verificar_alteracoes(self):
+        agora = time.monotonic()
+        if agora - self._ultima_verificacao < self.intervalo_verificacao:
+            return
+
+        with self._conn_lock:
+            if agora - self._ultima_verificacao < self.intervalo_verificacao:
+                return
+            self._ultima_verificacao = agora
+
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+
+            # O banco mudou; só invalida se a mudança foi no catálogo
+            row = self._conn.execute("SELECT versao FROM catalogo_versao WHERE id = 1").fetchone()
+            versao = row[0] if row else None
+            if versao != self._versao_catalogo:
+                if self._versao_catalogo is not None:
+                    self.invalidar()
+                self._versao_catalogo = versao
+
+    def obter(self, chave, carregar):
+        """Retorna (corpo, etag, extra) da chave, chamando `carregar()` em caso de falta.
+
+        `carregar` deve retornar (corpo_bytes, extra) ou None quando não houver dado.
+        """
+        self._verificar_alteracoes()
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return entrada
+            self.misses += 1
+            geracao = self.geracao
+
+        carregado = carregar()
+        if carregado is None:
+            return None
+        corpo, extra = carregado
+        entrada = (corpo, hashlib.sha1(corpo).hexdigest(), extra)
+
+        with self._lock:
+            # Não guardar o que foi lido enquanto uma escrita invalidava o cache
+            if geracao == self.geracao:
+                self._entradas[chave] = entrada
+                if len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        return entrada
+
+    def invalidar(self):
+        """Descarta todas as entradas (chamado após escritas no catálogo)"""
+        with self._lock:
+            self._entradas.clear()
+            self.geracao += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "geracao": self.geracao
+            }
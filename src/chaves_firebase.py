@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import threading
+import time
+import jwt
+import requests
+from cryptography.x509 import load_pem_x509_certificate
+
+# Certificados públicos que assinam os ID tokens do Firebase
+FIREBASE_CERTS_URL = os.getenv(
+    'FIREBASE_CERTS_URL',
+    'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+)
+FIREBASE_CERTS_ARQUIVO = os.getenv('FIREBASE_CERTS_ARQUIVO', 'firebase_certs.json')
+# Renovar os certificados com essa antecedência (segundos) em relação ao max-age
+FIREBASE_CERTS_ANTECEDENCIA = float(os.getenv('FIREBASE_CERTS_ANTECEDENCIA', 600))
+# Com false, usa apenas o arquivo local (ex.: testes offline com chaves próprias)
+FIREBASE_CERTS_RENOVAR = os.getenv('FIREBASE_CERTS_RENOVAR', 'true').lower() == 'true'
+# Tolerância de relógio na validação de exp/iat
+FIREBASE_TOKEN_TOLERANCIA = int(os.getenv('FIREBASE_TOKEN_TOLERANCIA', 60))
+
+class TokenInvalido(ValueError):
+    """O ID token não passou na verificação"""
+
+class RepositorioChaves:
+    """Chaves públicas do Firebase mantidas localmente para verificar ID tokens.
+
+    Os certificados são lidos do arquivo em disco na inicialização e
+    convertidos uma única vez em objetos de chave pública. Uma thread os
+    renova antes do vencimento indicado pelo `max-age` do Google e grava o
+    resultado no arquivo, então a verificação de um token nunca espera pela
+    rede (exceto quando aparece um `kid` desconhecido, após uma rotação).
+    """
+
+    def __init__(self, url=None, arquivo=None, antecedencia=None, renovar=None):
+        self.url = url or FIREBASE_CERTS_URL
+        self.arquivo = arquivo or FIREBASE_CERTS_ARQUIVO
+        self.antecedencia = antecedencia if antecedencia is not None else FIREBASE_CERTS_ANTECEDENCIA
+        self.renovar = renovar if renovar is not None else FIREBASE_CERTS_RENOVAR
+        self._chaves = {}
+        self.expira_em = 0.0
+        self._lock = threading.Lock()
+        self._ultima_busca = 0.0
+        self._evento = threading.Event()
+        self._thread = None
+        self.carregar_arquivo()
+
+    @staticmethod
+    def _converter(certificados):
+        """Converte {kid: certificado PEM} em {kid: chave pública}"""
+        return {
+            kid: load_pem_x509_certificate(pem.encode('utf-8')).public_key()
+            for kid, pem in certificados.items()
+        }
+
+    def _instalar(self, certificados, expira_em):
+        chaves = self._converter(certificados)
+        with self._lock:
+            self._chaves = chaves
+            self.expira_em = expira_em
+
+    def carregar_arquivo(self):
+        """Lê os certificados gravados em disco; retorna False se não houver arquivo válido"""
+        try:
+            with open(self.arquivo, encoding='utf-8') as f:
+                dados = json.load(f)
+            self._instalar(dados['certificados'], float(dados.get('expira_em', 0)))
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Erro ao ler certificados do Firebase em {self.arquivo}: {e}")
+            return False
+
+    def atualizar(self):
+        """Busca os certificados no Google, instala e grava em disco"""
+        self._ultima_busca = time.monotonic()
+        resposta = requests.get(self.url, timeout=10)
+        resposta.raise_for_status()
+        certificados = resposta.json()
+
+        max_age = re.search(r'max-age=(\d+)', resposta.headers.get('Cache-Control', ''))
+        expira_em = time.time() + (int(max_age.group(1)) if max_age else 3600)
+        self._instalar(certificados, expira_em)
+
+        # Grava de forma atômica para outros workers/reinícios
+        temporario = f"{self.arquivo}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"expira_em": expira_em, "certificados": certificados}, f)
+        os.replace(temporario, self.arquivo)
+
+    def iniciar(self):
+        """Liga a thread de renovação em segundo plano (idempotente)"""
+        if not self.renovar:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="chaves-firebase", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            espera = self.expira_em - self.antecedencia - time.time()
+            if espera <= 0:
+                try:
+                    self.atualizar()
+                    continue
+                except Exception as e:
+                    print(f"Erro ao renovar certificados do Firebase: {e}")
+                    espera = 60
+            self._evento.wait(timeout=espera)
+            self._evento.clear()
+
+    def chave(self, kid):
+        """Retorna a chave pública do `kid`, buscando novos certificados se ele for desconhecido"""
+        with self._lock:
+            chave = self._chaves.get(kid)
+        if chave is not None or not self.renovar:
+            return chave
+
+        # Rotação de chaves: no máximo uma busca por minuto
+        if time.monotonic() - self._ultima_busca >= 60:
+            try:
+                self.atualizar()
+            except Exception as e:
+                print(f"Erro ao buscar certificados do Firebase: {e}")
+        with self._lock:
+            return self._chaves.get(kid)
+
+    def verificar(self, token, project_id):
+        """Verifica localmente um ID token do Firebase e retorna as claims (com `uid`)"""
+        try:
+            cabecalho = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenInvalido(f"Token malformado: {e}")
+        if cabecalho.get('alg') != 'RS256':
+            raise TokenInvalido("Algoritmo do token não suportado")
+
+        chave = self.chave(cabecalho.get('kid'))
+        if chave is None:
+            raise TokenInvalido("Token assinado por chave desconhecida")
+
+        try:
+            claims = jwt.decode(
+                token,
+                chave,
+                algorithms=['RS256'],
+                audience=project_id,
+                issuer=f"https://securetoken.google.com/{project_id}",
+                leeway=FIREBASE_TOKEN_TOLERANCIA,
+                options={"require": ["exp", "iat", "sub"]}
+            )
+        except jwt.PyJWTError as e:
+            raise TokenInvalido(f"Token inválido: {e}")
+
+        if not isinstance(claims['sub'], str) or not claims['sub'] or len(claims['sub']) > 128:
+            raise TokenInvalido("Token com 'sub' inválido")
+        if claims.get('auth_time', 0) > time.time() + FIREBASE_TOKEN_TOLERANCIA:
+            raise TokenInvalido("Token com 'auth_time' no futuro")
+
+        claims['uid'] = claims['sub']
+        return claims
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chaves": len(self._chaves),
+                "expira_em": self.expira_em
+            }
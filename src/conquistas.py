@@ -0,0 +1,218 @@
+from datetime import date, datetime, timezone
+
+# Conquistas disponíveis. `regra` define o contador observado e o alvo:
+#   ("atividades", tipo, n)                  n atividades do tipo concluídas
+#   ("acertos_seguidos", n)                  n acertos seguidos
+#   ("dias_seguidos", n)                     n dias consecutivos com respostas
+#   ("precisao_area", area, fracao, minimo)  fração de acertos na área, com ao menos `minimo` respostas
+CONQUISTAS = [
+    {
+        "id": 1,
+        "nome": "Primeiro Passo",
+        "descricao": "Complete seu primeiro simulado",
+        "icone": "🎯",
+        "xp_reward": 50,
+        "regra": ("atividades", "simulado", 1)
+    },
+    {
+        "id": 2,
+        "nome": "Sequência de Ouro",
+        "descricao": "Acerte 10 questões seguidas",
+        "icone": "🏆",
+        "xp_reward": 100,
+        "regra": ("acertos_seguidos", 10)
+    },
+    {
+        "id": 3,
+        "nome": "Maratonista",
+        "descricao": "Estude por 7 dias consecutivos",
+        "icone": "🏃‍♂️",
+        "xp_reward": 200,
+        "regra": ("dias_seguidos", 7)
+    },
+    {
+        "id": 4,
+        "nome": "Expert em SUS",
+        "descricao": "Acerte 90% das questões sobre SUS",
+        "icone": "🏥",
+        "xp_reward": 150,
+        "regra": ("precisao_area", "SUS", 0.9, 20)
+    }
+]
+
+def normalizar_area(area):
+    return ' '.join(str(area or 'Geral').split()).casefold()
+
+def dia_do_evento(resposta, hoje):
+    """Dia (YYYY-MM-DD) em que a resposta foi dada; `respondida_em` aceita ISO 8601 ou epoch.
+
+    Levanta ValueError se `respondida_em` não for uma data válida.
+    """
+    momento = resposta.get('respondida_em')
+    if momento is None:
+        return hoje
+    try:
+        if isinstance(momento, (int, float)) and not isinstance(momento, bool):
+            return datetime.fromtimestamp(momento, timezone.utc).strftime('%Y-%m-%d')
+        return date.fromisoformat(str(momento)[:10]).isoformat()
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f"respondida_em inválido: {momento!r}")
+
+class MotorConquistas:
+    """Avalia as conquistas incrementalmente a partir das respostas.
+
+    Cada resposta atualiza em O(1) os contadores do jogador (acertos
+    seguidos, dias consecutivos, acertos/total por área) e só as regras
+    ligadas ao contador alterado são verificadas. Os contadores ficam no
+    estado persistido do jogador, então nada do histórico é relido.
+    """
+
+    def __init__(self, conquistas=CONQUISTAS):
+        self.conquistas = {c['id']: c for c in conquistas}
+        # Regras indexadas pelo gatilho que pode satisfazê-las
+        self._por_gatilho = {}
+        for conquista in conquistas:
+            regra = conquista['regra']
+            if regra[0] == 'precisao_area':
+                gatilho = ('area', normalizar_area(regra[1]))
+            elif regra[0] == 'atividades':
+                gatilho = ('atividade', regra[1])
+            else:
+                gatilho = (regra[0],)
+            self._por_gatilho.setdefault(gatilho, []).append(conquista)
+
+    def _satisfeita(self, regra, estado):
+        contadores = estado['contadores']
+        if regra[0] == 'acertos_seguidos':
+            return contadores.get('acertos_seguidos', 0) >= regra[1]
+        if regra[0] == 'dias_seguidos':
+            return estado['streak'] >= regra[1]
+        if regra[0] == 'atividades':
+            return contadores.get('atividades', {}).get(regra[1], 0) >= regra[2]
+        if regra[0] == 'precisao_area':
+            acertos, total = contadores.get('areas', {}).get(normalizar_area(regra[1]), (0, 0))
+            return total >= regra[3] and acertos / total >= regra[2]
+        return False
+
+    def _verificar(self, gatilho, estado, desbloqueadas):
+        for conquista in self._por_gatilho.get(gatilho, ()):
+            if conquista['id'] in estado['achievements']:
+                continue
+            if self._satisfeita(conquista['regra'], estado):
+                estado['achievements'].append(conquista['id'])
+                estado['xp'] += conquista['xp_reward']
+                desbloqueadas.append(conquista)
+
+    def _registrar_dia(self, estado, dia, desbloqueadas):
+        ultimo = estado['ultima_atividade']
+        if ultimo == dia:
+            return
+        if ultimo is not None and dia < ultimo:
+            # Resposta antiga fora de ordem: não altera a sequência atual
+            return
+        consecutivo = ultimo is not None and date.fromisoformat(dia).toordinal() - date.fromisoformat(ultimo).toordinal() == 1
+        estado['streak'] = estado['streak'] + 1 if consecutivo else 1
+        estado['ultima_atividade'] = dia
+        contadores = estado['contadores']
+        contadores['max_dias_seguidos'] = max(contadores.get('max_dias_seguidos', 0), estado['streak'])
+        self._verificar(('dias_seguidos',), estado, desbloqueadas)
+
+    def processar(self, estado, respostas, tipo_atividade=None, hoje=None, datas_do_cliente=False):
+        """Aplica as respostas de uma atividade ao estado e retorna as conquistas desbloqueadas.
+
+        Altera `estado` no lugar (contadores, streak, achievements e xp das recompensas).
+        Por padrão todas as respostas contam no dia `hoje` do servidor; só o
+        backfill (`datas_do_cliente=True`) usa o `respondida_em` de cada uma,
+        senão uma única requisição com datas inventadas completaria a sequência de dias.
+        """
+        hoje = hoje or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        contadores = estado.setdefault('contadores', {})
+        areas = contadores.setdefault('areas', {})
+        desbloqueadas = []
+        if not respostas:
+            # Atividade sem respostas ainda conta como dia de estudo
+            self._registrar_dia(estado, hoje, desbloqueadas)
+
+        for resposta in respostas:
+            correta = bool(resposta.get('correta', False))
+            self._registrar_dia(estado, dia_do_evento(resposta, hoje) if datas_do_cliente else hoje, desbloqueadas)
+
+            seguidos = contadores.get('acertos_seguidos', 0) + 1 if correta else 0
+            contadores['acertos_seguidos'] = seguidos
+            contadores['max_acertos_seguidos'] = max(contadores.get('max_acertos_seguidos', 0), seguidos)
+            if correta:
+                self._verificar(('acertos_seguidos',), estado, desbloqueadas)
+
+            area = normalizar_area(resposta.get('area'))
+            acertos, total = areas.get(area, (0, 0))
+            areas[area] = [acertos + correta, total + 1]
+            self._verificar(('area', area), estado, desbloqueadas)
+
+        if tipo_atividade:
+            atividades = contadores.setdefault('atividades', {})
+            atividades[tipo_atividade] = atividades.get(tipo_atividade, 0) + 1
+            self._verificar(('atividade', tipo_atividade), estado, desbloqueadas)
+
+        return desbloqueadas
+
+    def reprocessar(self, estado, atividades, hoje=None):
+        """Reaplica um histórico de atividades (backfill) em ordem cronológica.
+
+        `atividades` é uma lista de {"tipo": ..., "respostas": [...]}, com
+        `respondida_em` em cada resposta (ValueError se alguma data for
+        inválida ou estiver depois de `hoje`). Tudo é aplicado em memória; o
+        chamador grava o estado uma única vez. Não é idempotente: o mesmo
+        histórico reaplicado soma os contadores de novo.
+        """
+        hoje = hoje or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+        def dia(resposta):
+            valor = dia_do_evento(resposta, hoje)
+            if valor > hoje:
+                raise ValueError(f"respondida_em no futuro: {resposta.get('respondida_em')!r}")
+            return valor
+
+        def inicio(atividade):
+            respostas = atividade.get('respostas') or [{}]
+            return dia(respostas[0])
+
+        desbloqueadas = []
+        for atividade in sorted(atividades, key=inicio):
+            respostas = sorted(atividade.get('respostas', []), key=dia)
+            desbloqueadas.extend(self.processar(estado, respostas, atividade.get('tipo'), hoje, datas_do_cliente=True))
+        return desbloqueadas
+
+    def progresso(self, conquista, estado):
+        """Fração (0 a 1) do caminho até a conquista"""
+        if conquista['id'] in estado['achievements']:
+            return 1.0
+        regra = conquista['regra']
+        contadores = estado.get('contadores', {})
+        if regra[0] == 'acertos_seguidos':
+            return min(1.0, contadores.get('acertos_seguidos', 0) / regra[1])
+        if regra[0] == 'dias_seguidos':
+            return min(1.0, estado['streak'] / regra[1])
+        if regra[0] == 'atividades':
+            return min(1.0, contadores.get('atividades', {}).get(regra[1], 0) / regra[2])
+        if regra[0] == 'precisao_area':
+            acertos, total = contadores.get('areas', {}).get(normalizar_area(regra[1]), (0, 0))
+            if total == 0:
+                return 0.0
+            return min(1.0, min(total / regra[3], (acertos / total) / regra[2]))
+        return 0.0
+
+    @staticmethod
+    def listar_itens(conquistas):
+        """Conquistas no formato da API, sem a regra interna"""
+        return [{chave: valor for chave, valor in c.items() if chave != 'regra'} for c in conquistas]
+
+    def listar(self, estado=None):
+        """Conquistas no formato da API, com `desbloqueada` e `progresso` do jogador"""
+        lista = []
+        for conquista in self.conquistas.values():
+            item = self.listar_itens([conquista])[0]
+            item['desbloqueada'] = bool(estado) and conquista['id'] in estado['achievements']
+            if estado:
+                item['progresso'] = round(self.progresso(conquista, estado), 3)
+            lista.append(item)
+        return lista
@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import sqlite3
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Pool de conexões SQLite compartilhado pelos serviços
+
+DB_POOL_TAMANHO = int(os.getenv('DB_POOL_TAMANHO', 8))
+DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', 5000))  # ms
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 20000))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024))
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', 4))
+
+class PoolConexoes:
+    """Pool limitado de conexões SQLite reaproveitadas entre requisições.
+
+    Cada conexão é configurada uma única vez (WAL, synchronous=NORMAL, cache e
+    mmap) e mantém seu cache de statements preparados entre os usos. Uma
+    conexão é usada por uma thread de cada vez.
+    """
+
+    def __init__(self, db_path, tamanho=None):
+        self.db_path = db_path
+        self.tamanho = tamanho or DB_POOL_TAMANHO
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+    def _nova_conexao(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT / 1000,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        # WAL: leitores não bloqueiam escritores e vice-versa
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _obter(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._criadas < self.tamanho:
+                self._criadas += 1
+                criar = True
+            else:
+                criar = False
+
+        if criar:
+            try:
+                return self._nova_conexao()
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                raise
+        try:
+            return self._livres.get(timeout=DB_BUSY_TIMEOUT / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Nenhuma conexão disponível no pool")
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão; faz commit ao final ou rollback em caso de erro"""
+        conn = self._obter()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._livres.put(conn)
+
+    def fechar(self):
+        """Fecha as conexões livres (ex.: antes de um fork)"""
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._criadas -= 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def obter_pool(db_path):
+    """Retorna o pool compartilhado para o arquivo de banco informado"""
+    caminho = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(caminho)
+        if pool is None:
+            pool = _pools[caminho] = PoolConexoes(db_path)
+        return pool
+
+def fechar_pools():
+    """Fecha todos os pools abertos neste processo"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.fechar()
+        _pools.clear()
+
+# Threads dedicadas ao SQLite no modo ASGI, para não bloquear o event loop
+_executor_db = None
+_executor_db_lock = threading.Lock()
+
+async def executar_db(funcao, *args, **kwargs):
+    """Executa uma função que usa o SQLite no executor dedicado e aguarda o resultado"""
+    global _executor_db
+    if _executor_db is None:
+        with _executor_db_lock:
+            if _executor_db is None:
+                _executor_db = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="sqlite")
+    return await asyncio.get_running_loop().run_in_executor(_executor_db, functools.partial(funcao, *args, **kwargs))
+
+def aplicar_migracoes(pool, migracoes):
+    """Aplica, em ordem, as migrações ainda não registradas no banco.
+
+    `migracoes` é uma lista de (nome, migracao), onde migracao é um comando SQL,
+    uma lista de comandos ou uma função que recebe a conexão. Cada migração
+    roda em sua própria transação (BEGIN IMMEDIATE), então processos
+    iniciando juntos não aplicam a mesma migração duas vezes.
+    """
+    with pool.conexao() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migracoes (
+                nome TEXT PRIMARY KEY,
+                aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    for nome, migracao in migracoes:
+        with pool.conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM schema_migracoes WHERE nome = ?", (nome,)).fetchone():
+                continue
+
+            if callable(migracao):
+                migracao(conn)
+            else:
+                for comando in ([migracao] if isinstance(migracao, str) else migracao):
+                    conn.execute(comando)
+
+            conn.execute("INSERT INTO schema_migracoes (nome) VALUES (?)", (nome,))
@@ -0,0 +1,274 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from database import obter_pool
+
+# Estados de um job
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+CANCELADO = 'cancelado'
+ESTADOS_FINAIS = (CONCLUIDO, ERRO, CANCELADO)
+
+class LimiteJobsExcedido(Exception):
+    """O usuário já tem o máximo de jobs ativos permitido"""
+
+class FilaJobs:
+    """Fila persistente (SQLite) de jobs de geração por IA.
+
+    As rotas enfileiram o trabalho e respondem na hora com o id do job; um
+    despachante reserva os jobs pendentes por prioridade e os executa em um
+    pool limitado de threads, respeitando o limite de jobs simultâneos por
+    usuário. Jobs cujo prazo (`timeout`) expira enquanto executam, por
+    exemplo porque o processo reiniciou, voltam para a fila até
+    `max_tentativas` vezes.
+    """
+
+    def __init__(self, db_path="planos.db", max_workers=None, limite_por_usuario=None,
+                 executando_por_usuario=None, timeout=None, max_tentativas=None, retencao=None):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.max_workers = max_workers or int(os.getenv('JOBS_MAX_WORKERS', 2))
+        self.limite_por_usuario = limite_por_usuario or int(os.getenv('JOBS_MAX_POR_USUARIO', 5))
+        self.executando_por_usuario = executando_por_usuario or int(os.getenv('JOBS_EXECUTANDO_POR_USUARIO', 1))
+        self.timeout = timeout or float(os.getenv('JOBS_TIMEOUT', 600))
+        self.max_tentativas = max_tentativas or int(os.getenv('JOBS_MAX_TENTATIVAS', 2))
+        self.retencao = retencao or float(os.getenv('JOBS_RETENCAO', 24 * 3600))
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._concluidos = threading.Condition()
+        self._slots = threading.Semaphore(self.max_workers)
+        self._executor = None
+        self._thread = None
+        self._ultima_limpeza = 0.0
+        self.executados = 0
+        self.falhas = 0
+        self.init_database()
+
+    def init_database(self):
+        """Cria a tabela de jobs"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    user_id TEXT,
+                    prioridade INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    parametros TEXT NOT NULL,
+                    resultado TEXT,
+                    erro TEXT,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    prazo REAL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_fila
+                ON jobs (status, prioridade DESC, created_at)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_usuario
+                ON jobs (user_id, status)
+            """)
+
+    def registrar(self, tipo, funcao, prioridade=0):
+        """Associa um tipo de job à função que o executa: funcao(parametros) -> dict"""
+        self._handlers[tipo] = (funcao, prioridade)
+
+    def prioridade_padrao(self, tipo):
+        """Prioridade com que o tipo é enfileirado quando nenhuma é informada"""
+        if tipo not in self._handlers:
+            raise ValueError(f"Tipo de job desconhecido: {tipo}")
+        return self._handlers[tipo][1]
+
+    def iniciar(self):
+        """Liga o despachante (idempotente)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._thread = threading.Thread(target=self._loop, name="fila-jobs", daemon=True)
+            self._thread.start()
+
+    def enfileirar(self, tipo, parametros, user_id=None, prioridade=None):
+        """Grava um job pendente e retorna o seu id"""
+        if prioridade is None:
+            prioridade = self.prioridade_padrao(tipo)
+        elif tipo not in self._handlers:
+            raise ValueError(f"Tipo de job desconhecido: {tipo}")
+
+        job_id = uuid.uuid4().hex
+        with self.pool.conexao() as conn:
+            if user_id is not None:
+                ativos = conn.execute("""
+                    SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)
+                """, (str(user_id), PENDENTE, EXECUTANDO)).fetchone()[0]
+                if ativos >= self.limite_por_usuario:
+                    raise LimiteJobsExcedido(f"Limite de {self.limite_por_usuario} jobs ativos por usuário atingido")
+
+            conn.execute("""
+                INSERT INTO jobs (id, tipo, user_id, prioridade, status, parametros, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                job_id, tipo, str(user_id) if user_id is not None else None, int(prioridade),
+                PENDENTE, json.dumps(parametros, ensure_ascii=False), time.time()
+            ))
+
+        self.iniciar()
+        self._evento.set()
+        return job_id
+
+    def obter(self, job_id):
+        """Retorna o estado de um job (com resultado quando concluído) ou None"""
+        with self.pool.conexao() as conn:
+            row = conn.execute("""
+                SELECT id, tipo, user_id, prioridade, status, resultado, erro, tentativas,
+                       created_at, started_at, finished_at
+                FROM jobs WHERE id = ?
+            """, (job_id,)).fetchone()
+            if not row:
+                return None
+
+            job = {
+                "id": row[0],
+                "tipo": row[1],
+                "user_id": row[2],
+                "prioridade": row[3],
+                "status": row[4],
+                "resultado": json.loads(row[5]) if row[5] else None,
+                "erro": row[6],
+                "tentativas": row[7],
+                "created_at": row[8],
+                "started_at": row[9],
+                "finished_at": row[10]
+            }
+            if job['status'] == PENDENTE:
+                # Quantos jobs serão reservados antes deste
+                job['posicao'] = conn.execute("""
+                    SELECT COUNT(*) FROM jobs
+                    WHERE status = ? AND (prioridade > ? OR (prioridade = ? AND created_at < ?))
+                """, (PENDENTE, row[3], row[3], row[8])).fetchone()[0]
+        return job
+
+    def aguardar(self, job_id, timeout):
+        """Bloqueia até o job mudar de estado neste processo ou `timeout` segundos passarem"""
+        with self._concluidos:
+            self._concluidos.wait(timeout=timeout)
+
+    def cancelar(self, job_id):
+        """Cancela um job que ainda não começou. Retorna True se cancelou."""
+        with self.pool.conexao() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?
+            """, (CANCELADO, time.time(), job_id, PENDENTE))
+        return cursor.rowcount > 0
+
+    def _reservar(self):
+        """Marca como executando o próximo job elegível e o retorna"""
+        agora = time.time()
+        with self.pool.conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            # Jobs cujo prazo expirou (processo reiniciado ou travado)
+            conn.execute("""
+                UPDATE jobs SET status = CASE WHEN tentativas >= ? THEN ? ELSE ? END,
+                                erro = CASE WHEN tentativas >= ? THEN 'Prazo de execução excedido' ELSE erro END,
+                                finished_at = CASE WHEN tentativas >= ? THEN ? ELSE finished_at END
+                WHERE status = ? AND prazo < ?
+            """, (self.max_tentativas, ERRO, PENDENTE, self.max_tentativas, self.max_tentativas, agora, EXECUTANDO, agora))
+
+            row = conn.execute("""
+                SELECT id, tipo, parametros FROM jobs j
+                WHERE status = ?
+                  AND (user_id IS NULL OR (
+                      SELECT COUNT(*) FROM jobs e WHERE e.user_id = j.user_id AND e.status = ?
+                  ) < ?)
+                ORDER BY prioridade DESC, created_at
+                LIMIT 1
+            """, (PENDENTE, EXECUTANDO, self.executando_por_usuario)).fetchone()
+            if not row:
+                return None
+
+            conn.execute("""
+                UPDATE jobs SET status = ?, started_at = ?, prazo = ?, tentativas = tentativas + 1
+                WHERE id = ?
+            """, (EXECUTANDO, agora, agora + self.timeout, row[0]))
+        return row[0], row[1], json.loads(row[2])
+
+    def _executar(self, job_id, tipo, parametros):
+        try:
+            handler = self._handlers.get(tipo)
+            if handler is None:
+                raise ValueError(f"Tipo de job desconhecido: {tipo}")
+            resultado = handler[0](parametros)
+            status, resultado, erro = CONCLUIDO, json.dumps(resultado, ensure_ascii=False), None
+            self.executados += 1
+        except Exception as e:
+            status, resultado, erro = ERRO, None, str(e)
+            self.falhas += 1
+
+        try:
+            with self.pool.conexao() as conn:
+                conn.execute("""
+                    UPDATE jobs SET status = ?, resultado = ?, erro = ?, finished_at = ?
+                    WHERE id = ? AND status = ?
+                """, (status, resultado, erro, time.time(), job_id, EXECUTANDO))
+        except Exception as e:
+            print(f"Erro ao gravar resultado do job {job_id}: {e}")
+        finally:
+            self._slots.release()
+            # Libera o despachante (o usuário pode ter outro job na fila) e quem aguarda
+            self._evento.set()
+            with self._concluidos:
+                self._concluidos.notify_all()
+
+    def _limpar(self):
+        """Remove jobs finalizados há mais de `retencao` segundos"""
+        agora = time.time()
+        if agora - self._ultima_limpeza < 60:
+            return
+        self._ultima_limpeza = agora
+        with self.pool.conexao() as conn:
+            conn.execute(f"""
+                DELETE FROM jobs WHERE status IN ({', '.join('?' * len(ESTADOS_FINAIS))}) AND finished_at < ?
+            """, (*ESTADOS_FINAIS, agora - self.retencao))
+
+    def _loop(self):
+        while True:
+            self._slots.acquire()
+            try:
+                job = self._reservar()
+            except Exception as e:
+                print(f"Erro ao reservar job: {e}")
+                job = None
+
+            if job is None:
+                self._slots.release()
+                try:
+                    self._limpar()
+                except Exception as e:
+                    print(f"Erro ao limpar jobs antigos: {e}")
+                self._evento.wait(timeout=5)
+                self._evento.clear()
+                continue
+
+            self._executor.submit(self._executar, *job)
+
+    def stats(self):
+        """Retorna a contagem de jobs por estado e os contadores do processo"""
+        with self.pool.conexao() as conn:
+            por_status = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "por_status": por_status,
+            "max_workers": self.max_workers,
+            "executados": self.executados,
+            "falhas": self.falhas
+        }
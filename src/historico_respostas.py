@@ -0,0 +1,257 @@
+import threading
+import time
+from datetime import date, datetime, timezone
+from database import obter_pool
+
+DIA = 86400
+PERIODOS = {'dia': 'd', 'semana': 's'}
+# Período que acumula o histórico inteiro (inicio sempre 0)
+TOTAL = 't'
+
+def instante(valor, padrao):
+    """Converte `respondida_em` (epoch ou ISO 8601) em epoch inteiro"""
+    if valor is None:
+        return padrao
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    momento = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    return int(momento.timestamp())
+
+def inicio_periodo(dia, periodo):
+    """Primeiro dia (em dias desde 1970-01-01) do dia ou da semana (segunda-feira) de `dia`"""
+    if periodo == 's':
+        # 1970-01-01 foi uma quinta-feira
+        return dia - (dia + 3) % 7
+    return dia
+
+def dia_iso(dia):
+    return date.fromordinal(date(1970, 1, 1).toordinal() + dia).isoformat()
+
+class HistoricoRespostas:
+    """Histórico de respostas dos usuários, com agregados por dia, semana e área.
+
+    `respostas_log` é só de inserção e guarda cada resposta em colunas
+    inteiras (usuário e área viram ids de dicionário). Na mesma transação
+    são somados os agregados de `respostas_agregados` (dia, semana e total,
+    por usuário e área); as consultas de desempenho leem só os agregados,
+    então o custo não cresce com o tamanho do histórico.
+    """
+
+    def __init__(self, db_path="planos.db"):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self._usuarios = {}
+        self._areas = {}
+        self._nomes_areas = {}
+        self._lock = threading.Lock()
+        self.registradas = 0
+        self.init_database()
+
+    def init_database(self):
+        """Cria as tabelas do histórico"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS historico_usuarios (
+                    id INTEGER PRIMARY KEY,
+                    user_id TEXT NOT NULL UNIQUE
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS historico_areas (
+                    id INTEGER PRIMARY KEY,
+                    chave TEXT NOT NULL UNIQUE,
+                    nome TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respostas_log (
+                    id INTEGER PRIMARY KEY,
+                    usuario INTEGER NOT NULL,
+                    area INTEGER NOT NULL,
+                    questao_id TEXT,
+                    correta INTEGER NOT NULL,
+                    tempo INTEGER,
+                    respondida_em INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_respostas_log_usuario
+                ON respostas_log (usuario, id)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respostas_agregados (
+                    usuario INTEGER NOT NULL,
+                    periodo TEXT NOT NULL,
+                    inicio INTEGER NOT NULL,
+                    area INTEGER NOT NULL,
+                    respostas INTEGER NOT NULL,
+                    acertos INTEGER NOT NULL,
+                    tempo_total INTEGER NOT NULL,
+                    PRIMARY KEY (usuario, periodo, inicio, area)
+                ) WITHOUT ROWID
+            """)
+
+    # Os ids de dicionário são criados em transações próprias, antes da gravação
+    # das respostas, para que um rollback nunca deixe no cache um id inexistente.
+
+    def _id_usuario(self, user_id, criar=True):
+        """Id de dicionário do usuário (None se ele não existir e `criar` for False)"""
+        with self._lock:
+            existente = self._usuarios.get(user_id)
+        if existente is not None:
+            return existente
+        with self.pool.conexao() as conn:
+            if criar:
+                conn.execute("INSERT OR IGNORE INTO historico_usuarios (user_id) VALUES (?)", (user_id,))
+            row = conn.execute("SELECT id FROM historico_usuarios WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._usuarios[user_id] = row[0]
+        return row[0]
+
+    def _id_area(self, nome):
+        """Id de dicionário da área (sem diferenciar maiúsculas), criando a entrada se preciso"""
+        chave = nome.casefold()
+        with self._lock:
+            existente = self._areas.get(chave)
+        if existente is not None:
+            return existente
+        with self.pool.conexao() as conn:
+            conn.execute("INSERT OR IGNORE INTO historico_areas (chave, nome) VALUES (?, ?)", (chave, nome))
+            area_id, nome = conn.execute("SELECT id, nome FROM historico_areas WHERE chave = ?", (chave,)).fetchone()
+        with self._lock:
+            self._areas[chave] = area_id
+            self._nomes_areas[area_id] = nome
+        return area_id
+
+    def _nome_area(self, conn, area_id):
+        with self._lock:
+            nome = self._nomes_areas.get(area_id)
+        if nome is None:
+            nome = conn.execute("SELECT nome FROM historico_areas WHERE id = ?", (area_id,)).fetchone()[0]
+            with self._lock:
+                self._nomes_areas[area_id] = nome
+        return nome
+
+    def registrar(self, user_id, respostas, tempo_gasto=None):
+        """Grava as respostas de uma atividade e atualiza os agregados, em uma transação.
+
+        Cada resposta pode trazer "questao_id" (ou "id"), "area", "correta",
+        "tempo" (segundos) e "respondida_em"; sem "tempo", `tempo_gasto` é
+        dividido igualmente entre as respostas.
+        """
+        if not respostas:
+            return 0
+        agora = int(time.time())
+        tempo_padrao = int(tempo_gasto / len(respostas)) if tempo_gasto else None
+
+        usuario = self._id_usuario(str(user_id))
+        linhas = []
+        agregados = {}
+        for resposta in respostas:
+            area = self._id_area(' '.join(str(resposta.get('area') or 'Geral').split()))
+            correta = 1 if resposta.get('correta', False) else 0
+            tempo = resposta.get('tempo', tempo_padrao)
+            tempo = int(tempo) if tempo is not None else None
+            momento = instante(resposta.get('respondida_em'), agora)
+            questao_id = resposta.get('questao_id', resposta.get('id'))
+            linhas.append((usuario, area, str(questao_id) if questao_id is not None else None, correta, tempo, momento))
+
+            dia = momento // DIA
+            for periodo, inicio in (('d', dia), ('s', inicio_periodo(dia, 's')), (TOTAL, 0)):
+                soma = agregados.setdefault((periodo, inicio, area), [0, 0, 0])
+                soma[0] += 1
+                soma[1] += correta
+                soma[2] += tempo or 0
+
+        with self.pool.conexao() as conn:
+            conn.executemany("""
+                INSERT INTO respostas_log (usuario, area, questao_id, correta, tempo, respondida_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, linhas)
+            conn.executemany("""
+                INSERT INTO respostas_agregados (usuario, periodo, inicio, area, respostas, acertos, tempo_total)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (usuario, periodo, inicio, area) DO UPDATE SET
+                    respostas = respostas + excluded.respostas,
+                    acertos = acertos + excluded.acertos,
+                    tempo_total = tempo_total + excluded.tempo_total
+            """, [(usuario, periodo, inicio, area, *soma) for (periodo, inicio, area), soma in agregados.items()])
+
+        with self._lock:
+            self.registradas += len(linhas)
+        return len(linhas)
+
+    @staticmethod
+    def _metricas(respostas, acertos, tempo_total):
+        return {
+            "acertos": acertos,
+            "total": respostas,
+            "percentual": (acertos / respostas * 100) if respostas > 0 else 0,
+            "tempo_medio": (tempo_total / respostas) if respostas > 0 else 0
+        }
+
+    def desempenho(self, user_id, periodo='dia', dias=30, hoje=None):
+        """Desempenho acumulado por área e série por dia/semana dos últimos `dias` dias"""
+        if periodo not in PERIODOS:
+            raise ValueError("Período deve ser 'dia' ou 'semana'")
+        codigo = PERIODOS[periodo]
+        hoje = hoje if hoje is not None else int(time.time()) // DIA
+        desde = inicio_periodo(hoje - dias + 1, codigo)
+
+        # Antes de pegar a conexão: em cache miss, _id_usuario usa outra do pool
+        usuario = self._id_usuario(str(user_id), criar=False)
+        if usuario is None:
+            return {"areas": {}, "geral": self._metricas(0, 0, 0), "serie": []}
+        with self.pool.conexao() as conn:
+            totais = conn.execute("""
+                SELECT area, respostas, acertos, tempo_total FROM respostas_agregados
+                WHERE usuario = ? AND periodo = ? AND inicio = 0
+            """, (usuario, TOTAL)).fetchall()
+            serie = conn.execute("""
+                SELECT inicio, SUM(respostas), SUM(acertos), SUM(tempo_total) FROM respostas_agregados
+                WHERE usuario = ? AND periodo = ? AND inicio >= ?
+                GROUP BY inicio ORDER BY inicio
+            """, (usuario, codigo, desde)).fetchall()
+            areas = {self._nome_area(conn, area): self._metricas(*valores) for area, *valores in totais}
+
+        soma = [sum(linha[i] for linha in totais) for i in (1, 2, 3)]
+        return {
+            "areas": areas,
+            "geral": self._metricas(*soma),
+            "serie": [{"inicio": dia_iso(inicio), **self._metricas(*valores)} for inicio, *valores in serie]
+        }
+
+    def listar(self, user_id, limite=50, antes_de=None):
+        """Respostas mais recentes do usuário, paginadas pelo id (`antes_de` = último id recebido)"""
+        usuario = self._id_usuario(str(user_id), criar=False)
+        if usuario is None:
+            return []
+        with self.pool.conexao() as conn:
+            rows = conn.execute("""
+                SELECT id, area, questao_id, correta, tempo, respondida_em FROM respostas_log
+                WHERE usuario = ? AND id < ?
+                ORDER BY id DESC LIMIT ?
+            """, (usuario, antes_de if antes_de is not None else 2 ** 63 - 1, limite)).fetchall()
+            return [
+                {
+                    "id": row[0],
+                    "area": self._nome_area(conn, row[1]),
+                    "questao_id": row[2],
+                    "correta": bool(row[3]),
+                    "tempo": row[4],
+                    "respondida_em": datetime.fromtimestamp(row[5], timezone.utc).isoformat()
+                }
+                for row in rows
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "usuarios": len(self._usuarios),
+                "areas": len(self._areas),
+                "registradas": self.registradas
+            }
@@ -0,0 +1,106 @@
+from flask import Blueprint, g, jsonify, request
+import time
+from dotenv import load_dotenv
+from fila_jobs import FilaJobs, LimiteJobsExcedido, ESTADOS_FINAIS
+from streaming import evento_sse, resposta_sse
+
+load_dotenv()
+
+jobs_bp = Blueprint('jobs', __name__)
+fila_jobs = FilaJobs()
+
+def quer_assincrono(req, data=None):
+    """Indica se o cliente pediu processamento em segundo plano ({"async": true}, ?async=1 ou Prefer: respond-async)"""
+    if (data or {}).get('async') is True:
+        return True
+    if req.args.get('async', '').lower() in ('1', 'true'):
+        return True
+    return 'respond-async' in req.headers.get('Prefer', '')
+
+def solicitante():
+    """Chave dos limites de jobs: o uid do token verificado ou, sem token, o IP do cliente.
+
+    Nunca vem do corpo do pedido; clientes anônimos de um mesmo IP dividem o limite.
+    """
+    usuario = g.get('usuario')
+    if usuario:
+        return usuario['uid']
+    return f"anonimo:{request.remote_addr or 'desconhecido'}"
+
+def resposta_job(tipo, data):
+    """Enfileira o job e responde 202 com o endereço para acompanhá-lo"""
+    prioridade = fila_jobs.prioridade_padrao(tipo)
+    if data.get('prioridade') is not None:
+        try:
+            informada = int(data['prioridade'])
+        except (TypeError, ValueError):
+            return jsonify({"error": "prioridade deve ser um número inteiro"}), 400
+        # O cliente só pode rebaixar a prioridade padrão do tipo
+        prioridade = min(informada, prioridade)
+    try:
+        job_id = fila_jobs.enfileirar(tipo, data, user_id=solicitante(), prioridade=prioridade)
+    except LimiteJobsExcedido as e:
+        return jsonify({"error": str(e)}), 429
+
+    response = jsonify({"job_id": job_id, "status": "pendente", "url": f"/api/jobs/{job_id}"})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job_id}"
+    return response
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Retorna o estado de um job e, quando concluído, o seu resultado"""
+    try:
+        job = fila_jobs.obter(job_id)
+        if not job:
+            return jsonify({"error": "Job não encontrado"}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jobs_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancelar_job(job_id):
+    """Cancela um job que ainda está na fila"""
+    try:
+        if fila_jobs.cancelar(job_id):
+            return jsonify({"id": job_id, "status": "cancelado"})
+        if not fila_jobs.obter(job_id):
+            return jsonify({"error": "Job não encontrado"}), 404
+        return jsonify({"error": "O job já começou ou terminou"}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jobs_bp.route('/jobs/<job_id>/eventos', methods=['GET'])
+def acompanhar_job(job_id):
+    """Envia eventos SSE a cada mudança de estado do job, terminando com "fim" """
+    try:
+        job = fila_jobs.obter(job_id)
+        if not job:
+            return jsonify({"error": "Job não encontrado"}), 404
+
+        def eventos():
+            try:
+                atual = job
+                ultimo_status = None
+                limite = time.monotonic() + fila_jobs.timeout
+                while atual['status'] not in ESTADOS_FINAIS and time.monotonic() < limite:
+                    if atual['status'] != ultimo_status:
+                        ultimo_status = atual['status']
+                        yield evento_sse('status', atual)
+                    # Acordado ao fim de qualquer job; o timeout cobre jobs de outros processos
+                    fila_jobs.aguardar(job_id, timeout=1)
+                    atual = fila_jobs.obter(job_id) or atual
+                yield evento_sse('fim', atual)
+            except Exception as e:
+                yield evento_sse('erro', {"error": str(e)})
+        return resposta_sse(eventos())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jobs_bp.route('/jobs/stats', methods=['GET'])
+def get_jobs_stats():
+    """Retorna as estatísticas da fila de jobs"""
+    try:
+        return jsonify(fila_jobs.stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,208 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from database import obter_pool, aplicar_migracoes
+
+# Estado de quem ainda não jogou
+ESTADO_INICIAL = {
+    "xp": 0,
+    "level": 1,
+    "energy": 100,
+    "life": 100,
+    "coins": 0,
+    "streak": 0,
+    "achievements": [],
+    "power_ups": [],
+    "ultima_atividade": None,
+    # Contadores incrementais usados pelas regras de conquistas
+    "contadores": {}
+}
+
+MIGRACOES_JOGADORES = [
+    ('jogadores_001_contadores', "ALTER TABLE jogadores ADD COLUMN contadores TEXT NOT NULL DEFAULT '{}'")
+]
+
+class ConcorrenciaExcedida(Exception):
+    """A atualização perdeu para escritas concorrentes mais vezes que o permitido"""
+
+class JogadorService:
+    """Estado de gamificação de cada usuário (xp, nível, energia, moedas...).
+
+    As leituras vêm de um cache LRU em memória, atualizado a cada escrita
+    deste processo (write-through); `ttl` limita por quanto tempo uma entrada
+    pode ignorar escritas feitas por outros processos. As escritas usam
+    concorrência otimista: a linha tem uma `versao`, e o UPDATE só é
+    aplicado se ela não mudou desde a leitura; em caso de conflito o estado
+    é relido do banco e a alteração é reaplicada.
+    """
+
+    def __init__(self, db_path="planos.db", max_cache=None, ttl=None, max_tentativas=5):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.max_cache = max_cache or int(os.getenv('JOGADORES_CACHE_MAX_ENTRADAS', 10000))
+        self.ttl = ttl if ttl is not None else float(os.getenv('JOGADORES_CACHE_TTL', 10))
+        self.max_tentativas = max_tentativas
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conflitos = 0
+        self.init_database()
+
+    def init_database(self):
+        """Cria a tabela de jogadores"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jogadores (
+                    user_id TEXT PRIMARY KEY,
+                    xp INTEGER NOT NULL DEFAULT 0,
+                    level INTEGER NOT NULL DEFAULT 1,
+                    energy INTEGER NOT NULL DEFAULT 100,
+                    life INTEGER NOT NULL DEFAULT 100,
+                    coins INTEGER NOT NULL DEFAULT 0,
+                    streak INTEGER NOT NULL DEFAULT 0,
+                    achievements TEXT NOT NULL DEFAULT '[]',
+                    power_ups TEXT NOT NULL DEFAULT '[]',
+                    ultima_atividade TEXT,
+                    versao INTEGER NOT NULL DEFAULT 1,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Atividades já aplicadas por backfill (chave = hash do conteúdo)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS atividades_reprocessadas (
+                    user_id TEXT NOT NULL,
+                    atividade TEXT NOT NULL,
+                    PRIMARY KEY (user_id, atividade)
+                ) WITHOUT ROWID
+            """)
+        aplicar_migracoes(self.pool, MIGRACOES_JOGADORES)
+
+    def _carregar(self, user_id):
+        """Lê o estado do banco; versão 0 indica jogador ainda sem linha"""
+        with self.pool.conexao() as conn:
+            row = conn.execute("""
+                SELECT xp, level, energy, life, coins, streak, achievements, power_ups, ultima_atividade, contadores, versao
+                FROM jogadores WHERE user_id = ?
+            """, (user_id,)).fetchone()
+
+        if not row:
+            return copy.deepcopy(ESTADO_INICIAL), 0
+        return {
+            "xp": row[0],
+            "level": row[1],
+            "energy": row[2],
+            "life": row[3],
+            "coins": row[4],
+            "streak": row[5],
+            "achievements": json.loads(row[6]),
+            "power_ups": json.loads(row[7]),
+            "ultima_atividade": row[8],
+            "contadores": json.loads(row[9])
+        }, row[10]
+
+    def _ler_cache(self, user_id):
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._cache.get(user_id)
+            if entrada is not None and agora - entrada[2] <= self.ttl:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return entrada[0], entrada[1]
+            self.misses += 1
+            return None
+
+    def _guardar_cache(self, user_id, estado, versao):
+        with self._lock:
+            self._cache[user_id] = (estado, versao, time.monotonic())
+            self._cache.move_to_end(user_id)
+            if len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+
+    def get_status(self, user_id):
+        """Retorna o estado do jogador (do cache quando possível)"""
+        entrada = self._ler_cache(user_id)
+        if entrada is None:
+            entrada = self._carregar(user_id)
+            self._guardar_cache(user_id, *entrada)
+        return copy.deepcopy(entrada[0])
+
+    def atividades_reprocessadas(self, user_id, chaves):
+        """Subconjunto de `chaves` já gravado por `atualizar(..., reprocessadas=...)`"""
+        chaves = list(chaves)
+        encontradas = set()
+        with self.pool.conexao() as conn:
+            # Em blocos, abaixo do limite de parâmetros do SQLite
+            for inicio in range(0, len(chaves), 500):
+                bloco = chaves[inicio:inicio + 500]
+                rows = conn.execute(f"""
+                    SELECT atividade FROM atividades_reprocessadas
+                    WHERE user_id = ? AND atividade IN ({','.join('?' * len(bloco))})
+                """, (user_id, *bloco)).fetchall()
+                encontradas.update(row[0] for row in rows)
+        return encontradas
+
+    def atualizar(self, user_id, aplicar, reprocessadas=None):
+        """Aplica `aplicar(estado) -> novo_estado` de forma atômica e retorna o novo estado.
+
+        `aplicar` pode ser chamada mais de uma vez (uma por conflito), então
+        não deve ter efeitos colaterais. `reprocessadas(novo)` pode devolver
+        chaves de atividades de backfill, gravadas na mesma transação do
+        estado: como a escrita só vale se a `versao` não mudou, duas cargas
+        simultâneas não aplicam a mesma atividade duas vezes.
+        """
+        entrada = self._ler_cache(user_id)
+        for _ in range(self.max_tentativas):
+            estado, versao = entrada if entrada is not None else self._carregar(user_id)
+            novo = aplicar(copy.deepcopy(estado))
+            valores = (
+                novo['xp'], novo['level'], novo['energy'], novo['life'], novo['coins'], novo['streak'],
+                json.dumps(novo['achievements'], ensure_ascii=False),
+                json.dumps(novo['power_ups'], ensure_ascii=False),
+                novo['ultima_atividade'],
+                json.dumps(novo['contadores'], ensure_ascii=False)
+            )
+
+            with self.pool.conexao() as conn:
+                if versao == 0:
+                    cursor = conn.execute("""
+                        INSERT INTO jogadores (xp, level, energy, life, coins, streak, achievements, power_ups,
+                                               ultima_atividade, contadores, user_id, versao)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                        ON CONFLICT (user_id) DO NOTHING
+                    """, (*valores, user_id))
+                else:
+                    cursor = conn.execute("""
+                        UPDATE jogadores
+                        SET xp = ?, level = ?, energy = ?, life = ?, coins = ?, streak = ?, achievements = ?,
+                            power_ups = ?, ultima_atividade = ?, contadores = ?, versao = versao + 1,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE user_id = ? AND versao = ?
+                    """, (*valores, user_id, versao))
+                if cursor.rowcount and reprocessadas is not None:
+                    conn.executemany("""
+                        INSERT OR IGNORE INTO atividades_reprocessadas (user_id, atividade) VALUES (?, ?)
+                    """, [(user_id, chave) for chave in reprocessadas(novo)])
+
+            if cursor.rowcount:
+                self._guardar_cache(user_id, novo, versao + 1)
+                return copy.deepcopy(novo)
+
+            # Outra escrita chegou antes: reler do banco e reaplicar
+            with self._lock:
+                self.conflitos += 1
+            entrada = None
+
+        raise ConcorrenciaExcedida("Muitas atualizações simultâneas do mesmo jogador, tente novamente")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cache": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "conflitos": self.conflitos
+            }
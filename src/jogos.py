@@ -1,16 +1,131 @@
-from flask import Blueprint, jsonify, request
-import random
-import openai
+from flask import Blueprint, g, jsonify, request
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from prompts_jogos import PROMPTS_JOGOS
+from prompts_jogos import PROMPTS_JOGOS, TEMAS_QUESTOES, DIFICULDADES_QUESTOES
+from cache_questoes import CacheQuestoes
+from banco_questoes import BancoQuestoes
+from jogador_service import JogadorService, ESTADO_INICIAL, ConcorrenciaExcedida
+from ranking import Ranking, segmento_ranking, normalizar_valor, SEGMENTOS_PERMITIDOS
+from conquistas import MotorConquistas
+from pontuacao_lote import pontuar_lote
+from historico_respostas import HistoricoRespostas
+from nota_corte import NotasCorte
+from simulado_service import SimuladoService, SimuladoNaoEncontrado, SimuladoEncerrado
+from questoes_parser import parse_questoes, questao_para_dict, construir_questao, ExtratorIncremental, QuestaoInvalida, acertou
+from llm_client import chat_completion, chat_completion_async
+from database import executar_db
+from single_flight import SingleFlight
+from streaming import quer_streaming, evento_sse, resposta_sse, stream_chat_completion
+from jobs import fila_jobs, quer_assincrono, resposta_job
+from autenticacao import requer_autenticacao
 
 load_dotenv()
 
 jogos_bp = Blueprint('jogos', __name__)
 
-# Configurar OpenAI
-openai.api_key = os.getenv('OPENAI_API_KEY')
+# Configuração da geração paralela do simulado
+SIMULADO_MAX_WORKERS = int(os.getenv('SIMULADO_MAX_WORKERS', 6))
+SIMULADO_AREA_TIMEOUT = float(os.getenv('SIMULADO_AREA_TIMEOUT', 60))
+
+# Quantas vezes regenerar apenas as questões que vierem inválidas
+QUESTOES_MAX_REGERACOES = int(os.getenv('QUESTOES_MAX_REGERACOES', 1))
+
+# Teto (segundos) do tempo_gasto informado pelo cliente fora dos simulados persistidos
+RESULTADO_TEMPO_MAXIMO = float(os.getenv('RESULTADO_TEMPO_MAXIMO', 4 * 3600))
+
+TEMAS_REPOSICAO = {normalizar_valor(tema) for tema in TEMAS_QUESTOES}
+DIFICULDADES_REPOSICAO = {normalizar_valor(dificuldade) for dificuldade in DIFICULDADES_QUESTOES}
+
+def balde_reponivel(tipo, tema, dificuldade, area=''):
+    """Indica se a reposição em segundo plano pode chamar a IA para esse balde.
+
+    Temas, áreas e dificuldades vêm do cliente; só os valores conhecidos de
+    prompts_jogos (e, nos simulados, os cargos do ranking) são repostos.
+    """
+    if normalizar_valor(dificuldade) not in DIFICULDADES_REPOSICAO:
+        return False
+    if tipo == 'simulado':
+        return normalizar_valor(tema) in SEGMENTOS_PERMITIDOS['cargo'] and normalizar_valor(area) in TEMAS_REPOSICAO
+    return tipo in PROMPTS_JOGOS and normalizar_valor(tema) in TEMAS_REPOSICAO and not area
+
+cache_questoes = CacheQuestoes()
+banco_questoes = BancoQuestoes(permitido=balde_reponivel)
+simulado_service = SimuladoService(banco_questoes)
+coalescencia = SingleFlight()
+
+def ler_cache(chave):
+    """Lê o cache de questões sem deixar falhas do cache derrubarem a geração"""
+    try:
+        return cache_questoes.get(chave)
+    except Exception as e:
+        print(f"Erro ao ler cache de questões: {e}")
+        return None
+
+def chamar_ia(chave, usar_cache, messages, max_tokens, temperature, model, **kwargs):
+    """Chama a IA e guarda o texto no cache quando `usar_cache` for verdadeiro"""
+    if usar_cache:
+        # Outra requisição pode ter preenchido o cache enquanto esta aguardava
+        conteudo = ler_cache(chave)
+        if conteudo is not None:
+            return conteudo
+    
+    response = chat_completion(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        **kwargs
+    )
+    conteudo = response.choices[0].message.content
+    
+    if usar_cache:
+        try:
+            cache_questoes.set(chave, conteudo)
+        except Exception as e:
+            print(f"Erro ao gravar cache de questões: {e}")
+    
+    return conteudo
+
+def gerar_conteudo_ia(messages, max_tokens, temperature=0.7, model="gpt-3.5-turbo", usar_cache=True, **kwargs):
+    """Chama a IA passando pelo cache de questões e retorna o texto gerado.
+    
+    Mesmo sem cache, requisições idênticas e simultâneas compartilham uma
+    única chamada à IA (single-flight).
+    """
+    chave = CacheQuestoes.gerar_chave(model, messages, max_tokens=max_tokens, temperature=temperature)
+    if usar_cache:
+        conteudo = ler_cache(chave)
+        if conteudo is not None:
+            return conteudo
+    
+    chave_voo = chave if usar_cache else f"sem_cache:{chave}"
+    return coalescencia.executar(chave_voo, chamar_ia, chave, usar_cache, messages, max_tokens, temperature, model, **kwargs)
+
+def gerar_questoes_validas(gerar_texto, tipo, quantidade, usar_cache=True):
+    """Gera questões e valida cada uma, regenerando só as que vierem inválidas.
+    
+    `gerar_texto(quantidade, usar_cache)` deve chamar a IA e retornar o texto bruto.
+    Retorna a lista de questões (dicts) e quantas foram descartadas.
+    """
+    resultado = parse_questoes(gerar_texto(quantidade, usar_cache), tipo)
+    questoes = resultado.questoes[:quantidade]
+    descartadas = resultado.invalidas
+    
+    for _ in range(QUESTOES_MAX_REGERACOES):
+        faltam = quantidade - len(questoes)
+        if faltam <= 0:
+            break
+        resultado = parse_questoes(gerar_texto(faltam, False), tipo)
+        questoes.extend(resultado.questoes[:faltam])
+        descartadas += resultado.invalidas
+    
+    return [questao_para_dict(q) for q in questoes], descartadas
 
 # Sistema de gamificação
 class GamificationSystem:
@@ -63,130 +178,393 @@ class GamificationSystem:
         }
 
 gamification = GamificationSystem()
+jogador_service = JogadorService()
+ranking = Ranking()
+motor_conquistas = MotorConquistas()
+historico_respostas = HistoricoRespostas()
+notas_corte = NotasCorte()
+
+def aplicar_recompensas(estado, rewards, respostas, tipo_atividade, hoje, desbloqueadas):
+    """Soma as recompensas de uma atividade ao estado persistente do jogador.
+
+    As respostas passam pelo motor de conquistas, que atualiza a sequência de
+    dias e os contadores; as conquistas desbloqueadas nesta tentativa ficam
+    em `desbloqueadas`.
+    """
+    estado['xp'] += rewards['xp_gained']
+    estado['energy'] = max(0, min(100, estado['energy'] + rewards['energy_change']))
+    desbloqueadas[:] = motor_conquistas.processar(estado, respostas, tipo_atividade, hoje)
+    estado['level'] = gamification.calculate_level(estado['xp'])
+    return estado
+
+def usuario_da_requisicao():
+    """uid do token verificado por requer_autenticacao (None sem token).
+
+    O user_id enviado no body ou na query string nunca é usado: só o token
+    identifica o jogador.
+    """
+    usuario = g.get('usuario')
+    if usuario:
+        return usuario.get('uid') or usuario.get('sub')
+    return None
 
 @jogos_bp.route('/jogos/status', methods=['GET'])
+@requer_autenticacao(opcional=True)
 def get_game_status():
     """Retorna o status atual do jogador"""
-    # Em uma implementação real, isso viria do banco de dados do usuário
-    default_status = {
-        "xp": 0,
-        "level": 1,
-        "energy": 100,
-        "life": 100,
-        "coins": 0,
-        "streak": 0,
-        "achievements": [],
-        "power_ups": []
+    try:
+        user_id = usuario_da_requisicao()
+        if not user_id:
+            status = dict(ESTADO_INICIAL)
+            del status['ultima_atividade']
+            del status['contadores']
+            return jsonify(status)
+        return jsonify(jogador_service.get_status(user_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def parametros_questoes(data):
+    """Extrai do corpo da requisição os parâmetros de geração de questões"""
+    tipo = data.get('tipo', 'multipla_escolha')
+    if tipo not in PROMPTS_JOGOS:
+        tipo = 'multipla_escolha'
+    return (
+        tipo,
+        data.get('tema', 'Saúde Pública'),
+        data.get('dificuldade', 'medio'),
+        int(data.get('quantidade', 5)),
+        data.get('usar_cache', True)
+    )
+
+def gerar_questoes_lote(data):
+    """Sorteia do banco ou gera as questões pedidas; usado pela rota e pela fila de jobs"""
+    tipo, tema, dificuldade, quantidade, usar_cache = parametros_questoes(data)
+    
+    # Tentar servir do banco de questões antes de chamar a IA
+    questoes = banco_questoes.sortear_questoes(tipo, tema, dificuldade, quantidade, user_id=data.get('user_id'))
+    descartadas = 0
+    if questoes is not None:
+        origem = "banco"
+    else:
+        questoes, descartadas = gerar_questoes_validas(
+            lambda n, cache: gerar_questoes_tipo(tipo, tema, dificuldade, n, usar_cache=cache),
+            tipo, quantidade, usar_cache
+        )
+        questoes = guardar_no_banco(questoes, tipo, tema, dificuldade, user_id=data.get('user_id'))
+        origem = "ia"
+    
+    return resposta_questoes(questoes, tipo, tema, dificuldade, descartadas, origem)
+
+def resposta_questoes(questoes, tipo, tema, dificuldade, descartadas, origem):
+    """Monta o corpo da resposta de geração de questões"""
+    return {
+        "questoes": questoes,
+        "tema": tema,
+        "dificuldade": dificuldade,
+        "tipo": tipo,
+        "quantidade": len(questoes),
+        "questoes_descartadas": descartadas,
+        "origem": origem
     }
-    return jsonify(default_status)
 
 @jogos_bp.route('/jogos/questoes/gerar', methods=['POST'])
+@requer_autenticacao(opcional=True)
 def gerar_questoes():
-    """Gera questões usando IA"""
+    """Gera questões usando IA (com token, sem repetir as que o usuário já recebeu)"""
     try:
         data = request.json
-        tema = data.get('tema', 'Saúde Pública')
-        dificuldade = data.get('dificuldade', 'medio')
-        quantidade = data.get('quantidade', 5)
-        tipo = data.get('tipo', 'multipla_escolha')
-        
-        # Selecionar prompt baseado no tipo
-        prompt_template = PROMPTS_JOGOS.get(tipo, PROMPTS_JOGOS['multipla_escolha'])
-        
-        prompt = prompt_template.format(
-            tema=tema,
-            dificuldade=dificuldade,
-            quantidade=quantidade
-        )
+        data['user_id'] = usuario_da_requisicao()
+        
+        if quer_streaming(request, data):
+            return resposta_sse(stream_questoes(*parametros_questoes(data), data.get('user_id')))
+        
+        if quer_assincrono(request, data):
+            return resposta_job('jogos.questoes', data)
         
-        response = openai.ChatCompletion.create(
+        return jsonify(gerar_questoes_lote(data))
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def mensagens_questoes(tipo, tema, dificuldade, quantidade):
+    """Monta as mensagens da IA para um tipo de PROMPTS_JOGOS"""
+    # Selecionar prompt baseado no tipo
+    prompt_template = PROMPTS_JOGOS.get(tipo, PROMPTS_JOGOS['multipla_escolha'])
+    
+    prompt = prompt_template.format(
+        tema=tema,
+        dificuldade=dificuldade,
+        quantidade=quantidade
+    )
+    
+    return [
+        {"role": "system", "content": "Você é um especialista em concursos públicos da área da saúde. Crie questões educativas e desafiadoras."},
+        {"role": "user", "content": prompt}
+    ]
+
+def gerar_questoes_tipo(tipo, tema, dificuldade, quantidade, usar_cache=True):
+    """Gera questões de um tipo de PROMPTS_JOGOS e retorna o texto da IA"""
+    return gerar_conteudo_ia(
+        messages=mensagens_questoes(tipo, tema, dificuldade, quantidade),
+        max_tokens=2500,
+        temperature=0.7,
+        usar_cache=usar_cache
+    )
+
+def stream_questoes(tipo, tema, dificuldade, quantidade, usar_cache=True, user_id=None):
+    """Produz eventos SSE com cada questão assim que o objeto JSON dela fica completo"""
+    try:
+        questoes = banco_questoes.sortear_questoes(tipo, tema, dificuldade, quantidade, user_id=user_id)
+        if questoes is not None:
+            for questao in questoes:
+                yield evento_sse('questao', questao)
+            yield evento_sse('fim', {"quantidade": len(questoes), "questoes_descartadas": 0, "origem": "banco"})
+            return
+        
+        messages = mensagens_questoes(tipo, tema, dificuldade, quantidade)
+        chave = CacheQuestoes.gerar_chave("gpt-3.5-turbo", messages, max_tokens=2500, temperature=0.7)
+        texto_cache = cache_questoes.get(chave) if usar_cache else None
+        trechos = [texto_cache] if texto_cache is not None else stream_chat_completion(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Você é um especialista em concursos públicos da área da saúde. Crie questões educativas e desafiadoras."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             max_tokens=2500,
             temperature=0.7
         )
         
-        questoes_texto = response.choices[0].message.content
+        extrator = ExtratorIncremental()
+        partes = []
+        enviadas = 0
+        descartadas = 0
+        for trecho in trechos:
+            partes.append(trecho)
+            for objeto in extrator.alimentar(trecho):
+                if enviadas >= quantidade:
+                    continue
+                try:
+                    questao = questao_para_dict(construir_questao(tipo, objeto))
+                except QuestaoInvalida:
+                    descartadas += 1
+                    continue
+                questao = guardar_no_banco([questao], tipo, tema, dificuldade, user_id=user_id)[0]
+                enviadas += 1
+                yield evento_sse('questao', questao)
         
-        return jsonify({
-            "questoes": questoes_texto,
-            "tema": tema,
-            "dificuldade": dificuldade,
-            "tipo": tipo,
-            "quantidade": quantidade
-        })
+        if texto_cache is None and usar_cache:
+            cache_questoes.set(chave, ''.join(partes))
         
+        yield evento_sse('fim', {"quantidade": enviadas, "questoes_descartadas": descartadas, "origem": "ia"})
+    except Exception as e:
+        yield evento_sse('erro', {"error": str(e)})
+
+def guardar_no_banco(questoes, tipo, tema, dificuldade, area='', user_id=None):
+    """Aproveita questões geradas ao vivo para alimentar o banco"""
+    try:
+        ids = banco_questoes.adicionar_questoes(tipo, tema, dificuldade, questoes, area)
+        banco_questoes.marcar_vistas(user_id, ids)
+        return [dict(questao, banco_id=banco_id) for questao, banco_id in zip(questoes, ids)]
+    except Exception as e:
+        print(f"Erro ao guardar questões no banco: {e}")
+        return questoes
+
+def gerar_para_banco(tipo, tema, dificuldade, area, quantidade):
+    """Gerador usado pela reposição em segundo plano do banco de questões"""
+    if tipo == 'simulado':
+        configuracao = {"cargo": tema, "dificuldade": dificuldade, "areas": [area], "num_questoes": quantidade}
+        gerar_texto = lambda n, cache: gerar_questoes_area(area, configuracao, usar_cache=cache, quantidade=n)
+    else:
+        gerar_texto = lambda n, cache: gerar_questoes_tipo(tipo, tema, dificuldade, n, usar_cache=cache)
+    questoes, _ = gerar_questoes_validas(gerar_texto, tipo, quantidade, usar_cache=False)
+    return questoes
+
+def iniciar_reposicao_banco():
+    """Liga a thread que mantém o banco de questões abastecido"""
+    banco_questoes.iniciar_reposicao(gerar_para_banco)
+
+def mensagens_area(area, configuracao, quantidade=None):
+    """Monta as mensagens da IA para as questões de uma área do simulado"""
+    questoes_por_area = quantidade or configuracao['num_questoes'] // len(configuracao['areas'])
+    
+    prompt = f"""
+    Crie {questoes_por_area} questões de múltipla escolha sobre {area} para concurso de {configuracao['cargo']}.
+    Nível de dificuldade: {configuracao['dificuldade']}
+    
+    Formato para cada questão:
+    {{"pergunta": "texto da pergunta", "alternativas": ["a", "b", "c", "d", "e"], "resposta_correta": "letra", "explicacao": "explicação detalhada"}}
+    
+    Retorne um array JSON com as questões.
+    """
+    
+    return [
+        {"role": "system", "content": "Você é um especialista em concursos públicos da área da saúde."},
+        {"role": "user", "content": prompt}
+    ]
+
+def gerar_questoes_area(area, configuracao, usar_cache=True, quantidade=None):
+    """Gera as questões de uma área do simulado via IA"""
+    return gerar_conteudo_ia(
+        messages=mensagens_area(area, configuracao, quantidade),
+        max_tokens=2000,
+        temperature=0.7,
+        usar_cache=usar_cache,
+        request_timeout=SIMULADO_AREA_TIMEOUT
+    )
+
+def obter_questoes_area(area, configuracao, usar_cache=True, user_id=None):
+    """Retorna as questões de uma área, do banco quando possível ou geradas ao vivo"""
+    questoes_por_area = configuracao['num_questoes'] // len(configuracao['areas'])
+    questoes = banco_questoes.sortear_questoes(
+        'simulado', configuracao['cargo'], configuracao['dificuldade'], questoes_por_area,
+        area=area, user_id=user_id
+    )
+    if questoes is not None:
+        return questoes
+    
+    questoes, _ = gerar_questoes_validas(
+        lambda n, cache: gerar_questoes_area(area, configuracao, usar_cache=cache, quantidade=n),
+        'simulado', questoes_por_area, usar_cache
+    )
+    return guardar_no_banco(questoes, 'simulado', configuracao['cargo'], configuracao['dificuldade'], area, user_id)
+
+def gerar_questoes_simulado(configuracao, max_workers=None, timeout=None, usar_cache=True, user_id=None):
+    """Gera as questões de todas as áreas do simulado em paralelo.
+    
+    Cada área é resolvida de forma independente (banco ou IA). O resultado mantém a ordem
+    de `configuracao['areas']`; áreas que falharem ou excederem o tempo
+    limite recebem o campo "erro" em vez de derrubar o simulado inteiro.
+    """
+    areas = configuracao['areas']
+    if not areas:
+        return []
+    
+    max_workers = max_workers or SIMULADO_MAX_WORKERS
+    timeout = timeout if timeout is not None else SIMULADO_AREA_TIMEOUT
+    
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(areas)))
+    try:
+        futures = [executor.submit(obter_questoes_area, area, configuracao, usar_cache, user_id) for area in areas]
+        # As áreas excedentes ao pool aguardam na fila, então o prazo cresce por "rodada"
+        rodadas = -(-len(areas) // min(max_workers, len(areas)))
+        wait(futures, timeout=timeout * rodadas)
+        
+        questoes_simulado = []
+        for area, future in zip(areas, futures):
+            if not future.done():
+                future.cancel()
+                questoes_simulado.append({"area": area, "erro": "Tempo limite excedido"})
+            elif future.exception() is not None:
+                questoes_simulado.append({"area": area, "erro": str(future.exception())})
+            else:
+                questoes_simulado.append({"area": area, "questoes": future.result()})
+        return questoes_simulado
+    finally:
+        # Não bloquear a resposta esperando chamadas que já estouraram o prazo
+        executor.shutdown(wait=False, cancel_futures=True)
+
+@jogos_bp.route('/jogos/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Retorna as estatísticas do cache de questões e da coalescência de chamadas"""
+    try:
+        stats = cache_questoes.stats()
+        stats['coalescencia'] = coalescencia.stats()
+        return jsonify(stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def configuracao_simulado(data):
+    """Extrai do corpo da requisição a configuração do simulado"""
+    return {
+        "cargo": data.get('cargo', 'Técnico em Saúde'),
+        "tempo_limite": data.get('tempo_limite', 60),  # minutos
+        "num_questoes": data.get('num_questoes', 20),
+        "areas": data.get('areas', ['Saúde Pública', 'SUS', 'Epidemiologia']),
+        "dificuldade": data.get('dificuldade', 'medio')
+    }
+
+def montar_simulado(data):
+    """Monta o simulado com as questões de cada área; usado pela rota e pela fila de jobs"""
+    configuracao = configuracao_simulado(data)
+    
+    # Gerar questões para o simulado (uma chamada por área, em paralelo)
+    questoes_simulado = gerar_questoes_simulado(
+        configuracao,
+        usar_cache=data.get('usar_cache', True),
+        user_id=data.get('user_id')
+    )
+    return resposta_simulado(configuracao, questoes_simulado, data.get('user_id'))
+
+def resposta_simulado(configuracao, questoes_simulado, user_id=None):
+    """Persiste a sessão do simulado e monta o corpo da resposta de criação.
+    
+    As questões vão sem o gabarito; a correção é feita em /jogos/resultado com o simulado_id.
+    """
+    areas_com_erro = [q['area'] for q in questoes_simulado if 'erro' in q]
+    
+    sessao, questoes_cliente = simulado_service.criar(configuracao, questoes_simulado, user_id)
+    
+    return {
+        **sessao,
+        "configuracao": configuracao,
+        "questoes": questoes_cliente,
+        "areas_com_erro": areas_com_erro,
+        "status": "criado" if not areas_com_erro else "parcial"
+    }
+
 @jogos_bp.route('/jogos/simulado', methods=['POST'])
+@requer_autenticacao
 def criar_simulado():
-    """Cria um simulado personalizado"""
+    """Cria um simulado personalizado, de posse do usuário do token"""
     try:
         data = request.json
-        configuracao = {
-            "cargo": data.get('cargo', 'Técnico em Saúde'),
-            "tempo_limite": data.get('tempo_limite', 60),  # minutos
-            "num_questoes": data.get('num_questoes', 20),
-            "areas": data.get('areas', ['Saúde Pública', 'SUS', 'Epidemiologia']),
-            "dificuldade": data.get('dificuldade', 'medio')
-        }
+        data['user_id'] = usuario_da_requisicao()
         
-        # Gerar questões para o simulado
-        questoes_simulado = []
-        for area in configuracao['areas']:
-            questoes_por_area = configuracao['num_questoes'] // len(configuracao['areas'])
-            
-            prompt = f"""
-            Crie {questoes_por_area} questões de múltipla escolha sobre {area} para concurso de {configuracao['cargo']}.
-            Nível de dificuldade: {configuracao['dificuldade']}
-            
-            Formato para cada questão:
-            {{"pergunta": "texto da pergunta", "alternativas": ["a", "b", "c", "d", "e"], "resposta_correta": "letra", "explicacao": "explicação detalhada"}}
-            
-            Retorne um array JSON com as questões.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em concursos públicos da área da saúde."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.7
-            )
-            
-            questoes_area = response.choices[0].message.content
-            questoes_simulado.append({
-                "area": area,
-                "questoes": questoes_area
-            })
+        if quer_assincrono(request, data):
+            return resposta_job('jogos.simulado', data)
         
-        simulado_id = random.randint(1000, 9999)
-        
-        return jsonify({
-            "simulado_id": simulado_id,
-            "configuracao": configuracao,
-            "questoes": questoes_simulado,
-            "status": "criado"
-        })
+        return jsonify(montar_simulado(data))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@jogos_bp.route('/jogos/simulado/<int:simulado_id>', methods=['GET'])
+@requer_autenticacao
+def get_simulado(simulado_id):
+    """Estado de um simulado persistido (status, prazo e tempo restante)"""
+    try:
+        return jsonify(simulado_service.obter(simulado_id, usuario_da_requisicao()))
+    except SimuladoNaoEncontrado as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @jogos_bp.route('/jogos/resultado', methods=['POST'])
+@requer_autenticacao
 def processar_resultado():
-    """Processa o resultado de um jogo/simulado"""
+    """Processa o resultado de um jogo/simulado.
+
+    Com "simulado_id", a sessão persistida é corrigida e cronometrada no
+    servidor. Sem ela, cada resposta ({"questao_id", "resposta"}) é corrigida
+    pelo banco de questões e o "tempo_gasto" informado é limitado.
+    """
     try:
         data = request.json
+        data['user_id'] = usuario_da_requisicao()
         respostas = data.get('respostas', [])
-        tempo_gasto = data.get('tempo_gasto', 0)  # em segundos
         tipo_atividade = data.get('tipo', 'questoes')
         
+        simulado_id = data.get('simulado_id')
+        configuracao = None
+        if simulado_id is not None:
+            # Simulado persistido: correção e tempo vêm do servidor, não do cliente
+            respostas, tempo_gasto, configuracao = simulado_service.finalizar(simulado_id, respostas, data.get('user_id'))
+            tipo_atividade = 'simulado'
+        else:
+            # Questões avulsas: corrigidas pelo banco de questões, nunca pelo "correta" do cliente
+            respostas = corrigir_pelo_banco(respostas)
+            tempo_gasto = tempo_informado(data.get('tempo_gasto', 0))
+            if tipo_atividade == 'simulado':
+                # Só sessões corrigidas pelo servidor contam como simulado
+                tipo_atividade = 'questoes'
+        
         # Calcular estatísticas
         total_questoes = len(respostas)
         acertos = sum(1 for r in respostas if r.get('correta', False))
@@ -225,69 +603,463 @@ def processar_resultado():
                 "tempo_medio_por_questao": tempo_gasto / total_questoes if total_questoes > 0 else 0
             },
             "recompensas": rewards,
-            "areas_desempenho": areas_desempenho,
-            "nivel_atual": gamification.calculate_level(rewards['xp_gained']),
-            "xp_proximo_nivel": gamification.get_xp_for_next_level(rewards['xp_gained'])
+            "areas_desempenho": areas_desempenho
         }
+        resultado["correcao"] = respostas
+        if simulado_id is not None:
+            resultado["simulado_id"] = simulado_id
+        
+        user_id = data.get('user_id')
+        if user_id:
+            # Acumular no estado persistente do jogador (uma única transação)
+            hoje = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+            desbloqueadas = []
+            jogador = atualizar_jogador(
+                user_id,
+                lambda estado: aplicar_recompensas(estado, rewards, respostas, tipo_atividade, hoje, desbloqueadas),
+                simulado_id is not None
+            )
+            try:
+                historico_respostas.registrar(user_id, respostas, tempo_gasto)
+            except Exception as e:
+                print(f"Erro ao gravar histórico de respostas: {e}")
+        else:
+            jogador = None
+        
+        if simulado_id is not None and total_questoes > 0:
+            # Nota de corte só com simulados corrigidos pelo servidor, no cargo gravado na sessão
+            try:
+                notas_corte.registrar(
+                    resultado["estatisticas"]["percentual_acerto"],
+                    segmentos_do_usuario(data, configuracao)
+                )
+            except Exception as e:
+                print(f"Erro ao registrar nota para a nota de corte: {e}")
+        
+        if jogador is not None:
+            resultado["jogador"] = jogador
+            resultado["conquistas_desbloqueadas"] = motor_conquistas.listar_itens(desbloqueadas)
+            try:
+                ranking.registrar(user_id, jogador['xp'], segmentos_do_usuario(data, configuracao), nome=data.get('nome'))
+            except Exception as e:
+                print(f"Erro ao atualizar ranking: {e}")
+            xp_total = jogador['xp']
+        else:
+            if user_id:
+                resultado["aviso"] = "Resultado corrigido, mas o XP não pôde ser somado ao jogador agora"
+            xp_total = rewards['xp_gained']
+        
+        resultado["nivel_atual"] = gamification.calculate_level(xp_total)
+        resultado["xp_proximo_nivel"] = gamification.get_xp_for_next_level(xp_total)
         
         return jsonify(resultado)
         
+    except SimuladoNaoEncontrado as e:
+        return jsonify({"error": str(e)}), 404
+    except (ConcorrenciaExcedida, SimuladoEncerrado) as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jogos_bp.route('/jogos/resultado/lote', methods=['POST'])
+def processar_resultados_lote():
+    """Corrige várias submissões de uma vez (fim de prova de uma turma, recorreção após mudança de gabarito).
+
+    Body: {"submissoes": [{"id", "respostas", "tempo_gasto"}, ...], "gabarito": {questao_id: resposta_correta}}
+    Não altera o estado dos jogadores; cada resultado tem o formato de /jogos/resultado.
+    """
+    try:
+        data = request.json or {}
+        submissoes = data.get('submissoes')
+        if not isinstance(submissoes, list):
+            raise ValueError("Campo 'submissoes' deve ser uma lista")
+        gabarito = data.get('gabarito')
+        if gabarito is not None and not isinstance(gabarito, dict):
+            raise ValueError("Campo 'gabarito' deve ser um objeto {questao_id: resposta_correta}")
+        
+        resultados, resumo = pontuar_lote(submissoes, gamification.levels, gabarito)
+        return jsonify({"resultados": resultados, "resumo": resumo})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@jogos_bp.route('/jogos/historico/desempenho', methods=['GET'])
+@requer_autenticacao
+def get_historico_desempenho():
+    """Desempenho acumulado do usuário por área e evolução por dia ou semana.
+
+    Requer token. Query params: periodo (dia ou semana) e dias (janela da série, até 365).
+    `desempenho` e `areas_dificuldade` podem ser enviados direto para /sugestoes.
+    """
+    try:
+        user_id = usuario_da_requisicao()
+        dias = min(max(request.args.get('dias', 30, type=int), 1), 365)
+        desempenho = historico_respostas.desempenho(user_id, request.args.get('periodo', 'dia'), dias)
+        
+        # Áreas com respostas suficientes e menos de 60% de acerto
+        desempenho["areas_dificuldade"] = [
+            area for area, metricas in desempenho["areas"].items()
+            if metricas["total"] >= 5 and metricas["percentual"] < 60
+        ]
+        return jsonify(desempenho)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jogos_bp.route('/jogos/historico', methods=['GET'])
+@requer_autenticacao
+def get_historico():
+    """Respostas do usuário, das mais recentes para as mais antigas.
+
+    Requer token. Query params: limit (até 200) e antes_de (id da última resposta da página anterior).
+    """
+    try:
+        user_id = usuario_da_requisicao()
+        limite = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        respostas = historico_respostas.listar(user_id, limite, request.args.get('antes_de', type=int))
+        return jsonify({
+            "respostas": respostas,
+            "proximo": respostas[-1]["id"] if len(respostas) == limite else None
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def tempo_informado(valor):
+    """tempo_gasto enviado pelo cliente, limitado a [0, RESULTADO_TEMPO_MAXIMO] segundos"""
+    try:
+        tempo = float(valor or 0)
+    except (TypeError, ValueError):
+        raise ValueError("Campo 'tempo_gasto' deve ser um número de segundos")
+    if tempo != tempo:
+        raise ValueError("Campo 'tempo_gasto' deve ser um número de segundos")
+    return int(min(max(tempo, 0), RESULTADO_TEMPO_MAXIMO))
+
+def corrigir_pelo_banco(respostas):
+    """Corrige respostas avulsas pelo banco de questões, pelo "questao_id" (banco_id) de cada uma.
+
+    Cada resposta é {"questao_id", "resposta"}; questões que não estão no
+    banco contam como erro. Retorna as respostas corrigidas no mesmo formato
+    de SimuladoService.finalizar.
+    """
+    if not isinstance(respostas, list) or not all(isinstance(r, dict) for r in respostas):
+        raise ValueError("Campo 'respostas' deve ser uma lista de objetos")
+    
+    def id_no_banco(resposta):
+        valor = resposta.get('questao_id', resposta.get('banco_id'))
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            return None
+    
+    ids = [id_no_banco(r) for r in respostas]
+    questoes = banco_questoes.obter_questoes([i for i in ids if i is not None])
+    corrigidas = []
+    for questao_id, resposta in zip(ids, respostas):
+        area, questao = questoes.get(questao_id, ('', None))
+        corrigidas.append({
+            "questao_id": questao_id,
+            "area": area or 'Geral',
+            "resposta": resposta.get('resposta'),
+            "correta": questao is not None and acertou(questao, resposta.get('resposta'))
+        })
+    return corrigidas
+
+def atualizar_jogador(user_id, aplicar, corrigido_no_servidor=False, rodadas=3):
+    """Atualiza o estado do jogador; para simulados já encerrados, insiste antes de desistir.
+
+    Um simulado corrigido pelo servidor já foi marcado como finalizado e não
+    pode ser reenviado, então um 409 perderia a nota: aqui os conflitos são
+    retentados com uma pausa crescente e, se persistirem, retorna None para
+    que o resultado seja entregue mesmo sem o XP.
+    """
+    if not corrigido_no_servidor:
+        return jogador_service.atualizar(user_id, aplicar)
+    for rodada in range(rodadas):
+        try:
+            return jogador_service.atualizar(user_id, aplicar)
+        except ConcorrenciaExcedida as e:
+            print(f"Conflito ao atualizar jogador {user_id} (rodada {rodada + 1}): {e}")
+            time.sleep(0.05 * (rodada + 1))
+    return None
+
+def segmentos_do_usuario(data, configuracao=None):
+    """Segmentos de ranking em que o resultado do usuário entra.
+
+    O cargo vem da configuração gravada na sessão do simulado, quando houver;
+    valores fora de SEGMENTOS_PERMITIDOS são ignorados (o resultado fica só
+    nos demais segmentos).
+    """
+    valores = dict(data)
+    if configuracao is not None:
+        valores['cargo'] = configuracao.get('cargo')
+    segmentos = [segmento_ranking()]
+    for tipo in ('cargo', 'bloco', 'regiao'):
+        if valores.get(tipo):
+            try:
+                segmentos.append(segmento_ranking(tipo, valores[tipo]))
+            except ValueError:
+                pass
+    return segmentos
+
+def com_nivel(entradas):
+    for entrada in entradas:
+        entrada['level'] = gamification.calculate_level(entrada['xp'])
+    return entradas
+
 @jogos_bp.route('/jogos/ranking', methods=['GET'])
 def get_ranking():
-    """Retorna o ranking de jogadores"""
-    # Em uma implementação real, isso viria do banco de dados
-    ranking_mock = [
-        {"posicao": 1, "nome": "Ana Silva", "xp": 2500, "level": 7, "cargo": "Enfermeiro"},
-        {"posicao": 2, "nome": "João Santos", "xp": 2200, "level": 6, "cargo": "Técnico em Saúde"},
-        {"posicao": 3, "nome": "Maria Costa", "xp": 1800, "level": 6, "cargo": "Fisioterapeuta"},
-        {"posicao": 4, "nome": "Pedro Lima", "xp": 1500, "level": 5, "cargo": "Nutricionista"},
-        {"posicao": 5, "nome": "Carla Oliveira", "xp": 1200, "level": 5, "cargo": "Psicólogo"}
-    ]
+    """Retorna o ranking de jogadores.
+    
+    Query params: segmento (geral, cargo, bloco ou regiao) e valor, limit, offset,
+    e user_id para incluir a posição do usuário e quem está ao redor dele (raio).
+    """
+    try:
+        segmento = segmento_ranking(request.args.get('segmento'), request.args.get('valor'))
+        limite = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        entradas, total = ranking.top(segmento, limite, offset)
+        resposta = {
+            "segmento": segmento,
+            "ranking": com_nivel(entradas),
+            "total_jogadores": total
+        }
+        
+        user_id = request.args.get('user_id')
+        if user_id:
+            raio = min(max(request.args.get('raio', 2, type=int), 0), 50)
+            usuario = ranking.posicao(segmento, user_id)
+            resposta["usuario"] = com_nivel([usuario])[0] if usuario else None
+            resposta["ao_redor"] = com_nivel(ranking.ao_redor(segmento, user_id, raio))
+        
+        return jsonify(resposta)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jogos_bp.route('/jogos/nota-corte', methods=['GET'])
+def get_nota_corte():
+    """Nota de corte simulada a partir dos resultados de simulados.
     
-    return jsonify({
-        "ranking": ranking_mock,
-        "total_jogadores": len(ranking_mock)
-    })
+    Query params: segmento (geral, cargo, bloco ou regiao) e valor, percentil
+    da nota de corte e nota (0 a 100) para obter o percentil do usuário.
+    """
+    try:
+        segmento = segmento_ranking(request.args.get('segmento'), request.args.get('valor'))
+        return jsonify(notas_corte.estimar(
+            segmento,
+            request.args.get('percentil', type=float),
+            request.args.get('nota', type=float)
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @jogos_bp.route('/jogos/conquistas', methods=['GET'])
+@requer_autenticacao(opcional=True)
 def get_conquistas():
-    """Retorna as conquistas disponíveis"""
-    conquistas = [
-        {
-            "id": 1,
-            "nome": "Primeiro Passo",
-            "descricao": "Complete seu primeiro simulado",
-            "icone": "🎯",
-            "xp_reward": 50,
-            "desbloqueada": False
-        },
-        {
-            "id": 2,
-            "nome": "Sequência de Ouro",
-            "descricao": "Acerte 10 questões seguidas",
-            "icone": "🏆",
-            "xp_reward": 100,
-            "desbloqueada": False
-        },
-        {
-            "id": 3,
-            "nome": "Maratonista",
-            "descricao": "Estude por 7 dias consecutivos",
-            "icone": "🏃‍♂️",
-            "xp_reward": 200,
-            "desbloqueada": False
-        },
-        {
-            "id": 4,
-            "nome": "Expert em SUS",
-            "descricao": "Acerte 90% das questões sobre SUS",
-            "icone": "🏥",
-            "xp_reward": 150,
-            "desbloqueada": False
-        }
-    ]
+    """Retorna as conquistas disponíveis (com token, as desbloqueadas e o progresso do usuário)"""
+    try:
+        user_id = usuario_da_requisicao()
+        estado = jogador_service.get_status(user_id) if user_id else None
+        return jsonify({"conquistas": motor_conquistas.listar(estado)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@jogos_bp.route('/jogos/conquistas/reprocessar', methods=['POST'])
+@requer_autenticacao(admin=True)
+def reprocessar_conquistas():
+    """Backfill (só administradores): reaplica históricos de respostas ao motor de conquistas.
+
+    Body: {"historico": [{"user_id": ..., "atividades": [{"tipo": ..., "respostas": [...]}]}]}
+    com `respondida_em` em cada resposta. Cada usuário é gravado em uma única escrita.
+    Atividades já reaplicadas (mesmo conteúdo) são ignoradas, então repetir a carga
+    não soma contadores nem XP de novo.
+    """
+    try:
+        data = request.json or {}
+        historico = data.get('historico')
+        if not isinstance(historico, list):
+            raise ValueError("Campo 'historico' deve ser uma lista")
+        
+        hoje = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        resultados = []
+        for item in historico:
+            user_id = item.get('user_id')
+            if not user_id:
+                raise ValueError("Cada item do histórico precisa de 'user_id'")
+            user_id = str(user_id)
+            atividades = {chave_atividade(atividade): atividade for atividade in item.get('atividades', [])}
+            desbloqueadas = []
+            novas = []
+            
+            def reaplicar(estado):
+                ja_aplicadas = jogador_service.atividades_reprocessadas(user_id, atividades)
+                novas[:] = [chave for chave in atividades if chave not in ja_aplicadas]
+                desbloqueadas[:] = motor_conquistas.reprocessar(estado, [atividades[chave] for chave in novas], hoje)
+                estado['level'] = gamification.calculate_level(estado['xp'])
+                return estado
+            
+            jogador = jogador_service.atualizar(user_id, reaplicar, reprocessadas=lambda novo: novas)
+            if desbloqueadas:
+                try:
+                    segmentos = ranking.segmentos_do_usuario(user_id) or [segmento_ranking()]
+                    ranking.registrar(user_id, jogador['xp'], segmentos)
+                except Exception as e:
+                    print(f"Erro ao atualizar ranking: {e}")
+            resultados.append({
+                "user_id": user_id,
+                "xp": jogador['xp'],
+                "atividades_aplicadas": len(novas),
+                "atividades_ignoradas": len(atividades) - len(novas),
+                "conquistas_desbloqueadas": motor_conquistas.listar_itens(desbloqueadas)
+            })
+        
+        return jsonify({"processados": len(resultados), "resultados": resultados})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ConcorrenciaExcedida as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def chave_atividade(atividade):
+    """Identifica uma atividade de backfill pelo conteúdo (tipo e respostas)"""
+    conteudo = json.dumps([atividade.get('tipo'), atividade.get('respostas', [])], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+# Modo assíncrono (ASGI): mesmas gerações sem ocupar uma thread por chamada à IA.
+# O SQLite roda no executor dedicado de database.executar_db.
+
+async def chamar_ia_async(chave, usar_cache, messages, max_tokens, temperature, model, **kwargs):
+    """Versão assíncrona de chamar_ia"""
+    if usar_cache:
+        conteudo = await executar_db(ler_cache, chave)
+        if conteudo is not None:
+            return conteudo
+    
+    response = await chat_completion_async(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        **kwargs
+    )
+    conteudo = response.choices[0].message.content
+    
+    if usar_cache:
+        try:
+            await executar_db(cache_questoes.set, chave, conteudo)
+        except Exception as e:
+            print(f"Erro ao gravar cache de questões: {e}")
     
-    return jsonify({"conquistas": conquistas})
\ No newline at end of file
+    return conteudo
+
+async def gerar_conteudo_ia_async(messages, max_tokens, temperature=0.7, model="gpt-3.5-turbo", usar_cache=True, **kwargs):
+    """Versão assíncrona de gerar_conteudo_ia"""
+    chave = CacheQuestoes.gerar_chave(model, messages, max_tokens=max_tokens, temperature=temperature)
+    if usar_cache:
+        conteudo = await executar_db(ler_cache, chave)
+        if conteudo is not None:
+            return conteudo
+    
+    chave_voo = chave if usar_cache else f"sem_cache:{chave}"
+    return await coalescencia.executar_async(chave_voo, chamar_ia_async, chave, usar_cache, messages, max_tokens, temperature, model, **kwargs)
+
+async def gerar_questoes_validas_async(gerar_texto, tipo, quantidade, usar_cache=True):
+    """Versão assíncrona de gerar_questoes_validas; `gerar_texto` é uma corrotina"""
+    resultado = parse_questoes(await gerar_texto(quantidade, usar_cache), tipo)
+    questoes = resultado.questoes[:quantidade]
+    descartadas = resultado.invalidas
+    
+    for _ in range(QUESTOES_MAX_REGERACOES):
+        faltam = quantidade - len(questoes)
+        if faltam <= 0:
+            break
+        resultado = parse_questoes(await gerar_texto(faltam, False), tipo)
+        questoes.extend(resultado.questoes[:faltam])
+        descartadas += resultado.invalidas
+    
+    return [questao_para_dict(q) for q in questoes], descartadas
+
+async def gerar_questoes_lote_async(data):
+    """Versão assíncrona de gerar_questoes_lote"""
+    tipo, tema, dificuldade, quantidade, usar_cache = parametros_questoes(data)
+    
+    questoes = await executar_db(banco_questoes.sortear_questoes, tipo, tema, dificuldade, quantidade, user_id=data.get('user_id'))
+    descartadas = 0
+    if questoes is not None:
+        origem = "banco"
+    else:
+        questoes, descartadas = await gerar_questoes_validas_async(
+            lambda n, cache: gerar_conteudo_ia_async(
+                messages=mensagens_questoes(tipo, tema, dificuldade, n),
+                max_tokens=2500,
+                temperature=0.7,
+                usar_cache=cache
+            ),
+            tipo, quantidade, usar_cache
+        )
+        questoes = await executar_db(guardar_no_banco, questoes, tipo, tema, dificuldade, user_id=data.get('user_id'))
+        origem = "ia"
+    
+    return resposta_questoes(questoes, tipo, tema, dificuldade, descartadas, origem)
+
+async def obter_questoes_area_async(area, configuracao, usar_cache=True, user_id=None):
+    """Versão assíncrona de obter_questoes_area"""
+    questoes_por_area = configuracao['num_questoes'] // len(configuracao['areas'])
+    questoes = await executar_db(
+        banco_questoes.sortear_questoes,
+        'simulado', configuracao['cargo'], configuracao['dificuldade'], questoes_por_area,
+        area=area, user_id=user_id
+    )
+    if questoes is not None:
+        return questoes
+    
+    questoes, _ = await gerar_questoes_validas_async(
+        lambda n, cache: gerar_conteudo_ia_async(
+            messages=mensagens_area(area, configuracao, n),
+            max_tokens=2000,
+            temperature=0.7,
+            usar_cache=cache,
+            request_timeout=SIMULADO_AREA_TIMEOUT
+        ),
+        'simulado', questoes_por_area, usar_cache
+    )
+    return await executar_db(guardar_no_banco, questoes, 'simulado', configuracao['cargo'], configuracao['dificuldade'], area, user_id)
+
+async def montar_simulado_async(data):
+    """Versão assíncrona de montar_simulado: todas as áreas em paralelo no event loop"""
+    configuracao = configuracao_simulado(data)
+    areas = configuracao['areas']
+    usar_cache = data.get('usar_cache', True)
+    
+    resultados = await asyncio.gather(*[
+        asyncio.wait_for(
+            obter_questoes_area_async(area, configuracao, usar_cache, data.get('user_id')),
+            timeout=SIMULADO_AREA_TIMEOUT
+        )
+        for area in areas
+    ], return_exceptions=True)
+    
+    questoes_simulado = []
+    for area, resultado in zip(areas, resultados):
+        if isinstance(resultado, (asyncio.TimeoutError, asyncio.CancelledError)):
+            questoes_simulado.append({"area": area, "erro": "Tempo limite excedido"})
+        elif isinstance(resultado, BaseException):
+            questoes_simulado.append({"area": area, "erro": str(resultado)})
+        else:
+            questoes_simulado.append({"area": area, "questoes": resultado})
+    return await executar_db(resposta_simulado, configuracao, questoes_simulado, data.get('user_id'))
+
+# Execução em segundo plano das gerações por IA
+fila_jobs.registrar('jogos.questoes', gerar_questoes_lote, prioridade=5)
+fila_jobs.registrar('jogos.simulado', montar_simulado, prioridade=0)
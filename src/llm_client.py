@@ -0,0 +1,266 @@
+import asyncio
+import openai
+import os
+import random
+import threading
+import time
+import httpx
+from dotenv import load_dotenv
+
+# Cliente único para as chamadas à OpenAI: conexões reaproveitadas, prazo por
+# chamada, retry com backoff, limite de taxa compartilhado e circuit breaker.
+
+load_dotenv()
+
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))
+LLM_MAX_TENTATIVAS = int(os.getenv('LLM_MAX_TENTATIVAS', 3))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 0.5))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 8))
+LLM_TAXA_POR_SEGUNDO = float(os.getenv('LLM_TAXA_POR_SEGUNDO', 5))
+LLM_RAJADA = int(os.getenv('LLM_RAJADA', 10))
+LLM_CIRCUITO_FALHAS = int(os.getenv('LLM_CIRCUITO_FALHAS', 5))
+LLM_CIRCUITO_ABERTURA = float(os.getenv('LLM_CIRCUITO_ABERTURA', 30))
+LLM_POOL_MAXSIZE = int(os.getenv('LLM_POOL_MAXSIZE', 20))
+
+STATUS_RETENTAVEIS = {408, 409, 429, 500, 502, 503, 504}
+ERROS_RETENTAVEIS = {
+    'APITimeoutError', 'APIConnectionError', 'RateLimitError', 'InternalServerError',
+    'ConnectError', 'ConnectTimeout', 'ReadTimeout'
+}
+
+class CircuitoAberto(Exception):
+    """A IA está indisponível e as chamadas estão sendo recusadas sem tentar"""
+
+class PrazoExcedido(Exception):
+    """O prazo da chamada acabou antes de obter resposta"""
+
+class LimitadorTaxa:
+    """Token bucket compartilhado entre as threads do processo"""
+
+    def __init__(self, taxa_por_segundo, capacidade):
+        self.taxa = taxa_por_segundo
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _consumir(self):
+        """Consome um token; retorna 0 se conseguiu ou quantos segundos esperar"""
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+            self._ultimo = agora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.taxa
+
+    def adquirir(self, prazo=None):
+        """Espera por um token; retorna False se o prazo (monotonic) acabar antes"""
+        while True:
+            espera = self._consumir()
+            if not espera:
+                return True
+            if prazo is not None and time.monotonic() + espera > prazo:
+                return False
+            time.sleep(espera)
+
+    async def adquirir_async(self, prazo=None):
+        """Como `adquirir`, mas sem bloquear o event loop"""
+        while True:
+            espera = self._consumir()
+            if not espera:
+                return True
+            if prazo is not None and time.monotonic() + espera > prazo:
+                return False
+            await asyncio.sleep(espera)
+
+class CircuitBreaker:
+    """Abre após falhas consecutivas e libera uma chamada de teste depois de `tempo_abertura`"""
+
+    def __init__(self, limite_falhas, tempo_abertura):
+        self.limite_falhas = limite_falhas
+        self.tempo_abertura = tempo_abertura
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self._testando = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self.falhas < self.limite_falhas:
+                return 'fechado'
+            return 'aberto' if time.monotonic() < self.aberto_ate else 'meio_aberto'
+
+    def permitir(self):
+        """Retorna None se a chamada deve ser recusada, 'normal' ou 'teste' (a chamada de teste do meio aberto)"""
+        with self._lock:
+            if self.falhas < self.limite_falhas:
+                return 'normal'
+            if time.monotonic() < self.aberto_ate or self._testando:
+                return None
+            # Meio aberto: deixa passar uma única chamada de teste
+            self._testando = True
+            return 'teste'
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self._testando = False
+
+    def cancelar_teste(self):
+        """Libera a vaga de teste de uma chamada que terminou sem resultado (ex.: cancelada)"""
+        with self._lock:
+            self._testando = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            self._testando = False
+            if self.falhas >= self.limite_falhas:
+                self.aberto_ate = time.monotonic() + self.tempo_abertura
+
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+def _limites_http():
+    # Conexões keep-alive compartilhadas pelas threads (sem um handshake TLS por chamada)
+    return httpx.Limits(max_connections=LLM_POOL_MAXSIZE, max_keepalive_connections=LLM_POOL_MAXSIZE)
+
+def obter_cliente(assincrono=False):
+    """Cliente da OpenAI (openai>=1) do processo, criado no primeiro uso.
+
+    O retry fica a cargo deste módulo (max_retries=0), para respeitar o
+    prazo total da chamada, o limite de taxa e o circuit breaker.
+    """
+    with _clientes_lock:
+        cliente = _clientes.get(assincrono)
+        if cliente is None:
+            if assincrono:
+                cliente = openai.AsyncOpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    http_client=httpx.AsyncClient(limits=_limites_http(), timeout=LLM_TIMEOUT),
+                    max_retries=0,
+                    timeout=LLM_TIMEOUT
+                )
+            else:
+                cliente = openai.OpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    http_client=httpx.Client(limits=_limites_http(), timeout=LLM_TIMEOUT),
+                    max_retries=0,
+                    timeout=LLM_TIMEOUT
+                )
+            _clientes[assincrono] = cliente
+        return cliente
+
+limitador = LimitadorTaxa(LLM_TAXA_POR_SEGUNDO, LLM_RAJADA)
+circuito = CircuitBreaker(LLM_CIRCUITO_FALHAS, LLM_CIRCUITO_ABERTURA)
+
+def _status_http(erro):
+    return getattr(erro, 'status_code', None)
+
+def erro_retentavel(erro):
+    """Indica se vale a pena repetir a chamada (429, 5xx, timeout, conexão)"""
+    if _status_http(erro) in STATUS_RETENTAVEIS:
+        return True
+    return type(erro).__name__ in ERROS_RETENTAVEIS
+
+def _retry_after(erro):
+    headers = getattr(getattr(erro, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after') or headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+def _backoff(tentativa):
+    """Backoff exponencial com jitter completo"""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** tentativa)))
+
+def chat_completion(timeout=None, max_tentativas=None, **kwargs):
+    """Chama chat.completions.create com prazo, retry, limite de taxa e circuit breaker.
+
+    `timeout` é o prazo total da chamada (incluindo as novas tentativas).
+    Aceita os mesmos argumentos de chat.completions.create, inclusive stream=True.
+    """
+    request_timeout = kwargs.pop('request_timeout', None)
+    timeout = timeout or request_timeout or LLM_TIMEOUT
+    max_tentativas = max_tentativas or LLM_MAX_TENTATIVAS
+    prazo = time.monotonic() + timeout
+
+    tentativa = 0
+    while True:
+        # O token vem antes do circuito: esperar pelo limite não pode prender a vaga de teste
+        if not limitador.adquirir(prazo):
+            raise PrazoExcedido("Prazo excedido aguardando limite de requisições da IA")
+        passagem = circuito.permitir()
+        if not passagem:
+            raise CircuitoAberto("Serviço de IA indisponível no momento, tente novamente em instantes")
+
+        restante = prazo - time.monotonic()
+        try:
+            resposta = obter_cliente().chat.completions.create(timeout=restante, **kwargs)
+            circuito.registrar_sucesso()
+            return resposta
+        except Exception as e:
+            if not erro_retentavel(e):
+                # Erro do próprio pedido (ex.: 400): a IA está respondendo
+                circuito.registrar_sucesso()
+                raise
+            circuito.registrar_falha()
+            tentativa += 1
+            espera = _retry_after(e) or _backoff(tentativa)
+            if tentativa >= max_tentativas or time.monotonic() + espera >= prazo:
+                raise
+            time.sleep(espera)
+        except BaseException:
+            # Ex.: KeyboardInterrupt/SystemExit no meio da chamada
+            if passagem == 'teste':
+                circuito.cancelar_teste()
+            raise
+
+async def chat_completion_async(timeout=None, max_tentativas=None, **kwargs):
+    """Versão assíncrona de chat_completion (AsyncOpenAI), usada no modo ASGI.
+
+    Compartilha o limite de taxa e o circuit breaker com as chamadas síncronas.
+    """
+    request_timeout = kwargs.pop('request_timeout', None)
+    timeout = timeout or request_timeout or LLM_TIMEOUT
+    max_tentativas = max_tentativas or LLM_MAX_TENTATIVAS
+    prazo = time.monotonic() + timeout
+
+    tentativa = 0
+    while True:
+        if not await limitador.adquirir_async(prazo):
+            raise PrazoExcedido("Prazo excedido aguardando limite de requisições da IA")
+        passagem = circuito.permitir()
+        if not passagem:
+            raise CircuitoAberto("Serviço de IA indisponível no momento, tente novamente em instantes")
+
+        restante = prazo - time.monotonic()
+        try:
+            resposta = await obter_cliente(assincrono=True).chat.completions.create(timeout=restante, **kwargs)
+            circuito.registrar_sucesso()
+            return resposta
+        except Exception as e:
+            if not erro_retentavel(e):
+                circuito.registrar_sucesso()
+                raise
+            circuito.registrar_falha()
+            tentativa += 1
+            espera = _retry_after(e) or _backoff(tentativa)
+            if tentativa >= max_tentativas or time.monotonic() + espera >= prazo:
+                raise
+            await asyncio.sleep(espera)
+        except BaseException:
+            # CancelledError (ex.: asyncio.wait_for estourou): a chamada de teste não concluiu
+            if passagem == 'teste':
+                circuito.cancelar_teste()
+            raise
+
+def estado():
+    """Resumo do estado do cliente para monitoramento"""
+    return {
+        "circuito": circuito.estado,
+        "falhas_consecutivas": circuito.falhas
+    }
@@ -1,76 +1,125 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 import firebase_admin
-from firebase_admin import credentials, auth
+from firebase_admin import credentials
 import json
-from planos import planos_bp
-from jogos import jogos_bp
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-
-# Configurar Firebase
-try:
-    # Tentar carregar credenciais do Firebase
-    firebase_key = os.getenv('FIREBASE_PRIVATE_KEY')
-    if firebase_key:
-        # Parse da chave privada (pode estar como string JSON)
-        if firebase_key.startswith('{'):
-            firebase_config = json.loads(firebase_key)
-        else:
-            firebase_config = {
-                "type": "service_account",
-                "project_id": os.getenv('FIREBASE_PROJECT_ID'),
-                "private_key_id": os.getenv('FIREBASE_PRIVATE_KEY_ID'),
-                "private_key": firebase_key.replace('\\n', '\n'),
-                "client_email": os.getenv('FIREBASE_CLIENT_EMAIL'),
-                "client_id": os.getenv('FIREBASE_CLIENT_ID'),
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                "client_x509_cert_url": f"https://www.googleapis.com/robot/v1/metadata/x509/{os.getenv('FIREBASE_CLIENT_EMAIL')}"
-            }
-        
-        cred = credentials.Certificate(firebase_config)
-        firebase_admin.initialize_app(cred)
-        print("Firebase inicializado com sucesso!")
-except Exception as e:
-    print(f"Erro ao inicializar Firebase: {e}")
-    print("Continuando sem Firebase...")
-
-# Registrar blueprints
-app.register_blueprint(planos_bp, url_prefix='/api')
-app.register_blueprint(jogos_bp, url_prefix='/api')
-
-@app.route('/health')
-def health_check():
-    return jsonify({"status": "healthy", "message": "Gabarita AI Backend is running!"})
-
-@app.route('/api/auth/verify', methods=['POST'])
-def verify_token():
+def inicializar_firebase():
+    """Configura o Firebase Admin uma única vez por processo"""
+    if firebase_admin._apps:
+        return
     try:
-        token = request.json.get('token')
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 400
-        
-        # Verificar token do Firebase
-        decoded_token = auth.verify_id_token(token)
-        uid = decoded_token['uid']
-        
-        return jsonify({
-            "success": True,
-            "uid": uid,
-            "email": decoded_token.get('email'),
-            "name": decoded_token.get('name')
-        })
+        # Tentar carregar credenciais do Firebase
+        firebase_key = os.getenv('FIREBASE_PRIVATE_KEY')
+        if firebase_key:
+            # Parse da chave privada (pode estar como string JSON)
+            if firebase_key.startswith('{'):
+                firebase_config = json.loads(firebase_key)
+            else:
+                firebase_config = {
+                    "type": "service_account",
+                    "project_id": os.getenv('FIREBASE_PROJECT_ID'),
+                    "private_key_id": os.getenv('FIREBASE_PRIVATE_KEY_ID'),
+                    "private_key": firebase_key.replace('\\n', '\n'),
+                    "client_email": os.getenv('FIREBASE_CLIENT_EMAIL'),
+                    "client_id": os.getenv('FIREBASE_CLIENT_ID'),
+                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                    "token_uri": "https://oauth2.googleapis.com/token",
+                    "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+                    "client_x509_cert_url": f"https://www.googleapis.com/robot/v1/metadata/x509/{os.getenv('FIREBASE_CLIENT_EMAIL')}"
+                }
+            
+            cred = credentials.Certificate(firebase_config)
+            firebase_admin.initialize_app(cred)
+            print("Firebase inicializado com sucesso!")
     except Exception as e:
-        return jsonify({"error": str(e)}), 401
+        print(f"Erro ao inicializar Firebase: {e}")
+        print("Continuando sem Firebase...")
+
+def create_app():
+    """Cria a aplicação Flask.
+    
+    Em produção o gunicorn chama esta função em cada worker depois do fork,
+    então Firebase, conexões SQLite e threads de segundo plano pertencem ao
+    processo que vai usá-los.
+    """
+    # Importados aqui para que os serviços (SQLite, caches) nasçam no worker
+    from planos import planos_bp
+    from jogos import jogos_bp, iniciar_reposicao_banco
+    from jobs import jobs_bp, fila_jobs
+    import llm_client
+    from autenticacao import verificar_token, iniciar_renovacao_chaves, requer_autenticacao, revogar_sessoes
+    
+    app = Flask(__name__)
+    # Limite do corpo das requisições
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 1024 * 1024))
+    CORS(app)
+    
+    @app.before_request
+    def limitar_corpo():
+        # As rotas tratam qualquer exceção como 500; recusar antes de chegar a elas
+        if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+            return jsonify({"error": "Corpo da requisição muito grande"}), 413
+    
+    inicializar_firebase()
+    
+    # Registrar blueprints
+    app.register_blueprint(planos_bp, url_prefix='/api')
+    app.register_blueprint(jogos_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    
+    # Reposição do banco de questões em segundo plano
+    if os.getenv('BANCO_QUESTOES_REPOSICAO', 'true').lower() == 'true':
+        iniciar_reposicao_banco()
+    
+    # Retomar os jobs de IA pendentes
+    fila_jobs.iniciar()
+    
+    # Certificados do Firebase para verificar tokens sem ir à rede
+    iniciar_renovacao_chaves()
+    
+    @app.route('/health')
+    def health_check():
+        return jsonify({"status": "healthy", "message": "Gabarita AI Backend is running!", "llm": llm_client.estado()})
+    
+    @app.route('/api/auth/verify', methods=['POST'])
+    def verify_token():
+        try:
+            token = request.json.get('token')
+            if not token:
+                return jsonify({"error": "Token não fornecido"}), 400
+            
+            # Verificar token do Firebase (reaproveitando verificações recentes)
+            decoded_token = verificar_token(token)
+            uid = decoded_token['uid']
+            
+            return jsonify({
+                "success": True,
+                "uid": uid,
+                "email": decoded_token.get('email'),
+                "name": decoded_token.get('name')
+            })
+        except Exception as e:
+            return jsonify({"error": str(e)}), 401
+    
+    @app.route('/api/auth/logout', methods=['POST'])
+    @requer_autenticacao
+    def logout():
+        """Encerra todas as sessões do usuário: revoga os refresh tokens e descarta os tokens do cache"""
+        try:
+            revogar_sessoes(g.usuario['uid'])
+            return jsonify({"success": True})
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    return app
 
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use: gunicorn -c gunicorn.conf.py
     port = int(os.environ.get('PORT', 8000))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=port, debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true')
\ No newline at end of file
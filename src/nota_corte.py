@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+import numpy as np
+from database import obter_pool
+
+# Notas são percentuais (0 a 100) agrupadas em faixas desta largura
+NOTA_CORTE_RESOLUCAO = float(os.getenv('NOTA_CORTE_RESOLUCAO', 0.1))
+# Com que frequência (segundos) cada processo relê as contagens gravadas pelos demais
+NOTA_CORTE_SINCRONIZACAO = float(os.getenv('NOTA_CORTE_SINCRONIZACAO', 5))
+# Percentil usado como nota de corte quando a requisição não informa outro
+NOTA_CORTE_PERCENTIL = float(os.getenv('NOTA_CORTE_PERCENTIL', 80))
+
+def faixa_da_nota(nota, resolucao):
+    return int(round(min(max(float(nota), 0.0), 100.0) / resolucao))
+
+class SketchNotas:
+    """Distribuição de notas (0 a 100) em faixas fixas de largura `resolucao`.
+
+    Quantis e percentis saem das contagens acumuladas em O(1) (o acumulado
+    é recalculado uma vez após cada alteração), com erro de no máximo uma
+    faixa. Dois sketches com a mesma resolução se combinam somando as
+    contagens, então o resultado não depende de como as notas foram
+    divididas entre processos.
+    """
+
+    def __init__(self, resolucao=None, contagens=None):
+        self.resolucao = resolucao or NOTA_CORTE_RESOLUCAO
+        self.faixas = int(round(100 / self.resolucao)) + 1
+        self.contagens = np.zeros(self.faixas, dtype=np.int64) if contagens is None else contagens
+        self._acumulado = None
+
+    def adicionar(self, nota, quantidade=1):
+        self.contagens[faixa_da_nota(nota, self.resolucao)] += quantidade
+        self._acumulado = None
+
+    def mesclar(self, outro):
+        if outro.faixas != self.faixas:
+            raise ValueError("Sketches com resoluções diferentes não podem ser combinados")
+        self.contagens += outro.contagens
+        self._acumulado = None
+
+    @property
+    def total(self):
+        return int(self.acumulado[-1])
+
+    @property
+    def acumulado(self):
+        if self._acumulado is None:
+            self._acumulado = np.cumsum(self.contagens)
+        return self._acumulado
+
+    def quantil(self, fracao):
+        """Menor nota com ao menos `fracao` (0 a 1) das notas abaixo ou iguais a ela"""
+        if self.total == 0:
+            return None
+        alvo = max(1, int(np.ceil(fracao * self.total)))
+        return round(int(np.searchsorted(self.acumulado, alvo)) * self.resolucao, 6)
+
+    def percentil(self, nota):
+        """Percentual de notas abaixo de `nota` (empates contam pela metade)"""
+        if self.total == 0:
+            return None
+        faixa = faixa_da_nota(nota, self.resolucao)
+        abaixo = int(self.acumulado[faixa - 1]) if faixa > 0 else 0
+        return (abaixo + int(self.contagens[faixa]) / 2) / self.total * 100
+
+class NotasCorte:
+    """Notas de corte simuladas por segmento (geral, cargo, bloco, região).
+
+    Cada resultado de simulado incrementa a faixa da nota na tabela
+    `notas_corte` (uma linha por segmento e faixa) e no sketch em memória.
+    O sketch de cada segmento é relido do banco a cada `intervalo`
+    segundos, o que incorpora as notas registradas pelos outros processos;
+    após um reinício basta ler as contagens, sem reprocessar resultados.
+    """
+
+    def __init__(self, db_path="planos.db", resolucao=None, intervalo=None):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.resolucao = resolucao or NOTA_CORTE_RESOLUCAO
+        self.intervalo = intervalo if intervalo is not None else NOTA_CORTE_SINCRONIZACAO
+        self._sketches = {}
+        self._lock = threading.Lock()
+        self.registradas = 0
+        self.init_database()
+
+    def init_database(self):
+        """Cria a tabela de contagens por faixa de nota"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS notas_corte (
+                    segmento TEXT NOT NULL,
+                    resolucao REAL NOT NULL,
+                    faixa INTEGER NOT NULL,
+                    quantidade INTEGER NOT NULL,
+                    PRIMARY KEY (segmento, resolucao, faixa)
+                ) WITHOUT ROWID
+            """)
+
+    def _carregar(self, segmento):
+        sketch = SketchNotas(self.resolucao)
+        with self.pool.conexao() as conn:
+            rows = conn.execute("""
+                SELECT faixa, quantidade FROM notas_corte WHERE segmento = ? AND resolucao = ?
+            """, (segmento, self.resolucao)).fetchall()
+        if rows:
+            faixas, quantidades = zip(*rows)
+            sketch.contagens[list(faixas)] = quantidades
+        return sketch
+
+    def sketch(self, segmento):
+        """Sketch do segmento, relido do banco se tiver mais de `intervalo` segundos"""
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._sketches.get(segmento)
+        if entrada is not None and agora - entrada[1] < self.intervalo:
+            return entrada[0]
+
+        sketch = self._carregar(segmento)
+        with self._lock:
+            self._sketches[segmento] = (sketch, agora)
+        return sketch
+
+    def registrar(self, nota, segmentos):
+        """Soma uma nota (0 a 100) a cada segmento informado"""
+        faixa = faixa_da_nota(nota, self.resolucao)
+        with self.pool.conexao() as conn:
+            conn.executemany("""
+                INSERT INTO notas_corte (segmento, resolucao, faixa, quantidade) VALUES (?, ?, ?, 1)
+                ON CONFLICT (segmento, resolucao, faixa) DO UPDATE SET quantidade = quantidade + 1
+            """, [(segmento, self.resolucao, faixa) for segmento in segmentos])
+
+        with self._lock:
+            for segmento in segmentos:
+                entrada = self._sketches.get(segmento)
+                if entrada is not None:
+                    entrada[0].adicionar(nota)
+            self.registradas += 1
+
+    def estimar(self, segmento, percentil=None, nota=None):
+        """Nota de corte (nota no `percentil`), quartis e, com `nota`, o percentil dela no segmento"""
+        percentil = percentil if percentil is not None else NOTA_CORTE_PERCENTIL
+        if not 0 <= percentil <= 100:
+            raise ValueError("Percentil deve estar entre 0 e 100")
+        sketch = self.sketch(segmento)
+        with self._lock:
+            resposta = {
+                "segmento": segmento,
+                "total_resultados": sketch.total,
+                "percentil_corte": percentil,
+                "nota_corte": sketch.quantil(percentil / 100),
+                "quartis": {
+                    "p25": sketch.quantil(0.25),
+                    "p50": sketch.quantil(0.5),
+                    "p75": sketch.quantil(0.75)
+                }
+            }
+            if nota is not None:
+                resposta["nota"] = nota
+                resposta["percentil"] = sketch.percentil(nota)
+                resposta["acima_do_corte"] = resposta["nota_corte"] is not None and nota >= resposta["nota_corte"]
+        return resposta
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segmentos": len(self._sketches),
+                "registradas": self.registradas,
+                "resolucao": self.resolucao
+            }
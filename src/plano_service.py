@@ -1,18 +1,142 @@
-import sqlite3
 import json
+import base64
+import hashlib
 from datetime import datetime
 import os
+from database import obter_pool, aplicar_migracoes
+from progresso_buffer import BufferProgresso
+from catalogo_cache import CacheCatalogo
+
+# Migrações do schema de planos (aplicadas em ordem, uma única vez por banco)
+MIGRACOES_PLANOS = [
+    ('001_progresso_planos_unico', [
+        # Manter apenas o registro mais recente de cada (plano_id, user_id)
+        """
+            DELETE FROM progresso_planos
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM progresso_planos GROUP BY plano_id, user_id
+            )
+        """,
+        """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_progresso_planos_plano_user
+            ON progresso_planos (plano_id, user_id)
+        """
+    ]),
+    ('002_planos_indices_listagem', [
+        # Paginação por (created_at, id), com e sem filtro de cargo/nível
+        "CREATE INDEX IF NOT EXISTS idx_planos_created_id ON planos (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_planos_cargo_created_id ON planos (cargo, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_planos_nivel_created_id ON planos (nivel, created_at, id)"
+    ]),
+    ('003_catalogo_versao', [
+        # Versão do catálogo, incrementada por triggers a cada escrita em planos
+        """
+            CREATE TABLE IF NOT EXISTS catalogo_versao (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                versao INTEGER NOT NULL
+            )
+        """,
+        "INSERT OR IGNORE INTO catalogo_versao (id, versao) VALUES (1, 0)",
+        """
+            CREATE TRIGGER IF NOT EXISTS trg_planos_insert AFTER INSERT ON planos
+            BEGIN UPDATE catalogo_versao SET versao = versao + 1 WHERE id = 1; END
+        """,
+        """
+            CREATE TRIGGER IF NOT EXISTS trg_planos_update AFTER UPDATE ON planos
+            BEGIN UPDATE catalogo_versao SET versao = versao + 1 WHERE id = 1; END
+        """,
+        """
+            CREATE TRIGGER IF NOT EXISTS trg_planos_delete AFTER DELETE ON planos
+            BEGIN UPDATE catalogo_versao SET versao = versao + 1 WHERE id = 1; END
+        """
+    ]),
+    ('004_planos_fingerprint', [
+        # Impressão digital dos parâmetros dos planos gerados por IA
+        "ALTER TABLE planos ADD COLUMN fingerprint TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_planos_fingerprint ON planos (fingerprint)"
+    ])
+]
+
+# Por quanto tempo (segundos) um plano gerado por IA é reaproveitado para os mesmos parâmetros
+PLANOS_IA_VALIDADE = int(os.getenv('PLANOS_IA_VALIDADE', 30 * 24 * 3600))
+
+def calcular_fingerprint(cargo, tempo_disponivel, nivel, areas_foco):
+    """Hash dos parâmetros normalizados de geração de um plano"""
+    def normalizar(valor):
+        return ' '.join(str(valor or '').split()).casefold()
+    
+    parametros = [
+        normalizar(cargo),
+        normalizar(tempo_disponivel),
+        normalizar(nivel),
+        sorted({normalizar(area) for area in areas_foco or [] if normalizar(area)})
+    ]
+    return hashlib.sha256(json.dumps(parametros, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# Campos que podem ser pedidos na listagem de planos (?fields=)
+CAMPOS_LISTAGEM = ('id', 'titulo', 'descricao', 'cargo', 'nivel', 'tempo_disponivel', 'areas_foco', 'created_at')
+PLANOS_LIMITE_PADRAO = int(os.getenv('PLANOS_LIMITE_PADRAO', 50))
+PLANOS_LIMITE_MAXIMO = int(os.getenv('PLANOS_LIMITE_MAXIMO', 200))
+
+def serializar_json(dados):
+    """Serializa uma resposta em bytes JSON compactos"""
+    return json.dumps(dados, separators=(',', ':')).encode('utf-8')
+
+def codificar_cursor(created_at, plano_id):
+    """Gera o cursor opaco da próxima página"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, plano_id]).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    """Lê o cursor gerado por codificar_cursor"""
+    try:
+        created_at, plano_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return created_at, int(plano_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+SQL_UPSERT_PROGRESSO = """
+    INSERT INTO progresso_planos (plano_id, user_id, progresso, status)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (plano_id, user_id) DO UPDATE SET
+        progresso = excluded.progresso,
+        status = excluded.status,
+        last_activity = CURRENT_TIMESTAMP
+"""
 
 class PlanoService:
-    def __init__(self, db_path="planos.db"):
+    def __init__(self, db_path="planos.db", write_behind=None):
         self.db_path = db_path
+        self.pool = obter_pool(db_path)
         self.init_database()
+        
+        # Respostas JSON do catálogo já serializadas, invalidadas nas escritas
+        self.cache_catalogo = CacheCatalogo(
+            db_path,
+            max_entradas=int(os.getenv('PLANOS_CACHE_MAX_ENTRADAS', 1000)),
+            intervalo_verificacao=float(os.getenv('PLANOS_CACHE_VERIFICACAO', 1))
+        )
+        
+        # Buffer opcional que coalesce atualizações de progresso e grava em lote
+        if write_behind is None:
+            write_behind = os.getenv('PROGRESSO_WRITE_BEHIND', 'false').lower() == 'true'
+        self.buffer_progresso = BufferProgresso(
+            self.update_progresso_lote,
+            tamanho_max=int(os.getenv('PROGRESSO_BUFFER_TAMANHO', 500)),
+            intervalo=float(os.getenv('PROGRESSO_BUFFER_INTERVALO', 2))
+        ) if write_behind else None
     
     def init_database(self):
         """Inicializa o banco de dados SQLite"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.pool.conexao() as conn:
+            self._criar_tabelas(conn.cursor())
+        
+        aplicar_migracoes(self.pool, MIGRACOES_PLANOS)
         
+        # Inserir planos padrão se não existirem
+        self.insert_default_planos()
+    
+    def _criar_tabelas(self, cursor):
+        """Cria as tabelas de planos e progresso"""
         # Criar tabela de planos
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS planos (
@@ -41,18 +165,13 @@ class PlanoService:
                 FOREIGN KEY (plano_id) REFERENCES planos (id)
             )
         """)
-        
-        conn.commit()
-        conn.close()
-        
-        # Inserir planos padrão se não existirem
-        self.insert_default_planos()
     
     def insert_default_planos(self):
         """Insere planos padrão no banco de dados"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with self.pool.conexao() as conn:
+            self._inserir_planos_padrao(conn.cursor())
+    
+    def _inserir_planos_padrao(self, cursor):
         # Verificar se já existem planos
         cursor.execute("SELECT COUNT(*) FROM planos")
         count = cursor.fetchone()[0]
@@ -165,50 +284,87 @@ class PlanoService:
                     plano['tempo_disponivel'],
                     plano['areas_foco']
                 ))
-        
-        conn.commit()
-        conn.close()
     
-    def get_all_planos(self):
-        """Retorna todos os planos"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_all_planos(self, limite=None, cursor=None, cargo=None, nivel=None, campos=None):
+        """Retorna uma página de planos, do mais recente para o mais antigo.
         
-        cursor.execute("""
-            SELECT id, titulo, descricao, cargo, nivel, tempo_disponivel, areas_foco, created_at
-            FROM planos
-            ORDER BY created_at DESC
-        """)
+        A paginação é por keyset em (created_at, id): `cursor` é o valor
+        devolvido pela página anterior. Retorna (planos, proximo_cursor), com
+        proximo_cursor None na última página.
+        """
+        limite = min(max(int(limite or PLANOS_LIMITE_PADRAO), 1), PLANOS_LIMITE_MAXIMO)
+        
+        campos = list(campos or CAMPOS_LISTAGEM)
+        invalidos = [c for c in campos if c not in CAMPOS_LISTAGEM]
+        if invalidos:
+            raise ValueError(f"Campos inválidos: {', '.join(invalidos)}")
+        # id e created_at são sempre lidos para montar o cursor
+        colunas = list(dict.fromkeys(['id', 'created_at'] + campos))
+        
+        condicoes = []
+        parametros = []
+        if cargo:
+            condicoes.append("cargo = ?")
+            parametros.append(cargo)
+        if nivel:
+            condicoes.append("nivel = ?")
+            parametros.append(nivel)
+        if cursor:
+            condicoes.append("(created_at, id) < (?, ?)")
+            parametros.extend(decodificar_cursor(cursor))
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        
+        with self.pool.conexao() as conn:
+            rows = conn.execute(f"""
+                SELECT {', '.join(colunas)}
+                FROM planos
+                {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, parametros + [limite + 1]).fetchall()
+        
+        proximo_cursor = None
+        if len(rows) > limite:
+            rows = rows[:limite]
+            proximo_cursor = codificar_cursor(rows[-1][1], rows[-1][0])
         
         planos = []
-        for row in cursor.fetchall():
-            plano = {
-                "id": row[0],
-                "titulo": row[1],
-                "descricao": row[2],
-                "cargo": row[3],
-                "nivel": row[4],
-                "tempo_disponivel": row[5],
-                "areas_foco": json.loads(row[6]) if row[6] else [],
-                "created_at": row[7]
-            }
-            planos.append(plano)
+        for row in rows:
+            valores = dict(zip(colunas, row))
+            if 'areas_foco' in valores:
+                valores['areas_foco'] = json.loads(valores['areas_foco']) if valores['areas_foco'] else []
+            planos.append({campo: valores[campo] for campo in campos})
+        
+        return planos, proximo_cursor
+    
+    def get_all_planos_json(self, limite=None, cursor=None, cargo=None, nivel=None, campos=None):
+        """Versão em cache de get_all_planos: retorna (corpo_json_bytes, etag, proximo_cursor)"""
+        chave = ('lista', limite, cursor, cargo, nivel, tuple(campos) if campos else None)
+        
+        def carregar():
+            planos, proximo_cursor = self.get_all_planos(limite, cursor, cargo, nivel, campos)
+            return serializar_json(planos), proximo_cursor
         
-        conn.close()
-        return planos
+        return self.cache_catalogo.obter(chave, carregar)
+    
+    def get_plano_json(self, plano_id):
+        """Versão em cache de get_plano_by_id: retorna (corpo_json_bytes, etag) ou None"""
+        def carregar():
+            plano = self.get_plano_by_id(plano_id)
+            return (serializar_json(plano), None) if plano else None
+        
+        entrada = self.cache_catalogo.obter(('plano', plano_id), carregar)
+        return entrada[:2] if entrada else None
     
     def get_plano_by_id(self, plano_id):
         """Retorna um plano específico"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.pool.conexao() as conn:
+            row = conn.execute("""
+                SELECT id, titulo, descricao, conteudo, cargo, nivel, tempo_disponivel, areas_foco, created_at
+                FROM planos
+                WHERE id = ?
+            """, (plano_id,)).fetchone()
         
-        cursor.execute("""
-            SELECT id, titulo, descricao, conteudo, cargo, nivel, tempo_disponivel, areas_foco, created_at
-            FROM planos
-            WHERE id = ?
-        """, (plano_id,))
-        
-        row = cursor.fetchone()
         if row:
             plano = {
                 "id": row[0],
@@ -221,88 +377,123 @@ class PlanoService:
                 "areas_foco": json.loads(row[7]) if row[7] else [],
                 "created_at": row[8]
             }
-            conn.close()
             return plano
         
-        conn.close()
         return None
     
     def create_plano(self, plano_data):
         """Cria um novo plano"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.pool.conexao() as conn:
+            cursor = conn.execute("""
+                INSERT INTO planos (titulo, descricao, conteudo, cargo, nivel, tempo_disponivel, areas_foco)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                plano_data.get('titulo', ''),
+                plano_data.get('descricao', ''),
+                json.dumps(plano_data.get('conteudo', {})),
+                plano_data.get('cargo', ''),
+                plano_data.get('nivel', ''),
+                plano_data.get('tempo_disponivel', ''),
+                json.dumps(plano_data.get('areas_foco', []))
+            ))
+            plano_id = cursor.lastrowid
         
-        cursor.execute("""
-            INSERT INTO planos (titulo, descricao, conteudo, cargo, nivel, tempo_disponivel, areas_foco)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            plano_data.get('titulo', ''),
-            plano_data.get('descricao', ''),
-            json.dumps(plano_data.get('conteudo', {})),
-            plano_data.get('cargo', ''),
-            plano_data.get('nivel', ''),
-            plano_data.get('tempo_disponivel', ''),
-            json.dumps(plano_data.get('areas_foco', []))
-        ))
+        self.cache_catalogo.invalidar()
+        return plano_id
+    
+    def get_plano_por_fingerprint(self, fingerprint, validade=None):
+        """Retorna o plano gerado com esses parâmetros, se ainda estiver dentro da validade"""
+        validade = PLANOS_IA_VALIDADE if validade is None else validade
+        with self.pool.conexao() as conn:
+            row = conn.execute("""
+                SELECT id FROM planos
+                WHERE fingerprint = ? AND updated_at >= datetime('now', ?)
+            """, (fingerprint, f'-{int(validade)} seconds')).fetchone()
         
-        plano_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        return self.get_plano_by_id(row[0]) if row else None
+    
+    def salvar_plano_gerado(self, plano_data, fingerprint):
+        """Grava um plano gerado por IA como uma nova linha.
+
+        O plano anterior com o mesmo fingerprint perde o fingerprint mas continua
+        existindo, para não alterar planos que usuários já acompanham.
+        """
+        with self.pool.conexao() as conn:
+            conn.execute("UPDATE planos SET fingerprint = NULL WHERE fingerprint = ?", (fingerprint,))
+            cursor = conn.execute("""
+                INSERT INTO planos (titulo, descricao, conteudo, cargo, nivel, tempo_disponivel, areas_foco, fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                plano_data.get('titulo', ''),
+                plano_data.get('descricao', ''),
+                json.dumps(plano_data.get('conteudo', {})),
+                plano_data.get('cargo', ''),
+                plano_data.get('nivel', ''),
+                plano_data.get('tempo_disponivel', ''),
+                json.dumps(plano_data.get('areas_foco', [])),
+                fingerprint
+            ))
+            plano_id = cursor.lastrowid
         
+        self.cache_catalogo.invalidar()
         return plano_id
     
     def update_progresso(self, plano_id, user_id, progresso, status='em_andamento'):
         """Atualiza o progresso de um plano"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Verificar se já existe registro de progresso
-        cursor.execute("""
-            SELECT id FROM progresso_planos
-            WHERE plano_id = ? AND user_id = ?
-        """, (plano_id, user_id))
+        with self.pool.conexao() as conn:
+            # Upsert em um único comando, usando o índice único (plano_id, user_id)
+            conn.execute(SQL_UPSERT_PROGRESSO, (plano_id, user_id, progresso, status))
+    
+    def update_progresso_lote(self, atualizacoes, adiar=False):
+        """Aplica várias atualizações de progresso em uma única transação.
         
-        existing = cursor.fetchone()
+        Com `adiar=True` e o buffer write-behind ativo, as atualizações são
+        apenas enfileiradas e gravadas depois, coalescidas por (plano_id, user_id).
+        Retorna quantas atualizações foram aceitas.
+        """
+        parametros = []
+        for i, item in enumerate(atualizacoes):
+            try:
+                parametros.append((
+                    int(item['plano_id']),
+                    str(item['user_id']),
+                    float(item['progresso']),
+                    item.get('status', 'em_andamento')
+                ))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Atualização {i} inválida: requer plano_id, user_id e progresso")
         
-        if existing:
-            # Atualizar registro existente
-            cursor.execute("""
-                UPDATE progresso_planos
-                SET progresso = ?, status = ?, last_activity = CURRENT_TIMESTAMP
-                WHERE plano_id = ? AND user_id = ?
-            """, (progresso, status, plano_id, user_id))
-        else:
-            # Criar novo registro
-            cursor.execute("""
-                INSERT INTO progresso_planos (plano_id, user_id, progresso, status)
-                VALUES (?, ?, ?, ?)
-            """, (plano_id, user_id, progresso, status))
+        if adiar and self.buffer_progresso:
+            for plano_id, user_id, progresso, status in parametros:
+                self.buffer_progresso.adicionar(plano_id, user_id, progresso, status)
+            return len(parametros)
         
-        conn.commit()
-        conn.close()
+        with self.pool.conexao() as conn:
+            conn.executemany(SQL_UPSERT_PROGRESSO, parametros)
+        return len(parametros)
     
     def get_progresso(self, plano_id, user_id):
         """Retorna o progresso de um plano para um usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self.buffer_progresso:
+            pendente = self.buffer_progresso.pendente(plano_id, user_id)
+            if pendente:
+                return {"progresso": pendente[0], "status": pendente[1], "last_activity": pendente[2]}
         
-        cursor.execute("""
-            SELECT progresso, status, last_activity
-            FROM progresso_planos
-            WHERE plano_id = ? AND user_id = ?
-        """, (plano_id, user_id))
+        with self.pool.conexao() as conn:
+            row = conn.execute("""
+                SELECT progresso, status, last_activity
+                FROM progresso_planos
+                WHERE plano_id = ? AND user_id = ?
+            """, (plano_id, user_id)).fetchone()
         
-        row = cursor.fetchone()
         if row:
             progresso = {
                 "progresso": row[0],
                 "status": row[1],
                 "last_activity": row[2]
             }
-            conn.close()
             return progresso
         
-        conn.close()
         return {"progresso": 0.0, "status": "nao_iniciado", "last_activity": None}
     
     def get_current_timestamp(self):
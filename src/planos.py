@@ -1,23 +1,51 @@
-from flask import Blueprint, jsonify, request
-import openai
-import os
+from flask import Blueprint, Response, jsonify, request
 from dotenv import load_dotenv
-from plano_service import PlanoService
+from plano_service import PlanoService, calcular_fingerprint
+from single_flight import SingleFlight
+from llm_client import chat_completion, chat_completion_async
+from database import executar_db
+from streaming import quer_streaming, evento_sse, resposta_sse, stream_chat_completion
+from jobs import fila_jobs, quer_assincrono, resposta_job
+from autenticacao import requer_autenticacao
 
 load_dotenv()
 
 planos_bp = Blueprint('planos', __name__)
 plano_service = PlanoService()
+geracoes_planos = SingleFlight()
 
-# Configurar OpenAI
-openai.api_key = os.getenv('OPENAI_API_KEY')
+def resposta_json_cacheavel(corpo, etag):
+    """Resposta com JSON já serializado e ETag; 304 se o cliente já tiver essa versão"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(corpo, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @planos_bp.route('/planos', methods=['GET'])
 def get_planos():
-    """Retorna todos os planos disponíveis"""
+    """Retorna os planos disponíveis, paginados.
+    
+    Query params: limit, cursor, cargo, nivel e fields (lista separada por vírgulas).
+    O cursor da próxima página vem no header X-Proximo-Cursor.
+    """
     try:
-        planos = plano_service.get_all_planos()
-        return jsonify(planos)
+        fields = request.args.get('fields')
+        corpo, etag, proximo_cursor = plano_service.get_all_planos_json(
+            limite=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            cargo=request.args.get('cargo'),
+            nivel=request.args.get('nivel'),
+            campos=[f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        )
+        response = resposta_json_cacheavel(corpo, etag)
+        if proximo_cursor:
+            response.headers['X-Proximo-Cursor'] = proximo_cursor
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -25,113 +53,257 @@ def get_planos():
 def get_plano(plano_id):
     """Retorna um plano específico"""
     try:
-        plano = plano_service.get_plano_by_id(plano_id)
+        plano = plano_service.get_plano_json(plano_id)
         if plano:
-            return jsonify(plano)
+            return resposta_json_cacheavel(*plano)
         return jsonify({"error": "Plano não encontrado"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@planos_bp.route('/planos/gerar', methods=['POST'])
-def gerar_plano_ia():
-    """Gera um plano de estudos personalizado usando IA"""
+@planos_bp.route('/planos/progresso/lote', methods=['POST'])
+def atualizar_progresso_lote():
+    """Recebe várias atualizações de progresso e as grava em uma única transação"""
     try:
         data = request.json
-        cargo = data.get('cargo', '')
-        tempo_disponivel = data.get('tempo_disponivel', '')
-        nivel = data.get('nivel', 'iniciante')
-        areas_foco = data.get('areas_foco', [])
-        
-        # Prompt para o ChatGPT
-        prompt = f"""
-        Crie um plano de estudos detalhado para concurso público na área da saúde.
+        atualizacoes = data.get('atualizacoes', [])
+        if not isinstance(atualizacoes, list) or not atualizacoes:
+            return jsonify({"error": "Nenhuma atualização fornecida"}), 400
         
-        Informações:
-        - Cargo: {cargo}
-        - Tempo disponível: {tempo_disponivel}
-        - Nível: {nivel}
-        - Áreas de foco: {', '.join(areas_foco)}
+        aceitas = plano_service.update_progresso_lote(atualizacoes, adiar=data.get('adiar', True))
         
-        O plano deve incluir:
-        1. Cronograma semanal
-        2. Distribuição de matérias
-        3. Metas semanais
-        4. Dicas de estudo
-        5. Recursos recomendados
+        resposta = {"atualizacoes": aceitas}
+        if plano_service.buffer_progresso:
+            resposta["buffer"] = plano_service.buffer_progresso.stats()
+        return jsonify(resposta)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def dados_plano(data):
+    """Extrai do corpo da requisição os parâmetros de geração de um plano"""
+    return (
+        data.get('cargo', ''),
+        data.get('tempo_disponivel', ''),
+        data.get('nivel', 'iniciante'),
+        data.get('areas_foco', [])
+    )
+
+def parametros_plano(cargo, tempo_disponivel, nivel, areas_foco):
+    """Monta a chamada à IA que gera um plano de estudos"""
+    # Prompt para o ChatGPT
+    prompt = f"""
+    Crie um plano de estudos detalhado para concurso público na área da saúde.
+    
+    Informações:
+    - Cargo: {cargo}
+    - Tempo disponível: {tempo_disponivel}
+    - Nível: {nivel}
+    - Áreas de foco: {', '.join(areas_foco)}
+    
+    O plano deve incluir:
+    1. Cronograma semanal
+    2. Distribuição de matérias
+    3. Metas semanais
+    4. Dicas de estudo
+    5. Recursos recomendados
+    
+    Formato: JSON com estrutura clara e organizada.
+    """
+    
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "Você é um especialista em concursos públicos da área da saúde. Crie planos de estudo personalizados e eficazes."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=2000,
+        temperature=0.7
+    )
+
+def salvar_plano(plano_gerado, cargo, tempo_disponivel, nivel, areas_foco, fingerprint):
+    """Grava o plano gerado pela IA e o retorna com o id"""
+    novo_plano = {
+        "titulo": f"Plano para {cargo}",
+        "descricao": f"Plano personalizado para {cargo} - {nivel}",
+        "conteudo": plano_gerado,
+        "cargo": cargo,
+        "nivel": nivel,
+        "tempo_disponivel": tempo_disponivel,
+        "areas_foco": areas_foco
+    }
+    
+    plano_id = plano_service.salvar_plano_gerado(novo_plano, fingerprint)
+    novo_plano['id'] = plano_id
+    novo_plano['reutilizado'] = False
+    return novo_plano
+
+def plano_existente(data):
+    """Calcula o fingerprint do pedido e busca um plano recente com os mesmos parâmetros"""
+    dados = dados_plano(data)
+    fingerprint = calcular_fingerprint(*dados)
+    
+    existente = None if data.get('force_new', False) else plano_service.get_plano_por_fingerprint(fingerprint)
+    if existente:
+        existente['reutilizado'] = True
+    return dados, fingerprint, existente
+
+def gerar_novo_plano(dados, fingerprint, force_new=False):
+    """Chama a IA e grava o plano; não consulta planos existentes"""
+    def gerar_e_salvar():
+        response = chat_completion(**parametros_plano(*dados))
         
-        Formato: JSON com estrutura clara e organizada.
-        """
+        plano_gerado = response.choices[0].message.content
         
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Você é um especialista em concursos públicos da área da saúde. Crie planos de estudo personalizados e eficazes."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
-        )
+        return salvar_plano(plano_gerado, *dados, fingerprint)
+    
+    # Pedidos idênticos simultâneos compartilham a mesma geração
+    if force_new:
+        return gerar_e_salvar()
+    return geracoes_planos.executar(fingerprint, gerar_e_salvar)
+
+def gerar_plano(data):
+    """Gera (ou reaproveita) um plano de estudos; usado pela fila de jobs"""
+    dados, fingerprint, existente = plano_existente(data)
+    if existente:
+        return existente
+    return gerar_novo_plano(dados, fingerprint, data.get('force_new', False))
+
+@planos_bp.route('/planos/gerar', methods=['POST'])
+@requer_autenticacao(opcional=True)
+def gerar_plano_ia():
+    """Gera um plano de estudos personalizado usando IA"""
+    try:
+        data = request.json
+        # Reaproveitar um plano recente gerado com os mesmos parâmetros
+        dados, fingerprint, existente = plano_existente(data)
         
-        plano_gerado = response.choices[0].message.content
+        if quer_streaming(request, data):
+            def eventos():
+                try:
+                    if existente:
+                        yield evento_sse('fim', existente)
+                        return
+                    partes = []
+                    for trecho in stream_chat_completion(**parametros_plano(*dados)):
+                        partes.append(trecho)
+                        yield evento_sse('token', {"conteudo": trecho})
+                    yield evento_sse('fim', salvar_plano(''.join(partes), *dados, fingerprint))
+                except Exception as e:
+                    yield evento_sse('erro', {"error": str(e)})
+            return resposta_sse(eventos())
         
-        # Salvar o plano gerado
-        novo_plano = {
-            "titulo": f"Plano para {cargo}",
-            "descricao": f"Plano personalizado para {cargo} - {nivel}",
-            "conteudo": plano_gerado,
-            "cargo": cargo,
-            "nivel": nivel,
-            "tempo_disponivel": tempo_disponivel,
-            "areas_foco": areas_foco
-        }
+        if existente:
+            return jsonify(existente)
         
-        plano_id = plano_service.create_plano(novo_plano)
-        novo_plano['id'] = plano_id
+        if quer_assincrono(request, data):
+            return resposta_job('planos.gerar', data)
         
-        return jsonify(novo_plano)
+        return jsonify(gerar_novo_plano(dados, fingerprint, data.get('force_new', False)))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def parametros_sugestoes(desempenho, areas_dificuldade):
+    """Monta a chamada à IA que sugere estudos a partir do desempenho"""
+    prompt = f"""
+    Baseado no desempenho do usuário, forneça sugestões de estudo:
+    
+    Desempenho atual: {desempenho}
+    Áreas de dificuldade: {', '.join(areas_dificuldade)}
+    
+    Forneça:
+    1. 3 sugestões específicas de estudo
+    2. Recursos recomendados
+    3. Cronograma de revisão
+    4. Técnicas de memorização
+    
+    Resposta em formato JSON.
+    """
+    
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "Você é um tutor especializado em concursos da área da saúde. Forneça sugestões personalizadas de estudo."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=1500,
+        temperature=0.7
+    )
+
+def gerar_sugestoes(data):
+    """Gera sugestões de estudo; usado pela rota e pela fila de jobs"""
+    response = chat_completion(**parametros_sugestoes(data.get('desempenho', {}), data.get('areas_dificuldade', [])))
+    
+    sugestoes = response.choices[0].message.content
+    
+    return {
+        "sugestoes": sugestoes,
+        "timestamp": plano_service.get_current_timestamp()
+    }
+
 @planos_bp.route('/planos/sugestoes', methods=['POST'])
+@requer_autenticacao(opcional=True)
 def get_sugestoes():
     """Retorna sugestões de estudo baseadas no desempenho"""
     try:
         data = request.json
-        desempenho = data.get('desempenho', {})
-        areas_dificuldade = data.get('areas_dificuldade', [])
-        
-        prompt = f"""
-        Baseado no desempenho do usuário, forneça sugestões de estudo:
         
-        Desempenho atual: {desempenho}
-        Áreas de dificuldade: {', '.join(areas_dificuldade)}
+        if quer_streaming(request, data):
+            parametros = parametros_sugestoes(data.get('desempenho', {}), data.get('areas_dificuldade', []))
+            def eventos():
+                try:
+                    for trecho in stream_chat_completion(**parametros):
+                        yield evento_sse('token', {"conteudo": trecho})
+                    yield evento_sse('fim', {"timestamp": plano_service.get_current_timestamp()})
+                except Exception as e:
+                    yield evento_sse('erro', {"error": str(e)})
+            return resposta_sse(eventos())
         
-        Forneça:
-        1. 3 sugestões específicas de estudo
-        2. Recursos recomendados
-        3. Cronograma de revisão
-        4. Técnicas de memorização
+        if quer_assincrono(request, data):
+            return resposta_job('planos.sugestoes', data)
         
-        Resposta em formato JSON.
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Você é um tutor especializado em concursos da área da saúde. Forneça sugestões personalizadas de estudo."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.7
-        )
+        return jsonify(gerar_sugestoes(data))
         
-        sugestoes = response.choices[0].message.content
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Modo assíncrono (ASGI): mesmas gerações sem ocupar uma thread por chamada à IA
+
+async def gerar_plano_async(data):
+    """Versão assíncrona de gerar_plano"""
+    dados = dados_plano(data)
+    force_new = data.get('force_new', False)
+    fingerprint = calcular_fingerprint(*dados)
+    
+    if not force_new:
+        existente = await executar_db(plano_service.get_plano_por_fingerprint, fingerprint)
+        if existente:
+            existente['reutilizado'] = True
+            return existente
+    
+    async def gerar_e_salvar():
+        response = await chat_completion_async(**parametros_plano(*dados))
         
-        return jsonify({
-            "sugestoes": sugestoes,
-            "timestamp": plano_service.get_current_timestamp()
-        })
+        plano_gerado = response.choices[0].message.content
         
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return await executar_db(salvar_plano, plano_gerado, *dados, fingerprint)
+    
+    if force_new:
+        return await gerar_e_salvar()
+    return await geracoes_planos.executar_async(fingerprint, gerar_e_salvar)
+
+async def gerar_sugestoes_async(data):
+    """Versão assíncrona de gerar_sugestoes"""
+    response = await chat_completion_async(**parametros_sugestoes(data.get('desempenho', {}), data.get('areas_dificuldade', [])))
+    
+    sugestoes = response.choices[0].message.content
+    
+    return {
+        "sugestoes": sugestoes,
+        "timestamp": plano_service.get_current_timestamp()
+    }
+
+# Execução em segundo plano das gerações por IA
+fila_jobs.registrar('planos.gerar', gerar_plano, prioridade=5)
+fila_jobs.registrar('planos.sugestoes', gerar_sugestoes, prioridade=10)
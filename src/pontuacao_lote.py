@@ -0,0 +1,135 @@
+import numpy as np
+
+def _tabela_niveis(levels):
+    """Níveis e XP mínimo de cada um, em ordem crescente de XP"""
+    itens = sorted(levels.items(), key=lambda item: item[1]["xp_required"])
+    return np.array([nivel for nivel, _ in itens]), np.array([dados["xp_required"] for _, dados in itens])
+
+def _normalizar(resposta):
+    """Mesma normalização de SimuladoService.finalizar"""
+    return str(resposta or '').strip().upper()
+
+def _colunas(submissoes, gabarito):
+    """Achata as respostas de todas as submissões em colunas (submissão, área, correta)"""
+    # Chaves como texto: o gabarito vem de JSON (chaves str) e os ids das questões são int
+    chaves = {}
+    for questao_id, chave in (gabarito or {}).items():
+        if isinstance(chave, dict):
+            chaves[str(questao_id)] = (_normalizar(chave.get('resposta_correta')), chave.get('area'))
+        else:
+            chaves[str(questao_id)] = (_normalizar(chave), None)
+
+    contagens = []
+    areas = []
+    corretas = []
+    codigos_area = {}
+    codigo = codigos_area.setdefault
+    for submissao in submissoes:
+        respostas = submissao.get('respostas', [])
+        contagens.append(len(respostas))
+        for resposta in respostas:
+            if gabarito is None:
+                area = resposta.get('area', 'Geral')
+                corretas.append(bool(resposta.get('correta', False)))
+            else:
+                # Com gabarito, o "correta" do cliente nunca é usado: sem chave, conta como erro
+                chave = chaves.get(str(resposta.get('questao_id')), ('', None))
+                area = resposta.get('area') or chave[1] or 'Geral'
+                resposta_dada = _normalizar(resposta.get('resposta'))
+                corretas.append(bool(chave[0]) and resposta_dada == chave[0])
+            areas.append(codigo(area, len(codigos_area)))
+
+    return (
+        np.repeat(np.arange(len(submissoes)), contagens),
+        np.array(areas, dtype=np.int64),
+        np.array(corretas, dtype=bool),
+        list(codigos_area)
+    )
+
+def pontuar_lote(submissoes, levels, gabarito=None):
+    """Corrige várias submissões de uma vez, com operações em colunas (NumPy).
+
+    Cada submissão tem o formato do body de /jogos/resultado ("respostas",
+    "tempo_gasto" e, opcionalmente, "id"). Com `gabarito` ({questao_id:
+    resposta_correta} ou {questao_id: {"resposta_correta", "area"}}), todas
+    as respostas são corrigidas por ele pelo "questao_id" e pela "resposta"
+    (sem diferenciar maiúsculas e espaços), ignorando o "correta" enviado;
+    questões fora do gabarito contam como erro. Retorna os resultados na
+    mesma ordem, no formato de /jogos/resultado, e um resumo do lote.
+    """
+    n = len(submissoes)
+    indices, areas, corretas, nomes_areas = _colunas(submissoes, gabarito)
+    n_areas = max(len(nomes_areas), 1)
+
+    total = np.bincount(indices, minlength=n)
+    acertos = np.bincount(indices, weights=corretas, minlength=n).astype(np.int64)
+    celulas = indices * n_areas + areas
+    total_area = np.bincount(celulas, minlength=n * n_areas).reshape(n, n_areas)
+    acertos_area = np.bincount(celulas, weights=corretas, minlength=n * n_areas).reshape(n, n_areas).astype(np.int64)
+
+    # Mesmas regras de GamificationSystem.calculate_rewards
+    tempo = np.maximum(np.array([s.get('tempo_gasto', 0) for s in submissoes], dtype=np.float64), 0)
+    tempo_bonus = np.where(tempo < 3600, np.maximum(0, (3600 - tempo) // 60), 0)
+    com_questoes = total > 0
+    precisao = np.divide(acertos, total, out=np.zeros(n), where=com_questoes)
+    xp = np.trunc(acertos * 10 + precisao * 20 + tempo_bonus).astype(np.int64)
+    energia = np.select([precisao >= 0.8, precisao >= 0.6, precisao >= 0.4], [5, 2, 0], -3)
+
+    niveis, xp_minimo = _tabela_niveis(levels)
+    posicao = np.maximum(np.searchsorted(xp_minimo, xp, side='right') - 1, 0)
+    nivel = niveis[posicao]
+    proxima = np.minimum(posicao + 1, len(niveis) - 1)
+    xp_proximo = np.where(posicao < len(niveis) - 1, xp_minimo[proxima] - xp, 0)
+
+    percentual = precisao * 100
+    percentual_area = np.divide(acertos_area, total_area, out=np.zeros((n, n_areas)), where=total_area > 0) * 100
+    tempo_medio = np.divide(tempo, total, out=np.zeros(n), where=com_questoes)
+
+    # Listas Python de uma vez: converter escalares NumPy um a um é o gargalo aqui
+    linhas, colunas = np.nonzero(total_area)
+    por_submissao = [{} for _ in range(n)]
+    for i, a, acertos_i, total_i, percentual_i in zip(
+        linhas.tolist(), colunas.tolist(), acertos_area[linhas, colunas].tolist(),
+        total_area[linhas, colunas].tolist(), percentual_area[linhas, colunas].tolist()
+    ):
+        por_submissao[i][nomes_areas[a]] = {"acertos": acertos_i, "total": total_i, "percentual": percentual_i}
+
+    resultados = []
+    for submissao, areas_desempenho, total_i, acertos_i, percentual_i, tempo_medio_i, xp_i, energia_i, nivel_i, xp_proximo_i in zip(
+        submissoes, por_submissao, total.tolist(), acertos.tolist(), percentual.tolist(), tempo_medio.tolist(),
+        xp.tolist(), energia.tolist(), nivel.tolist(), xp_proximo.tolist()
+    ):
+        resultados.append({
+            "id": submissao.get('id'),
+            "estatisticas": {
+                "total_questoes": total_i,
+                "acertos": acertos_i,
+                "erros": total_i - acertos_i,
+                "percentual_acerto": percentual_i,
+                "tempo_gasto": submissao.get('tempo_gasto', 0),
+                "tempo_medio_por_questao": tempo_medio_i
+            },
+            "recompensas": {
+                "xp_gained": xp_i,
+                "energy_change": energia_i,
+                "accuracy": percentual_i
+            },
+            "areas_desempenho": areas_desempenho,
+            "nivel_atual": nivel_i,
+            "xp_proximo_nivel": xp_proximo_i
+        })
+
+    resumo = {
+        "submissoes": n,
+        "respostas": int(len(indices)),
+        "percentual_medio": float(percentual.mean()) if n else 0,
+        "percentual_mediano": float(np.median(percentual)) if n else 0,
+        "areas": {
+            nome: {
+                "acertos": int(acertos_area[:, a].sum()),
+                "total": int(total_area[:, a].sum())
+            }
+            for a, nome in enumerate(nomes_areas)
+        }
+    }
+    return resultados, resumo
@@ -0,0 +1,95 @@
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+
+class BufferProgresso:
+    """Buffer write-behind para atualizações de progresso.
+
+    Atualizações repetidas da mesma chave (plano_id, user_id) são
+    coalescidas em memória e gravadas em lote por `gravar_lote` quando o
+    buffer atinge `tamanho_max` chaves ou quando `intervalo` segundos se
+    passam desde a primeira atualização pendente.
+    """
+
+    def __init__(self, gravar_lote, tamanho_max=500, intervalo=2.0):
+        self.gravar_lote = gravar_lote
+        self.tamanho_max = tamanho_max
+        self.intervalo = intervalo
+        self._pendentes = {}
+        self._primeira = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._evento = threading.Event()
+        self.recebidas = 0
+        self.gravadas = 0
+        self.flushes = 0
+
+        self._thread = threading.Thread(target=self._loop, name="buffer-progresso", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def adicionar(self, plano_id, user_id, progresso, status):
+        """Enfileira uma atualização, substituindo a pendente da mesma chave"""
+        with self._lock:
+            self._pendentes[(plano_id, user_id)] = (progresso, status, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+            self.recebidas += 1
+            if self._primeira is None:
+                self._primeira = time.monotonic()
+            cheio = len(self._pendentes) >= self.tamanho_max
+        if cheio:
+            self._evento.set()
+
+    def pendente(self, plano_id, user_id):
+        """Retorna a atualização ainda não gravada para a chave, se houver"""
+        with self._lock:
+            return self._pendentes.get((plano_id, user_id))
+
+    def flush(self):
+        """Grava imediatamente todas as atualizações pendentes"""
+        with self._flush_lock:
+            with self._lock:
+                lote = self._pendentes
+                self._pendentes = {}
+                self._primeira = None
+            if not lote:
+                return 0
+
+            try:
+                self.gravar_lote([
+                    {"plano_id": plano_id, "user_id": user_id, "progresso": progresso, "status": status}
+                    for (plano_id, user_id), (progresso, status, _) in lote.items()
+                ])
+            except Exception as e:
+                # Devolver ao buffer o que não foi sobrescrito nesse meio tempo
+                with self._lock:
+                    for chave, valor in lote.items():
+                        self._pendentes.setdefault(chave, valor)
+                    if self._primeira is None:
+                        self._primeira = time.monotonic()
+                print(f"Erro ao gravar lote de progresso: {e}")
+                return 0
+
+            self.gravadas += len(lote)
+            self.flushes += 1
+            return len(lote)
+
+    def _loop(self):
+        while True:
+            self._evento.wait(timeout=self.intervalo / 2)
+            self._evento.clear()
+            with self._lock:
+                vencido = self._primeira is not None and time.monotonic() - self._primeira >= self.intervalo
+                cheio = len(self._pendentes) >= self.tamanho_max
+            if vencido or cheio:
+                self.flush()
+
+    def stats(self):
+        """Retorna contadores do buffer"""
+        with self._lock:
+            return {
+                "pendentes": len(self._pendentes),
+                "recebidas": self.recebidas,
+                "gravadas": self.gravadas,
+                "flushes": self.flushes
+            }
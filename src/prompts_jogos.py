@@ -251,4 +251,13 @@ TEMPLATES_SIMULADOS = {
         },
         'tempo_limite': 90  # 1.5 horas
     }
-}
\ No newline at end of file
+}
+
+# Temas e dificuldades que a reposição em segundo plano do banco de questões
+# pode gerar; pedidos com outros valores são atendidos ao vivo, sem reposição
+TEMAS_QUESTOES = [
+    'SUS', 'Saúde Pública', 'Epidemiologia', 'Enfermagem', 'Ética',
+    'Português', 'Matemática', 'Informática', 'Atualidades', 'Área Específica'
+]
+
+DIFICULDADES_QUESTOES = ['facil', 'medio', 'dificil']
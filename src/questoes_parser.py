@@ -0,0 +1,384 @@
+import json
+import re
+from dataclasses import dataclass, field, asdict
+
+# Parser e validação das questões geradas pela IA (formatos de prompts_jogos.py)
+
+LETRAS = ('A', 'B', 'C', 'D', 'E')
+
+class QuestaoInvalida(ValueError):
+    """Questão que não pôde ser reparada para o formato esperado"""
+
+@dataclass(slots=True)
+class QuestaoMultiplaEscolha:
+    enunciado: str
+    alternativas: dict
+    resposta_correta: str
+    explicacao: str = ''
+    tema: str = ''
+    dificuldade: str = ''
+    referencias: str = ''
+
+@dataclass(slots=True)
+class QuestaoVerdadeiroFalso:
+    afirmacao: str
+    resposta_correta: str
+    justificativa: str = ''
+    tema: str = ''
+    dificuldade: str = ''
+    referencias: str = ''
+
+@dataclass(slots=True)
+class QuestaoAssociacao:
+    instrucao: str
+    coluna_a: list
+    coluna_b: list
+    gabarito: dict
+    explicacao: str = ''
+    tema: str = ''
+    dificuldade: str = ''
+
+@dataclass(slots=True)
+class QuestaoCasoClinico:
+    caso_clinico: str
+    pergunta: str
+    alternativas: dict
+    resposta_correta: str
+    discussao: str = ''
+    tema: str = ''
+    dificuldade: str = ''
+
+@dataclass(slots=True)
+class QuestaoCalculo:
+    situacao: str
+    pergunta: str
+    alternativas: dict
+    resposta_correta: str
+    dados: str = ''
+    resolucao: str = ''
+    tema: str = ''
+    dificuldade: str = ''
+
+@dataclass(slots=True)
+class QuestaoSimulado:
+    pergunta: str
+    alternativas: dict
+    resposta_correta: str
+    explicacao: str = ''
+
+@dataclass(slots=True)
+class ResultadoParse:
+    questoes: list = field(default_factory=list)
+    erros: list = field(default_factory=list)
+
+    @property
+    def invalidas(self):
+        return len(self.erros)
+
+def questao_para_dict(questao):
+    """Converte um registro de questão em dict serializável"""
+    return asdict(questao)
+
+# ---------------------------------------------------------------------------
+# Reparo de JSON
+# ---------------------------------------------------------------------------
+
+_CERCA_MARKDOWN = re.compile(r'```(?:json)?', re.IGNORECASE)
+_VIRGULA_SOBRANDO = re.compile(r',\s*([}\]])')
+_ASPAS_CURVAS = str.maketrans({'“': '"', '”': '"', '„': '"'})
+_LITERAIS_PYTHON = re.compile(r'(?<=[:\[,\s])(True|False|None)(?=\s*[,}\]])')
+
+def _carregar_json(texto):
+    """Tenta json.loads aplicando reparos progressivos para erros comuns da IA"""
+    texto = texto.strip()
+    tentativas = (
+        lambda t: t,
+        lambda t: _VIRGULA_SOBRANDO.sub(r'\1', t),
+        lambda t: _VIRGULA_SOBRANDO.sub(r'\1', t.translate(_ASPAS_CURVAS)),
+        lambda t: _LITERAIS_PYTHON.sub(
+            lambda m: {'True': 'true', 'False': 'false', 'None': 'null'}[m.group(1)],
+            _VIRGULA_SOBRANDO.sub(r'\1', t.translate(_ASPAS_CURVAS))
+        ),
+    )
+    ultimo_erro = None
+    for reparo in tentativas:
+        try:
+            return json.loads(reparo(texto))
+        except ValueError as e:
+            ultimo_erro = e
+    raise QuestaoInvalida(f"JSON inválido: {ultimo_erro}")
+
+class ExtratorIncremental:
+    """Extrai os objetos da lista de questões à medida que o texto chega.
+
+    Procura o array de questões (a chave "questoes" ou o primeiro "[") e
+    devolve o texto de cada objeto de primeiro nível assim que ele fecha,
+    o que permite aproveitar respostas truncadas e processar streaming.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._dentro_array = False
+        self._fim = False
+        self._profundidade = 0
+        self._inicio_objeto = None
+        self._em_string = False
+        self._escape = False
+
+    def alimentar(self, trecho):
+        """Adiciona texto e retorna a lista de objetos completos encontrados"""
+        self._buffer += trecho
+        objetos = []
+        if self._fim:
+            return objetos
+
+        if not self._dentro_array:
+            inicio = self._localizar_array()
+            if inicio is None:
+                return objetos
+            self._dentro_array = True
+            self._pos = inicio
+
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            c = buffer[i]
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._em_string = False
+            elif c == '"':
+                self._em_string = True
+            elif c in '{[':
+                if self._profundidade == 0 and c == '{':
+                    self._inicio_objeto = i
+                self._profundidade += 1
+            elif c in '}]':
+                self._profundidade -= 1
+                if self._profundidade == 0 and self._inicio_objeto is not None:
+                    objetos.append(buffer[self._inicio_objeto:i + 1])
+                    self._inicio_objeto = None
+                elif self._profundidade < 0:
+                    self._fim = True
+                    break
+            i += 1
+        self._pos = i
+
+        # Descartar o que já foi processado para não crescer sem limite
+        corte = self._inicio_objeto if self._inicio_objeto is not None else self._pos
+        self._buffer = self._buffer[corte:]
+        self._pos -= corte
+        if self._inicio_objeto is not None:
+            self._inicio_objeto = 0
+        return objetos
+
+    def _localizar_array(self):
+        chave = re.search(r'"questoes"\s*:\s*\[', self._buffer)
+        if chave:
+            return chave.end()
+        # Sem a chave, aceitar apenas um array no topo; um "{" inicial pode ser
+        # o começo de {"questoes": [...]} que ainda não chegou por completo
+        inicio = re.search(r'[\[{]', self._buffer)
+        if inicio and inicio.group(0) == '[':
+            return inicio.end()
+        return None
+
+# ---------------------------------------------------------------------------
+# Normalização e validação
+# ---------------------------------------------------------------------------
+
+# Só a letra, opcionalmente seguida de ')', '.' ou '-' (ex.: "B", "b)", "C.")
+_LETRA_RESPOSTA = re.compile(r'^([A-E])\s*[\)\.\-]?$')
+_PREFIXO_ALTERNATIVA = re.compile(r'^\s*[A-Ea-e]\s*[\)\.\-:]\s+')
+
+def _texto(dados, *chaves, obrigatorio=True):
+    for chave in chaves:
+        valor = dados.get(chave)
+        if isinstance(valor, (str, int, float)) and str(valor).strip():
+            return str(valor).strip()
+    if obrigatorio:
+        raise QuestaoInvalida(f"Campo obrigatório ausente: {chaves[0]}")
+    return ''
+
+def _alternativas(dados):
+    alternativas = dados.get('alternativas')
+    if isinstance(alternativas, list):
+        alternativas = {
+            letra: _PREFIXO_ALTERNATIVA.sub('', str(texto)).strip()
+            for letra, texto in zip(LETRAS, alternativas)
+        }
+    if not isinstance(alternativas, dict):
+        raise QuestaoInvalida("Campo obrigatório ausente: alternativas")
+
+    normalizadas = {}
+    for letra, texto in alternativas.items():
+        letra = str(letra).strip().upper()[:1]
+        if letra in LETRAS and str(texto).strip():
+            normalizadas[letra] = str(texto).strip()
+    if len(normalizadas) < 2:
+        raise QuestaoInvalida("Alternativas insuficientes")
+    return dict(sorted(normalizadas.items()))
+
+def _resposta_letra(dados, alternativas):
+    resposta = ' '.join(str(dados.get('resposta_correta', '')).split()).upper()
+    match = _LETRA_RESPOSTA.match(resposta)
+    letra = match.group(1) if match else None
+    if letra is None and resposta:
+        # A IA às vezes devolve o texto da alternativa em vez da letra
+        for chave, texto in alternativas.items():
+            if resposta == ' '.join(texto.split()).upper():
+                letra = chave
+                break
+    if letra not in alternativas:
+        raise QuestaoInvalida(f"Resposta correta inválida: {dados.get('resposta_correta')!r}")
+    return letra
+
+def _resposta_vf(dados):
+    resposta = str(dados.get('resposta_correta', '')).strip().lower()
+    if resposta in ('verdadeiro', 'v', 'true', 'certo', 'c'):
+        return 'Verdadeiro'
+    if resposta in ('falso', 'f', 'false', 'errado', 'e'):
+        return 'Falso'
+    raise QuestaoInvalida(f"Resposta de verdadeiro/falso inválida: {dados.get('resposta_correta')!r}")
+
+def _lista(dados, chave):
+    valor = dados.get(chave)
+    if not isinstance(valor, list) or not valor:
+        raise QuestaoInvalida(f"Campo obrigatório ausente: {chave}")
+    return [str(item).strip() for item in valor]
+
+def _multipla_escolha(dados):
+    alternativas = _alternativas(dados)
+    return QuestaoMultiplaEscolha(
+        enunciado=_texto(dados, 'enunciado', 'pergunta'),
+        alternativas=alternativas,
+        resposta_correta=_resposta_letra(dados, alternativas),
+        explicacao=_texto(dados, 'explicacao', obrigatorio=False),
+        tema=_texto(dados, 'tema', obrigatorio=False),
+        dificuldade=_texto(dados, 'dificuldade', obrigatorio=False),
+        referencias=_texto(dados, 'referencias', obrigatorio=False)
+    )
+
+def _verdadeiro_falso(dados):
+    return QuestaoVerdadeiroFalso(
+        afirmacao=_texto(dados, 'afirmacao', 'enunciado'),
+        resposta_correta=_resposta_vf(dados),
+        justificativa=_texto(dados, 'justificativa', 'explicacao', obrigatorio=False),
+        tema=_texto(dados, 'tema', obrigatorio=False),
+        dificuldade=_texto(dados, 'dificuldade', obrigatorio=False),
+        referencias=_texto(dados, 'referencias', obrigatorio=False)
+    )
+
+def _associacao(dados):
+    coluna_a = _lista(dados, 'coluna_a')
+    coluna_b = _lista(dados, 'coluna_b')
+    gabarito = dados.get('gabarito')
+    if not isinstance(gabarito, dict) or not gabarito:
+        raise QuestaoInvalida("Campo obrigatório ausente: gabarito")
+    gabarito = {str(k).strip(): str(v).strip() for k, v in gabarito.items()}
+    if not set(gabarito) <= set(coluna_a) or not set(gabarito.values()) <= set(coluna_b):
+        raise QuestaoInvalida("Gabarito não corresponde às colunas")
+    return QuestaoAssociacao(
+        instrucao=_texto(dados, 'instrucao', obrigatorio=False) or "Associe os itens da coluna A com os da coluna B",
+        coluna_a=coluna_a,
+        coluna_b=coluna_b,
+        gabarito=gabarito,
+        explicacao=_texto(dados, 'explicacao', obrigatorio=False),
+        tema=_texto(dados, 'tema', obrigatorio=False),
+        dificuldade=_texto(dados, 'dificuldade', obrigatorio=False)
+    )
+
+def _caso_clinico(dados):
+    alternativas = _alternativas(dados)
+    return QuestaoCasoClinico(
+        caso_clinico=_texto(dados, 'caso_clinico', 'caso'),
+        pergunta=_texto(dados, 'pergunta', 'enunciado'),
+        alternativas=alternativas,
+        resposta_correta=_resposta_letra(dados, alternativas),
+        discussao=_texto(dados, 'discussao', 'explicacao', obrigatorio=False),
+        tema=_texto(dados, 'tema', obrigatorio=False),
+        dificuldade=_texto(dados, 'dificuldade', obrigatorio=False)
+    )
+
+def _calculo(dados):
+    alternativas = _alternativas(dados)
+    return QuestaoCalculo(
+        situacao=_texto(dados, 'situacao', 'enunciado'),
+        pergunta=_texto(dados, 'pergunta', obrigatorio=False),
+        alternativas=alternativas,
+        resposta_correta=_resposta_letra(dados, alternativas),
+        dados=_texto(dados, 'dados', obrigatorio=False),
+        resolucao=_texto(dados, 'resolucao', 'explicacao', obrigatorio=False),
+        tema=_texto(dados, 'tema', obrigatorio=False),
+        dificuldade=_texto(dados, 'dificuldade', obrigatorio=False)
+    )
+
+def _simulado(dados):
+    alternativas = _alternativas(dados)
+    return QuestaoSimulado(
+        pergunta=_texto(dados, 'pergunta', 'enunciado'),
+        alternativas=alternativas,
+        resposta_correta=_resposta_letra(dados, alternativas),
+        explicacao=_texto(dados, 'explicacao', obrigatorio=False)
+    )
+
+CONSTRUTORES = {
+    'multipla_escolha': _multipla_escolha,
+    'verdadeiro_falso': _verdadeiro_falso,
+    'associacao': _associacao,
+    'caso_clinico': _caso_clinico,
+    'calculo': _calculo,
+    'simulado': _simulado
+}
+
+def construir_questao(tipo, dados):
+    """Valida um dict vindo da IA e retorna o registro tipado correspondente"""
+    if isinstance(dados, str):
+        dados = _carregar_json(dados)
+    if not isinstance(dados, dict):
+        raise QuestaoInvalida("Questão não é um objeto JSON")
+    construtor = CONSTRUTORES.get(tipo, _multipla_escolha)
+    return construtor(dados)
+
+def acertou(questao, resposta):
+    """Indica se `resposta` acerta a questão (dict como guardado no banco de questões)"""
+    if isinstance(questao.get('gabarito'), dict):
+        # Associação: o mapa coluna A -> coluna B inteiro
+        if not isinstance(resposta, dict):
+            return False
+        return {str(k).strip(): str(v).strip() for k, v in resposta.items()} == questao['gabarito']
+    if 'afirmacao' in questao:
+        try:
+            return _resposta_vf({'resposta_correta': resposta}) == questao.get('resposta_correta')
+        except QuestaoInvalida:
+            return False
+    gabarito = str(questao.get('resposta_correta', '')).strip().upper()
+    return bool(gabarito) and str(resposta or '').strip().upper() == gabarito
+
+def parse_questoes(texto, tipo):
+    """Interpreta a resposta completa da IA, separando questões válidas e erros"""
+    texto = _CERCA_MARKDOWN.sub('', texto or '')
+    resultado = ResultadoParse()
+
+    objetos = ExtratorIncremental().alimentar(texto)
+    if not objetos:
+        # Resposta sem array de questões: talvez uma única questão solta
+        try:
+            dados = _carregar_json(texto)
+            objetos = [dados.get('questoes', dados)] if isinstance(dados, dict) else dados
+        except QuestaoInvalida as e:
+            resultado.erros.append(str(e))
+            return resultado
+        if isinstance(objetos, list) and len(objetos) == 1 and isinstance(objetos[0], list):
+            objetos = objetos[0]
+
+    for objeto in objetos:
+        try:
+            resultado.questoes.append(construir_questao(tipo, objeto))
+        except QuestaoInvalida as e:
+            resultado.erros.append(str(e))
+    return resultado
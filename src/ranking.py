@@ -0,0 +1,332 @@
+import os
+import random
+import threading
+import time
+from database import obter_pool
+
+RANKING_SINCRONIZACAO = float(os.getenv('RANKING_SINCRONIZACAO', 1))
+RANKING_RETENCAO_ALTERACOES = float(os.getenv('RANKING_RETENCAO_ALTERACOES', 3600))
+
+def normalizar_valor(valor):
+    return ' '.join(str(valor or '').split()).casefold()
+
+def _valores(variavel, padrao):
+    return {normalizar_valor(valor) for valor in os.getenv(variavel, padrao).split(',') if valor.strip()}
+
+# Valores aceitos em cada tipo de segmento (listas separadas por vírgula). Cada
+# segmento vira uma lista em memória em todos os processos, então o conjunto é fechado.
+SEGMENTOS_PERMITIDOS = {
+    'cargo': _valores('RANKING_CARGOS', (
+        'Técnico em Saúde,Técnico em Enfermagem,Auxiliar de Enfermagem,Enfermeiro,Médico,'
+        'Agente Comunitário de Saúde,Agente de Combate às Endemias,Farmacêutico,Nutricionista,'
+        'Fisioterapeuta,Psicólogo,Assistente Social,Odontólogo'
+    )),
+    'bloco': _valores('RANKING_BLOCOS', '1,2,3,4,5,6,7,8'),
+    'regiao': _valores('RANKING_REGIOES', 'Norte,Nordeste,Centro-Oeste,Sudeste,Sul')
+}
+
+class _No:
+    __slots__ = ('chave', 'proximos', 'larguras')
+
+    def __init__(self, chave, altura):
+        self.chave = chave
+        self.proximos = [None] * altura
+        self.larguras = [1] * altura
+
+class ListaIndexada:
+    """Skip list indexável: inserção, remoção, posição de uma chave e acesso por posição em O(log n).
+
+    Cada ligação guarda quantos elementos ela "pula" (largura), o que permite
+    calcular a posição de uma chave somando as larguras percorridas na busca.
+    """
+
+    MAX_NIVEIS = 24
+
+    def __init__(self):
+        self._fim = _No(None, 0)
+        self._cabeca = _No(None, self.MAX_NIVEIS)
+        self._cabeca.proximos = [self._fim] * self.MAX_NIVEIS
+        self._tamanho = 0
+
+    def __len__(self):
+        return self._tamanho
+
+    def _buscar(self, chave):
+        """Retorna, por nível, o último nó antes de `chave` e a posição dele"""
+        anteriores = [None] * self.MAX_NIVEIS
+        posicoes = [0] * self.MAX_NIVEIS
+        no = self._cabeca
+        posicao = 0
+        for nivel in reversed(range(self.MAX_NIVEIS)):
+            proximo = no.proximos[nivel]
+            while proximo is not self._fim and proximo.chave < chave:
+                posicao += no.larguras[nivel]
+                no = proximo
+                proximo = no.proximos[nivel]
+            anteriores[nivel] = no
+            posicoes[nivel] = posicao
+        return anteriores, posicoes
+
+    def inserir(self, chave):
+        anteriores, posicoes = self._buscar(chave)
+        posicao = posicoes[0]
+
+        altura = 1
+        while altura < self.MAX_NIVEIS and random.random() < 0.5:
+            altura += 1
+
+        novo = _No(chave, altura)
+        for nivel in range(altura):
+            anterior = anteriores[nivel]
+            novo.proximos[nivel] = anterior.proximos[nivel]
+            anterior.proximos[nivel] = novo
+            novo.larguras[nivel] = anterior.larguras[nivel] - (posicao - posicoes[nivel])
+            anterior.larguras[nivel] = posicao - posicoes[nivel] + 1
+        for nivel in range(altura, self.MAX_NIVEIS):
+            anteriores[nivel].larguras[nivel] += 1
+        self._tamanho += 1
+
+    def remover(self, chave):
+        """Remove a chave; retorna False se ela não estava na lista"""
+        anteriores, _ = self._buscar(chave)
+        alvo = anteriores[0].proximos[0]
+        if alvo is self._fim or alvo.chave != chave:
+            return False
+
+        for nivel in range(self.MAX_NIVEIS):
+            anterior = anteriores[nivel]
+            if anterior.proximos[nivel] is alvo:
+                anterior.larguras[nivel] += alvo.larguras[nivel] - 1
+                anterior.proximos[nivel] = alvo.proximos[nivel]
+            else:
+                anterior.larguras[nivel] -= 1
+        self._tamanho -= 1
+        return True
+
+    def posicao(self, chave):
+        """Índice (0 = primeiro) da chave, ou None se ela não estiver na lista"""
+        anteriores, posicoes = self._buscar(chave)
+        alvo = anteriores[0].proximos[0]
+        if alvo is self._fim or alvo.chave != chave:
+            return None
+        return posicoes[0]
+
+    def fatia(self, inicio, quantidade):
+        """Retorna até `quantidade` chaves a partir do índice `inicio`"""
+        if inicio < 0 or inicio >= self._tamanho or quantidade <= 0:
+            return []
+
+        # Descer pelas larguras até o elemento de índice `inicio`
+        alvo = inicio + 1
+        no = self._cabeca
+        posicao = 0
+        for nivel in reversed(range(self.MAX_NIVEIS)):
+            while no.proximos[nivel] is not self._fim and posicao + no.larguras[nivel] <= alvo:
+                posicao += no.larguras[nivel]
+                no = no.proximos[nivel]
+
+        chaves = []
+        while no is not self._fim and len(chaves) < quantidade:
+            chaves.append(no.chave)
+            no = no.proximos[0]
+        return chaves
+
+def segmento_ranking(tipo=None, valor=None):
+    """Chave do segmento: 'geral' ou 'tipo:valor' (ex.: 'cargo:enfermeiro').
+
+    Levanta ValueError se o tipo ou o valor não estiverem em SEGMENTOS_PERMITIDOS.
+    """
+    if not tipo or tipo == 'geral':
+        return 'geral'
+    valor = normalizar_valor(valor)
+    if valor not in SEGMENTOS_PERMITIDOS.get(tipo, ()):
+        raise ValueError(f"Segmento não permitido: {tipo}={valor!r}")
+    return f"{tipo}:{valor}"
+
+class Ranking:
+    """Rankings de XP por segmento (geral, cargo, bloco, região).
+
+    A tabela `ranking` guarda o XP de cada usuário em cada segmento e é a
+    fonte da verdade; cada processo mantém em memória uma ListaIndexada por
+    segmento, ordenada por (-xp, user_id), atualizada incrementalmente. As
+    escritas também vão para `ranking_alteracoes`, que os demais processos
+    leem a cada `intervalo` segundos para aplicar as atualizações uns dos
+    outros sem reordenar nada.
+    """
+
+    def __init__(self, db_path="planos.db", intervalo=None, retencao=None):
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.intervalo = intervalo if intervalo is not None else RANKING_SINCRONIZACAO
+        self.retencao = retencao if retencao is not None else RANKING_RETENCAO_ALTERACOES
+        self._lock = threading.RLock()
+        self._segmentos = {}
+        self._ultimo_id = 0
+        self._ultima_sincronizacao = 0.0
+        self._ultima_limpeza = time.monotonic()
+        self.atualizacoes = 0
+        self.init_database()
+        self.recarregar()
+
+    def init_database(self):
+        """Cria as tabelas do ranking"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ranking (
+                    segmento TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    xp INTEGER NOT NULL,
+                    nome TEXT,
+                    PRIMARY KEY (segmento, user_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ranking_alteracoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    segmento TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    xp INTEGER NOT NULL,
+                    nome TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_ranking_alteracoes_created_at
+                ON ranking_alteracoes (created_at)
+            """)
+
+    def recarregar(self):
+        """Reconstrói os rankings em memória a partir do banco"""
+        with self.pool.conexao() as conn:
+            # Mesma transação de leitura: o instantâneo e o último id batem
+            conn.execute("BEGIN")
+            ultimo_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ranking_alteracoes").fetchone()[0]
+            rows = conn.execute("SELECT segmento, user_id, xp, nome FROM ranking").fetchall()
+
+        segmentos = {}
+        for segmento, user_id, xp, nome in rows:
+            lista, usuarios = segmentos.setdefault(segmento, (ListaIndexada(), {}))
+            lista.inserir((-xp, user_id))
+            usuarios[user_id] = (xp, nome)
+
+        with self._lock:
+            self._segmentos = segmentos
+            self._ultimo_id = ultimo_id
+            self._ultima_sincronizacao = time.monotonic()
+
+    def _aplicar(self, segmento, user_id, xp, nome):
+        lista, usuarios = self._segmentos.setdefault(segmento, (ListaIndexada(), {}))
+        atual = usuarios.get(user_id)
+        if atual is not None:
+            if xp <= atual[0]:
+                # XP só cresce: gravações fora de ordem não rebaixam o usuário
+                usuarios[user_id] = (atual[0], nome or atual[1])
+                return
+            lista.remover((-atual[0], user_id))
+        lista.inserir((-xp, user_id))
+        usuarios[user_id] = (xp, nome or (atual[1] if atual else None))
+
+    def _sincronizar(self):
+        """Aplica as alterações gravadas por outros processos desde a última leitura"""
+        agora = time.monotonic()
+        if agora - self._ultima_sincronizacao < self.intervalo:
+            return
+
+        with self._lock:
+            if agora - self._ultima_sincronizacao < self.intervalo:
+                return
+            self._ultima_sincronizacao = agora
+
+            with self.pool.conexao() as conn:
+                primeiro = conn.execute("SELECT MIN(id) FROM ranking_alteracoes").fetchone()[0]
+                rows = conn.execute("""
+                    SELECT id, segmento, user_id, xp, nome FROM ranking_alteracoes
+                    WHERE id > ? ORDER BY id
+                """, (self._ultimo_id,)).fetchall()
+
+            if primeiro is not None and primeiro > self._ultimo_id + 1:
+                # Ficamos para trás além da retenção do log: recarregar tudo
+                self.recarregar()
+                return
+
+            for alteracao_id, segmento, user_id, xp, nome in rows:
+                self._aplicar(segmento, user_id, xp, nome)
+                self._ultimo_id = alteracao_id
+
+        if agora - self._ultima_limpeza >= 60:
+            self._ultima_limpeza = agora
+            with self.pool.conexao() as conn:
+                conn.execute("DELETE FROM ranking_alteracoes WHERE created_at < ?", (time.time() - self.retencao,))
+
+    def registrar(self, user_id, xp, segmentos, nome=None):
+        """Atualiza o XP do usuário em cada segmento informado"""
+        user_id = str(user_id)
+        agora = time.time()
+        with self.pool.conexao() as conn:
+            for segmento in segmentos:
+                conn.execute("""
+                    INSERT INTO ranking (segmento, user_id, xp, nome) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (segmento, user_id) DO UPDATE SET
+                        xp = MAX(ranking.xp, excluded.xp),
+                        nome = COALESCE(excluded.nome, ranking.nome)
+                """, (segmento, user_id, xp, nome))
+                conn.execute("""
+                    INSERT INTO ranking_alteracoes (segmento, user_id, xp, nome, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (segmento, user_id, xp, nome, agora))
+
+        with self._lock:
+            for segmento in segmentos:
+                self._aplicar(segmento, user_id, xp, nome)
+            self.atualizacoes += 1
+
+    def segmentos_do_usuario(self, user_id):
+        """Segmentos em que o usuário já aparece"""
+        self._sincronizar()
+        user_id = str(user_id)
+        with self._lock:
+            return [segmento for segmento, (_, usuarios) in self._segmentos.items() if user_id in usuarios]
+
+    def _entrada(self, usuarios, chave, indice):
+        xp, nome = usuarios[chave[1]]
+        return {"posicao": indice + 1, "user_id": chave[1], "nome": nome, "xp": xp}
+
+    def top(self, segmento, limite=10, offset=0):
+        """Página do ranking a partir da posição `offset` (0 = primeiro)"""
+        self._sincronizar()
+        with self._lock:
+            if segmento not in self._segmentos:
+                return [], 0
+            lista, usuarios = self._segmentos[segmento]
+            chaves = lista.fatia(offset, limite)
+            return [self._entrada(usuarios, chave, offset + i) for i, chave in enumerate(chaves)], len(lista)
+
+    def posicao(self, segmento, user_id):
+        """Posição e XP do usuário no segmento, ou None se ele não estiver no ranking"""
+        self._sincronizar()
+        user_id = str(user_id)
+        with self._lock:
+            if segmento not in self._segmentos:
+                return None
+            lista, usuarios = self._segmentos[segmento]
+            if user_id not in usuarios:
+                return None
+            chave = (-usuarios[user_id][0], user_id)
+            return self._entrada(usuarios, chave, lista.posicao(chave))
+
+    def ao_redor(self, segmento, user_id, raio=2):
+        """Os `raio` usuários acima e abaixo do usuário, incluindo ele"""
+        entrada = self.posicao(segmento, user_id)
+        if entrada is None:
+            return []
+        inicio = max(0, entrada['posicao'] - 1 - raio)
+        fim = entrada['posicao'] + raio
+        return self.top(segmento, fim - inicio, inicio)[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segmentos": len(self._segmentos),
+                "atualizacoes": self.atualizacoes,
+                "ultimo_id": self._ultimo_id
+            }
@@ -0,0 +1,197 @@
+import json
+import os
+import time
+
+from database import obter_pool
+
+# Folga (segundos) além do tempo limite para aceitar a entrega (latência da rede)
+SIMULADO_TOLERANCIA = float(os.getenv('SIMULADO_TOLERANCIA', 30))
+
+EM_ANDAMENTO = 'em_andamento'
+FINALIZADO = 'finalizado'
+EXPIRADO = 'expirado'
+
+# Campos que revelam o gabarito e só são enviados após a entrega
+CAMPOS_GABARITO = ('resposta_correta', 'explicacao')
+
+class SimuladoNaoEncontrado(Exception):
+    """Simulado inexistente ou de outro usuário"""
+
+class SimuladoEncerrado(Exception):
+    """O simulado já foi entregue ou passou do tempo limite"""
+
+class SimuladoService:
+    """Sessões de simulado persistidas, com tempo e correção no servidor.
+
+    Cada sessão guarda só os ids das questões do banco de questões (JSON
+    com a lista de ids) e as respostas entregues, então o gabarito nunca
+    é copiado nem enviado ao cliente antes da entrega. O id é o rowid
+    AUTOINCREMENT, único mesmo com vários processos. O relógio começa
+    quando a sessão é criada; entregas depois de `tempo_limite` mais
+    `tolerancia` são recusadas.
+    """
+
+    def __init__(self, banco_questoes, db_path="planos.db", tolerancia=None):
+        self.banco_questoes = banco_questoes
+        self.db_path = db_path
+        self.pool = obter_pool(db_path)
+        self.tolerancia = tolerancia if tolerancia is not None else SIMULADO_TOLERANCIA
+        self.init_database()
+
+    def init_database(self):
+        """Cria a tabela de sessões de simulado"""
+        with self.pool.conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS simulados (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    configuracao TEXT NOT NULL,
+                    questoes TEXT NOT NULL,
+                    respostas TEXT,
+                    status TEXT NOT NULL,
+                    iniciado_em REAL NOT NULL,
+                    prazo REAL NOT NULL,
+                    finalizado_em REAL,
+                    acertos INTEGER,
+                    total INTEGER
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_simulados_usuario
+                ON simulados (user_id, id)
+            """)
+
+    def _ids_do_banco(self, configuracao, questoes_simulado):
+        """Ids das questões na ordem do simulado, guardando no banco as que ainda não estão lá"""
+        ids = []
+        for bloco in questoes_simulado:
+            questoes = bloco.get('questoes', [])
+            sem_id = [q for q in questoes if 'banco_id' not in q]
+            if sem_id:
+                novos = iter(self.banco_questoes.adicionar_questoes(
+                    'simulado', configuracao['cargo'], configuracao['dificuldade'], sem_id, bloco['area']
+                ))
+                for questao in questoes:
+                    if 'banco_id' not in questao:
+                        questao['banco_id'] = next(novos)
+            ids.extend(q['banco_id'] for q in questoes)
+        return ids
+
+    def criar(self, configuracao, questoes_simulado, user_id=None):
+        """Persiste a sessão e inicia o relógio. Retorna o registro e as questões sem o gabarito."""
+        ids = self._ids_do_banco(configuracao, questoes_simulado)
+        iniciado_em = time.time()
+        prazo = iniciado_em + float(configuracao['tempo_limite']) * 60
+
+        with self.pool.conexao() as conn:
+            cursor = conn.execute("""
+                INSERT INTO simulados (user_id, configuracao, questoes, status, iniciado_em, prazo)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (user_id, json.dumps(configuracao, ensure_ascii=False), json.dumps(ids), EM_ANDAMENTO, iniciado_em, prazo))
+            simulado_id = cursor.lastrowid
+
+        questoes_cliente = []
+        for bloco in questoes_simulado:
+            if 'questoes' in bloco:
+                bloco = dict(bloco, questoes=[
+                    {chave: valor for chave, valor in q.items() if chave not in CAMPOS_GABARITO}
+                    for q in bloco['questoes']
+                ])
+            questoes_cliente.append(bloco)
+
+        return {"simulado_id": simulado_id, "iniciado_em": iniciado_em, "prazo": prazo}, questoes_cliente
+
+    def _ler(self, conn, simulado_id):
+        row = conn.execute("""
+            SELECT user_id, configuracao, questoes, respostas, status, iniciado_em, prazo, finalizado_em, acertos, total
+            FROM simulados WHERE id = ?
+        """, (simulado_id,)).fetchone()
+        if not row:
+            return None
+        return {
+            "simulado_id": simulado_id,
+            "user_id": row[0],
+            "configuracao": json.loads(row[1]),
+            "questoes": json.loads(row[2]),
+            "respostas": json.loads(row[3]) if row[3] else None,
+            "status": row[4],
+            "iniciado_em": row[5],
+            "prazo": row[6],
+            "finalizado_em": row[7],
+            "acertos": row[8],
+            "total": row[9]
+        }
+
+    @staticmethod
+    def _do_usuario(simulado, user_id):
+        """A sessão só existe para o próprio dono; sessões sem dono não são acessíveis"""
+        if simulado is None or not user_id or simulado['user_id'] != user_id:
+            raise SimuladoNaoEncontrado("Simulado não encontrado")
+
+    def obter(self, simulado_id, user_id=None):
+        """Estado da sessão (sem o gabarito), com o tempo restante"""
+        with self.pool.conexao() as conn:
+            simulado = self._ler(conn, simulado_id)
+        self._do_usuario(simulado, user_id)
+
+        agora = time.time()
+        if simulado['status'] == EM_ANDAMENTO and agora > simulado['prazo'] + self.tolerancia:
+            simulado['status'] = EXPIRADO
+        simulado['tempo_restante'] = max(0.0, simulado['prazo'] - agora) if simulado['status'] == EM_ANDAMENTO else 0.0
+        del simulado['respostas']
+        return simulado
+
+    def finalizar(self, simulado_id, respostas, user_id=None):
+        """Corrige as respostas entregues e encerra a sessão, uma única vez.
+
+        `respostas` é {banco_id: letra} ou uma lista de {"questao_id"/"banco_id", "resposta"}.
+        Retorna as respostas corrigidas (no formato de /jogos/resultado), o tempo gasto
+        e a configuração gravada na sessão. Só o dono (`user_id` do token) pode entregar.
+        """
+        if respostas is None:
+            respostas = {}
+        if isinstance(respostas, list):
+            respostas = {
+                str(r.get('banco_id', r.get('questao_id'))): r.get('resposta')
+                for r in respostas if isinstance(r, dict)
+            }
+        if not isinstance(respostas, dict):
+            raise ValueError("respostas deve ser um objeto {questao_id: resposta} ou uma lista")
+        entregues = {str(chave): str(valor or '').strip().upper() for chave, valor in respostas.items()}
+        agora = time.time()
+
+        with self.pool.conexao() as conn:
+            # Trava de escrita já na leitura: duas entregas simultâneas não corrigem duas vezes
+            conn.execute("BEGIN IMMEDIATE")
+            simulado = self._ler(conn, simulado_id)
+            self._do_usuario(simulado, user_id)
+            if simulado['status'] != EM_ANDAMENTO:
+                raise SimuladoEncerrado("Simulado já entregue")
+            if agora > simulado['prazo'] + self.tolerancia:
+                conn.execute("UPDATE simulados SET status = ? WHERE id = ?", (EXPIRADO, simulado_id))
+                conn.commit()
+                raise SimuladoEncerrado("Tempo limite do simulado excedido")
+
+            questoes = self.banco_questoes.obter_questoes(simulado['questoes'], conn)
+            corrigidas = []
+            for banco_id in simulado['questoes']:
+                area, questao = questoes.get(banco_id, ('', {}))
+                resposta = entregues.get(str(banco_id), '')
+                gabarito = str(questao.get('resposta_correta', '')).strip().upper()
+                corrigidas.append({
+                    "questao_id": banco_id,
+                    "area": area or 'Geral',
+                    "resposta": resposta or None,
+                    "resposta_correta": gabarito,
+                    "correta": bool(resposta) and resposta == gabarito,
+                    "explicacao": questao.get('explicacao', '')
+                })
+
+            acertos = sum(1 for r in corrigidas if r['correta'])
+            conn.execute("""
+                UPDATE simulados
+                SET respostas = ?, status = ?, finalizado_em = ?, acertos = ?, total = ?
+                WHERE id = ?
+            """, (json.dumps([r['resposta'] for r in corrigidas]), FINALIZADO, agora, acertos, len(corrigidas), simulado_id))
+
+        return corrigidas, int(agora - simulado['iniciado_em']), simulado['configuracao']
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+class _Voo:
+    """Chamada em andamento compartilhada pelas requisições com a mesma chave"""
+    __slots__ = ('evento', 'resultado', 'erro', 'aguardando')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.aguardando = 0
+
+class SingleFlight:
+    """Coalescência de chamadas idênticas e simultâneas (single-flight).
+
+    A primeira requisição de uma chave executa a função; as que chegarem
+    enquanto ela está em andamento esperam e recebem o mesmo resultado (ou
+    a mesma exceção), gerando uma única chamada ao serviço externo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._voos = {}
+        self._voos_async = {}
+        self.execucoes = 0
+        self.compartilhadas = 0
+
+    def executar(self, chave, funcao, *args, **kwargs):
+        """Executa `funcao` uma única vez por chave entre as chamadas simultâneas"""
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = _Voo()
+                self._voos[chave] = voo
+                self.execucoes += 1
+            else:
+                voo.aguardando += 1
+                self.compartilhadas += 1
+
+        if not lider:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado
+
+        try:
+            voo.resultado = funcao(*args, **kwargs)
+            return voo.resultado
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._voos[chave]
+            voo.evento.set()
+
+    async def executar_async(self, chave, funcao, *args, **kwargs):
+        """Como `executar`, para corrotinas: `await funcao(*args, **kwargs)` uma única vez por chave.
+
+        A chamada compartilhada roda em uma task própria e todos (inclusive o
+        primeiro) a aguardam com shield: o cancelamento de quem espera (ex.:
+        o prazo de um asyncio.wait_for) não cancela a chamada dos demais.
+        """
+        tarefa = self._voos_async.get(chave)
+        if tarefa is not None:
+            with self._lock:
+                self.compartilhadas += 1
+        else:
+            tarefa = asyncio.get_running_loop().create_task(funcao(*args, **kwargs))
+            self._voos_async[chave] = tarefa
+            with self._lock:
+                self.execucoes += 1
+
+            def concluir(tarefa):
+                if self._voos_async.get(chave) is tarefa:
+                    del self._voos_async[chave]
+                # Evita o aviso de exceção não lida quando ninguém mais aguardava
+                if not tarefa.cancelled():
+                    tarefa.exception()
+
+            tarefa.add_done_callback(concluir)
+        return await asyncio.shield(tarefa)
+
+    def stats(self):
+        """Retorna as chamadas em andamento (com quantas requisições aguardam cada uma) e os totais"""
+        with self._lock:
+            return {
+                "em_andamento": {chave[:16]: voo.aguardando for chave, voo in self._voos.items()},
+                "em_andamento_async": len(self._voos_async),
+                "execucoes": self.execucoes,
+                "compartilhadas": self.compartilhadas
+            }
@@ -0,0 +1,38 @@
+from flask import Response
+import json
+from llm_client import chat_completion
+
+# Utilitários para respostas em streaming (Server-Sent Events)
+
+def quer_streaming(req, data=None):
+    """Indica se o cliente pediu streaming (?stream=1, corpo {"stream": true} ou Accept: text/event-stream)"""
+    if (data or {}).get('stream') is True:
+        return True
+    if req.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return 'text/event-stream' in req.headers.get('Accept', '')
+
+def evento_sse(evento, dados):
+    """Formata um evento SSE com payload JSON"""
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+def resposta_sse(gerador):
+    """Cria a resposta Flask que envia os eventos à medida que são gerados"""
+    return Response(
+        gerador,
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Impede que proxies (nginx/Render) acumulem a resposta
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def stream_chat_completion(**kwargs):
+    """Chama a IA em modo streaming e produz os trechos de texto conforme chegam"""
+    for chunk in chat_completion(stream=True, **kwargs):
+        if not chunk.choices:
+            continue
+        conteudo = chunk.choices[0].delta.content
+        if conteudo:
+            yield conteudo
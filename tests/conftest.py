@@ -0,0 +1,106 @@
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import pytest
+
+# Os módulos de src/ usam imports planos e criam planos.db no diretório atual
+# ao serem importados: os testes rodam em um diretório temporário.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+os.environ.setdefault('BANCO_QUESTOES_REPOSICAO', 'false')
+
+def pytest_sessionstart(session):
+    # Antes da coleta, que importa os módulos de teste
+    os.chdir(tempfile.mkdtemp(prefix='gabarita-testes-'))
+
+@pytest.fixture
+def tokens(monkeypatch):
+    """Aceita qualquer token "Bearer <uid>" como um ID token válido daquele uid"""
+    import autenticacao
+
+    def verificar(token):
+        return {'uid': token, 'sub': token, 'exp': time.time() + 3600, 'auth_time': int(time.time()) - 60}
+
+    monkeypatch.setattr(autenticacao, 'verificar_token', verificar)
+    return lambda uid: {'Authorization': f'Bearer {uid}'}
+
+@pytest.fixture
+def cliente_jogos():
+    """Cliente de teste do Flask só com o blueprint de jogos"""
+    from flask import Flask
+    import jogos
+    app = Flask(__name__)
+    app.register_blueprint(jogos.jogos_bp, url_prefix='/api')
+    return app.test_client()
+
+class IAFalsa:
+    """Servidor falso da OpenAI: `responder(prompt)` devolve o texto da resposta
+    (ou um httpx.Response; no cliente assíncrono, também uma corrotina), e as
+    chamadas simultâneas são contadas."""
+
+    def __init__(self):
+        self.responder = lambda prompt: '[]'
+        self.chamadas = 0
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self._lock = threading.Lock()
+
+    def _entrar(self):
+        with self._lock:
+            self.chamadas += 1
+            self.simultaneas += 1
+            self.max_simultaneas = max(self.max_simultaneas, self.simultaneas)
+
+    def _sair(self):
+        with self._lock:
+            self.simultaneas -= 1
+
+    @staticmethod
+    def _resposta(resultado):
+        import httpx
+        if isinstance(resultado, httpx.Response):
+            return resultado
+        return httpx.Response(200, json={
+            "id": "falsa", "object": "chat.completion", "created": 0, "model": "falso",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": resultado}}]
+        })
+
+    def tratar(self, pedido):
+        prompt = json.loads(pedido.content)['messages'][-1]['content']
+        self._entrar()
+        try:
+            return self._resposta(self.responder(prompt))
+        finally:
+            self._sair()
+
+    async def tratar_async(self, pedido):
+        prompt = json.loads(pedido.content)['messages'][-1]['content']
+        self._entrar()
+        try:
+            resultado = self.responder(prompt)
+            if inspect.isawaitable(resultado):
+                resultado = await resultado
+            return self._resposta(resultado)
+        finally:
+            self._sair()
+
+@pytest.fixture
+def ia_falsa(monkeypatch):
+    """Troca os clientes (síncrono e assíncrono) da OpenAI do llm_client por um httpx.MockTransport local"""
+    import httpx
+    import openai
+    import llm_client
+
+    ia = IAFalsa()
+    cliente = openai.OpenAI(api_key='teste', http_client=httpx.Client(transport=httpx.MockTransport(ia.tratar)), max_retries=0)
+    monkeypatch.setitem(llm_client._clientes, False, cliente)
+    cliente_async = openai.AsyncOpenAI(
+        api_key='teste', http_client=httpx.AsyncClient(transport=httpx.MockTransport(ia.tratar_async)), max_retries=0
+    )
+    monkeypatch.setitem(llm_client._clientes, True, cliente_async)
+    monkeypatch.setattr(llm_client, 'limitador', llm_client.LimitadorTaxa(10000, 10000))
+    monkeypatch.setattr(llm_client, 'circuito', llm_client.CircuitBreaker(1000, 1))
+    return ia
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import threading
+import uuid
+
+PEDIDOS = 200
+ATRASO_IA = 0.5
+
+async def chamar(app, caminho, corpo):
+    """Faz uma requisição POST direto na aplicação ASGI e retorna (status, corpo JSON)"""
+    entregue = False
+
+    async def receive():
+        nonlocal entregue
+        if entregue:
+            await asyncio.sleep(3600)
+        entregue = True
+        return {'type': 'http.request', 'body': json.dumps(corpo).encode(), 'more_body': False}
+
+    mensagens = []
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    await app({
+        'type': 'http', 'method': 'POST', 'path': caminho, 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')]
+    }, receive, send)
+    return mensagens[0]['status'], json.loads(mensagens[1]['body'])
+
+def test_geracoes_simultaneas_nao_ficam_limitadas_pelas_threads(ia_falsa):
+    from asgi import create_asgi_app
+    app = create_asgi_app()
+
+    async def responder(prompt):
+        await asyncio.sleep(ATRASO_IA)
+        return json.dumps({"questoes": [
+            {"enunciado": f"Questão {uuid.uuid4()}", "alternativas": {"A": "1", "B": "2"}, "resposta_correta": "A"}
+        ]})
+    ia_falsa.responder = responder
+
+    async def carga():
+        # Temas distintos: nenhuma chamada é coalescida nem servida pelo banco
+        return await asyncio.gather(*(
+            chamar(app, '/api/jogos/questoes/gerar', {"tema": f"tema-{i}-{uuid.uuid4()}", "quantidade": 1, "usar_cache": False})
+            for i in range(PEDIDOS)
+        ))
+
+    respostas = asyncio.run(carga())
+
+    assert all(status == 200 for status, _ in respostas)
+    assert all(corpo['origem'] == 'ia' for _, corpo in respostas)
+    assert ia_falsa.chamadas == PEDIDOS
+    # Todas as chamadas à IA ficaram em andamento ao mesmo tempo, muito acima do número de threads
+    assert ia_falsa.max_simultaneas == PEDIDOS
+    assert threading.active_count() < PEDIDOS / 4
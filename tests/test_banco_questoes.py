@@ -0,0 +1,27 @@
+import uuid
+from banco_questoes import BancoQuestoes
+
+def test_reposicao_ignora_baldes_fora_da_lista(tmp_path):
+    from jogos import balde_reponivel
+    banco = BancoQuestoes(str(tmp_path / 'banco.db'), permitido=balde_reponivel)
+
+    assert banco.sortear_questoes('multipla_escolha', f"tema-{uuid.uuid4()}", 'medio', 5) is None
+    assert banco.sortear_questoes('multipla_escolha', 'Saúde Pública', 'impossivel', 5) is None
+    assert banco.sortear_questoes('simulado', 'Enfermeiro', 'medio', 5, area=f"area-{uuid.uuid4()}") is None
+    assert banco.sortear_questoes('multipla_escolha', 'saúde pública', 'medio', 5) is None
+    assert banco.sortear_questoes('simulado', 'Enfermeiro', 'facil', 5, area='SUS') is None
+
+    # Baldes gravados ao vivo com temas livres também não são repostos
+    banco.adicionar_questoes('multipla_escolha', f"livre-{uuid.uuid4()}", 'medio', [{"enunciado": "x"}])
+
+    pedidos = []
+    banco.repor(lambda tipo, tema, dificuldade, area, quantidade: pedidos.append((tipo, tema, area)) or [])
+    assert sorted(set(pedidos)) == [('multipla_escolha', 'saúde pública', ''), ('simulado', 'Enfermeiro', 'SUS')]
+
+def test_fila_de_reposicao_tem_limite(tmp_path):
+    banco = BancoQuestoes(str(tmp_path / 'banco.db'), max_pendentes=2)
+    assert banco.solicitar_reposicao('multipla_escolha', 'SUS', 'medio')
+    assert banco.solicitar_reposicao('multipla_escolha', 'SUS', 'facil')
+    assert banco.solicitar_reposicao('multipla_escolha', 'SUS', 'medio')
+    assert not banco.solicitar_reposicao('multipla_escolha', 'SUS', 'dificil')
+    assert len(banco.baldes_abaixo_do_minimo()) == 2
@@ -0,0 +1,102 @@
+import datetime
+import json
+import time
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from chaves_firebase import RepositorioChaves, TokenInvalido
+
+PROJETO = 'gabarita-teste'
+
+def gerar_chave():
+    """Par de chaves RSA e certificado autoassinado, como os publicados pelo Google"""
+    chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nome = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'securetoken.teste')])
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    certificado = (
+        x509.CertificateBuilder()
+        .subject_name(nome).issuer_name(nome)
+        .public_key(chave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora - datetime.timedelta(days=1))
+        .not_valid_after(agora + datetime.timedelta(days=1))
+        .sign(chave, hashes.SHA256())
+    )
+    return chave, certificado.public_bytes(serialization.Encoding.PEM).decode('utf-8')
+
+@pytest.fixture(scope='module')
+def chaves():
+    return {kid: gerar_chave() for kid in ('kid-1', 'kid-2')}
+
+@pytest.fixture
+def repositorio(tmp_path, chaves, monkeypatch):
+    """Repositório que só conhece o arquivo local; qualquer acesso à rede falha o teste"""
+    # O mesmo que FIREBASE_CERTS_RENOVAR=false no ambiente
+    monkeypatch.setattr('chaves_firebase.FIREBASE_CERTS_RENOVAR', False)
+    arquivo = tmp_path / 'firebase_certs.json'
+    arquivo.write_text(json.dumps({
+        "expira_em": time.time() + 3600,
+        "certificados": {'kid-1': chaves['kid-1'][1]}
+    }))
+
+    def sem_rede(*args, **kwargs):
+        raise AssertionError("A verificação não deveria ir à rede")
+    monkeypatch.setattr('chaves_firebase.requests.get', sem_rede)
+    repositorio = RepositorioChaves(arquivo=str(arquivo))
+    repositorio.iniciar()
+    assert repositorio._thread is None
+    return repositorio
+
+def emitir(chaves, kid='kid-1', **claims):
+    agora = int(time.time())
+    dados = {
+        "iss": f"https://securetoken.google.com/{PROJETO}", "aud": PROJETO,
+        "sub": "usuario-1", "iat": agora, "exp": agora + 3600, "auth_time": agora
+    }
+    dados.update(claims)
+    return jwt.encode(dados, chaves[kid][0], algorithm='RS256', headers={"kid": kid})
+
+def test_token_valido_e_verificado_offline(repositorio, chaves):
+    claims = repositorio.verificar(emitir(chaves), PROJETO)
+    assert claims['uid'] == 'usuario-1'
+    assert repositorio.stats()['chaves'] == 1
+
+@pytest.mark.parametrize('claims', [
+    {"aud": "outro-projeto"},
+    {"iss": "https://securetoken.google.com/outro-projeto"},
+    {"exp": int(time.time()) - 3600},
+    {"sub": ""},
+    {"auth_time": int(time.time()) + 3600},
+])
+def test_claims_invalidas_sao_recusadas(repositorio, chaves, claims):
+    with pytest.raises(TokenInvalido):
+        repositorio.verificar(emitir(chaves, **claims), PROJETO)
+
+def test_chave_desconhecida_e_recusada_sem_ir_a_rede(repositorio, chaves):
+    with pytest.raises(TokenInvalido, match="chave desconhecida"):
+        repositorio.verificar(emitir(chaves, kid='kid-2'), PROJETO)
+
+def test_assinatura_adulterada_e_outros_algoritmos_sao_recusados(repositorio, chaves):
+    cabecalho, corpo, assinatura = emitir(chaves).split('.')
+    _, outro_corpo, _ = emitir(chaves, sub='intruso').split('.')
+    with pytest.raises(TokenInvalido):
+        repositorio.verificar(f"{cabecalho}.{outro_corpo}.{assinatura}", PROJETO)
+
+    hs256 = jwt.encode({"sub": "usuario-1"}, 'segredo-com-tamanho-suficiente-para-hs256', algorithm='HS256', headers={"kid": 'kid-1'})
+    with pytest.raises(TokenInvalido, match="Algoritmo"):
+        repositorio.verificar(hs256, PROJETO)
+
+def test_verificar_token_usa_as_chaves_locais(repositorio, chaves, monkeypatch):
+    import autenticacao
+    monkeypatch.setenv('FIREBASE_PROJECT_ID', PROJETO)
+    monkeypatch.setattr(autenticacao, 'FIREBASE_VERIFICACAO_LOCAL', True)
+    monkeypatch.setattr(autenticacao, 'repositorio_chaves', repositorio)
+    monkeypatch.setattr(autenticacao, 'cache_tokens', autenticacao.CacheTokens())
+
+    token = emitir(chaves, sub='usuario-local')
+    assert autenticacao.verificar_token(token)['uid'] == 'usuario-local'
+    with pytest.raises(ValueError):
+        autenticacao.verificar_token(emitir(chaves, aud='outro-projeto'))
@@ -0,0 +1,44 @@
+import threading
+import pytest
+from flask import Flask, request
+
+@pytest.fixture
+def cliente_fila(tmp_path, monkeypatch):
+    """Cliente de teste com uma rota que enfileira jobs que só terminam no fim do teste"""
+    import jobs
+    from autenticacao import requer_autenticacao
+    from fila_jobs import FilaJobs
+
+    liberar = threading.Event()
+    fila = FilaJobs(str(tmp_path / 'jobs.db'), limite_por_usuario=2)
+    fila.registrar('teste.espera', lambda parametros: liberar.wait(5) and {}, prioridade=5)
+    monkeypatch.setattr(jobs, 'fila_jobs', fila)
+
+    app = Flask(__name__)
+
+    @app.route('/enfileirar', methods=['POST'])
+    @requer_autenticacao(opcional=True)
+    def enfileirar():
+        return jobs.resposta_job('teste.espera', request.json)
+
+    yield app.test_client(), fila
+    liberar.set()
+
+def test_limite_usa_o_uid_do_token_e_nao_o_do_corpo(tokens, cliente_fila):
+    cliente, fila = cliente_fila
+    for outro in ('a', 'b'):
+        assert cliente.post('/enfileirar', json={"user_id": outro}, headers=tokens('u1')).status_code == 202
+    assert cliente.post('/enfileirar', json={"user_id": 'c'}, headers=tokens('u1')).status_code == 429
+
+def test_anonimos_dividem_o_limite_do_ip(cliente_fila):
+    cliente, fila = cliente_fila
+    assert cliente.post('/enfileirar', json={}).status_code == 202
+    assert cliente.post('/enfileirar', json={}).status_code == 202
+    assert cliente.post('/enfileirar', json={}).status_code == 429
+    outro_ip = cliente.post('/enfileirar', json={}, environ_base={'REMOTE_ADDR': '10.0.0.9'})
+    assert outro_ip.status_code == 202
+    assert fila.obter(outro_ip.get_json()['job_id'])['user_id'] == 'anonimo:10.0.0.9'
+
+def test_prioridade_invalida_responde_400(cliente_fila):
+    cliente, _ = cliente_fila
+    assert cliente.post('/enfileirar', json={"prioridade": "alta"}).status_code == 400
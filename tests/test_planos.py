@@ -0,0 +1,14 @@
+import uuid
+from plano_service import PlanoService
+
+def test_force_new_grava_nova_linha_sem_alterar_o_plano_anterior(tmp_path):
+    service = PlanoService(str(tmp_path / 'planos.db'))
+    fingerprint = f"fp-{uuid.uuid4()}"
+    dados = {"cargo": "Enfermeiro", "nivel": "medio", "tempo_disponivel": "2h", "areas_foco": []}
+    
+    antigo = service.salvar_plano_gerado({**dados, "titulo": "Antigo", "conteudo": "v1"}, fingerprint)
+    novo = service.salvar_plano_gerado({**dados, "titulo": "Novo", "conteudo": "v2"}, fingerprint)
+    
+    assert novo != antigo
+    assert service.get_plano_by_id(antigo)['titulo'] == 'Antigo'
+    assert service.get_plano_por_fingerprint(fingerprint)['id'] == novo
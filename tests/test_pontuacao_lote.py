@@ -0,0 +1,66 @@
+import uuid
+import pytest
+from pontuacao_lote import pontuar_lote
+
+LEVELS = {1: {"xp_required": 0}, 2: {"xp_required": 100}, 3: {"xp_required": 250}}
+
+def acertos(submissao, gabarito):
+    resultados, _ = pontuar_lote([submissao], LEVELS, gabarito)
+    return resultados[0]["estatisticas"]["acertos"]
+
+def test_gabarito_com_chaves_de_texto_corrige_ids_inteiros():
+    submissao = {"respostas": [{"questao_id": 5, "resposta": "A", "correta": True}]}
+    assert acertos(submissao, {"5": "B"}) == 0
+    assert acertos(submissao, {"5": "A"}) == 1
+
+def test_resposta_sem_diferenciar_maiusculas_e_espacos():
+    submissao = {"respostas": [{"questao_id": "7", "resposta": " a "}]}
+    assert acertos(submissao, {"7": {"resposta_correta": "A", "area": "SUS"}}) == 1
+
+def test_questao_fora_do_gabarito_conta_como_erro():
+    submissao = {"respostas": [{"questao_id": 9, "resposta": "A", "correta": True}, {"correta": True}]}
+    assert acertos(submissao, {"5": "A"}) == 0
+
+def test_sem_gabarito_usa_o_correta_enviado():
+    submissao = {"respostas": [{"correta": True}, {"correta": False}]}
+    assert acertos(submissao, None) == 1
+
+@pytest.fixture
+def simulado_corrigido(tokens, cliente_jogos):
+    """Um simulado entregue em /jogos/resultado e o gabarito das questões dele"""
+    import jogos
+    questoes = [
+        {"enunciado": f"Questão {i}", "alternativas": {"A": "1", "B": "2", "C": "3"}, "resposta_correta": "ABC"[i % 3]}
+        for i in range(6)
+    ]
+    configuracao = {"cargo": "Enfermeiro", "dificuldade": "medio", "tempo_limite": 60, "areas": ["SUS", "Ética"], "num_questoes": 6}
+    blocos = [{"area": "SUS", "questoes": questoes[:4]}, {"area": "Ética", "questoes": questoes[4:]}]
+    uid = f"paridade-{uuid.uuid4()}"
+    sessao, questoes_cliente = jogos.simulado_service.criar(configuracao, blocos, uid)
+
+    ids = [q["banco_id"] for bloco in questoes_cliente for q in bloco["questoes"]]
+    respostas = {str(banco_id): resposta for banco_id, resposta in zip(ids, ["A", "b", "A", "A", " B", "C"])}
+    resposta = cliente_jogos.post('/api/jogos/resultado', json={
+        "simulado_id": sessao["simulado_id"], "respostas": respostas
+    }, headers=tokens(uid))
+    assert resposta.status_code == 200
+
+    areas = {q["banco_id"]: bloco["area"] for bloco in questoes_cliente for q in bloco["questoes"]}
+    gabarito = {
+        str(q["banco_id"]): {"resposta_correta": q["resposta_correta"], "area": areas[q["banco_id"]]}
+        for q in questoes
+    }
+    return resposta.get_json(), respostas, gabarito
+
+def test_paridade_com_o_endpoint_de_um_resultado(simulado_corrigido):
+    import jogos
+    individual, respostas, gabarito = simulado_corrigido
+    submissao = {
+        "respostas": [{"questao_id": int(banco_id), "resposta": resposta} for banco_id, resposta in respostas.items()],
+        "tempo_gasto": individual["estatisticas"]["tempo_gasto"]
+    }
+    [lote], _ = pontuar_lote([submissao], jogos.gamification.levels, gabarito)
+
+    assert lote["estatisticas"] == individual["estatisticas"]
+    assert lote["recompensas"] == individual["recompensas"]
+    assert lote["areas_desempenho"] == individual["areas_desempenho"]
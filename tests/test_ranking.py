@@ -0,0 +1,26 @@
+import uuid
+import pytest
+from ranking import segmento_ranking
+
+def test_segmentos_fora_da_lista_sao_recusados():
+    assert segmento_ranking('regiao', '  NORDESTE ') == 'regiao:nordeste'
+    with pytest.raises(ValueError):
+        segmento_ranking('regiao', f'inventada-{uuid.uuid4()}')
+    with pytest.raises(ValueError):
+        segmento_ranking('bairro', 'centro')
+
+def test_resultado_nao_cria_segmentos_com_valores_do_cliente(tokens, cliente_jogos):
+    import jogos
+    uid = f"u-{uuid.uuid4()}"
+    ids = jogos.banco_questoes.adicionar_questoes('multipla_escolha', 'SUS', 'medio', [
+        {"enunciado": f"Questão {uuid.uuid4()}", "alternativas": {"A": "1", "B": "2"}, "resposta_correta": "A"}
+    ])
+    resposta = cliente_jogos.post('/api/jogos/resultado', json={
+        "respostas": [{"questao_id": ids[0], "resposta": "A"}],
+        "cargo": f"cargo-{uuid.uuid4()}", "regiao": "Sul"
+    }, headers=tokens(uid))
+    assert resposta.status_code == 200
+    assert sorted(jogos.ranking.segmentos_do_usuario(uid)) == ['geral', 'regiao:sul']
+
+def test_ranking_com_segmento_invalido_responde_400(cliente_jogos):
+    assert cliente_jogos.get('/api/jogos/ranking?segmento=cargo&valor=xyz').status_code == 400
@@ -0,0 +1,47 @@
+import uuid
+
+def guardar_questoes(quantidade=3, tipo='multipla_escolha'):
+    import jogos
+    questoes = [
+        {"enunciado": f"Questão {uuid.uuid4()}", "alternativas": {"A": "1", "B": "2"}, "resposta_correta": "B"}
+        for _ in range(quantidade)
+    ]
+    return jogos.banco_questoes.adicionar_questoes(tipo, 'SUS', 'medio', questoes)
+
+def enviar(cliente, headers, respostas, **extra):
+    return cliente.post('/api/jogos/resultado', json=dict(respostas=respostas, **extra), headers=headers)
+
+def test_correcao_pelo_banco_ignora_o_correta_do_cliente(tokens, cliente_jogos):
+    ids = guardar_questoes()
+    resposta = enviar(cliente_jogos, tokens(f"u-{uuid.uuid4()}"), [
+        {"questao_id": ids[0], "resposta": "b"},
+        {"questao_id": str(ids[1]), "resposta": "A", "correta": True},
+        {"questao_id": 10 ** 9, "resposta": "B", "correta": True},
+        {"correta": True}
+    ])
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    assert dados["estatisticas"]["acertos"] == 1
+    assert dados["estatisticas"]["total_questoes"] == 4
+    assert [r["correta"] for r in dados["correcao"]] == [True, False, False, False]
+    # Sem área no balde, as questões avulsas entram no tema
+    assert dados["areas_desempenho"]["SUS"]["total"] == 2
+
+def test_tempo_gasto_negativo_nao_aumenta_o_bonus(tokens, cliente_jogos):
+    ids = guardar_questoes(1)
+    respostas = [{"questao_id": ids[0], "resposta": "B"}]
+    zero = enviar(cliente_jogos, tokens(f"u-{uuid.uuid4()}"), respostas, tempo_gasto=0).get_json()
+    negativo = enviar(cliente_jogos, tokens(f"u-{uuid.uuid4()}"), respostas, tempo_gasto=-10 ** 9).get_json()
+    assert negativo["recompensas"]["xp_gained"] == zero["recompensas"]["xp_gained"]
+    assert negativo["estatisticas"]["tempo_gasto"] == 0
+
+def test_tempo_gasto_invalido_responde_400(tokens, cliente_jogos):
+    resposta = enviar(cliente_jogos, tokens("u-invalido"), [], tempo_gasto="rapido")
+    assert resposta.status_code == 400
+
+def test_tipo_simulado_sem_sessao_nao_conta_como_simulado(tokens, cliente_jogos):
+    uid = f"u-{uuid.uuid4()}"
+    ids = guardar_questoes(1)
+    dados = enviar(cliente_jogos, tokens(uid), [{"questao_id": ids[0], "resposta": "B"}], tipo='simulado').get_json()
+    assert dados["conquistas_desbloqueadas"] == []
+    assert dados["jogador"]["contadores"]["atividades"] == {"questoes": 1}
@@ -0,0 +1,39 @@
+import uuid
+import pytest
+
+def criar_sessao(dono):
+    import jogos
+    questoes = [{"enunciado": f"Questão {uuid.uuid4()}", "alternativas": {"A": "1", "B": "2"}, "resposta_correta": "A"}]
+    configuracao = {"cargo": "Enfermeiro", "dificuldade": "medio", "tempo_limite": 60, "areas": ["SUS"], "num_questoes": 1}
+    sessao, questoes_cliente = jogos.simulado_service.criar(configuracao, [{"area": "SUS", "questoes": questoes}], dono)
+    return sessao["simulado_id"], questoes_cliente[0]["questoes"][0]["banco_id"]
+
+@pytest.mark.parametrize('dono', [f"dono-{uuid.uuid4()}", None])
+def test_so_o_dono_entrega_e_consulta_a_sessao(tokens, cliente_jogos, dono):
+    simulado_id, banco_id = criar_sessao(dono)
+    outro = tokens(f"outro-{uuid.uuid4()}")
+
+    assert cliente_jogos.get(f'/api/jogos/simulado/{simulado_id}', headers=outro).status_code == 404
+    resposta = cliente_jogos.post('/api/jogos/resultado', json={
+        "simulado_id": simulado_id, "respostas": {str(banco_id): "A"}
+    }, headers=outro)
+    assert resposta.status_code == 404
+
+def test_dono_entrega_uma_unica_vez(tokens, cliente_jogos):
+    dono = f"dono-{uuid.uuid4()}"
+    simulado_id, banco_id = criar_sessao(dono)
+    corpo = {"simulado_id": simulado_id, "respostas": [{"questao_id": banco_id, "resposta": "a"}]}
+
+    resposta = cliente_jogos.post('/api/jogos/resultado', json=corpo, headers=tokens(dono))
+    assert resposta.status_code == 200
+    assert resposta.get_json()["estatisticas"]["acertos"] == 1
+    assert cliente_jogos.post('/api/jogos/resultado', json=corpo, headers=tokens(dono)).status_code == 409
+
+@pytest.mark.parametrize('respostas', ["A", 42, True])
+def test_respostas_em_formato_invalido_respondem_400(tokens, cliente_jogos, respostas):
+    dono = f"dono-{uuid.uuid4()}"
+    simulado_id, _ = criar_sessao(dono)
+    resposta = cliente_jogos.post('/api/jogos/resultado', json={
+        "simulado_id": simulado_id, "respostas": respostas
+    }, headers=tokens(dono))
+    assert resposta.status_code == 400
@@ -0,0 +1,52 @@
+import json
+import time
+import uuid
+import httpx
+
+AREAS = ['SUS', 'Epidemiologia', 'Ética', 'Matemática']
+
+def questoes(n):
+    return json.dumps([
+        {"pergunta": f"Pergunta {i}?", "alternativas": ["a", "b", "c", "d", "e"], "resposta_correta": "A", "explicacao": "x"}
+        for i in range(n)
+    ])
+
+def configuracao():
+    return {"cargo": f"cargo-{uuid.uuid4()}", "dificuldade": "medio", "areas": AREAS, "num_questoes": 8}
+
+def test_areas_sao_geradas_em_paralelo_e_na_ordem(ia_falsa):
+    import jogos
+
+    def responder(prompt):
+        time.sleep(0.3)
+        return questoes(2)
+    ia_falsa.responder = responder
+
+    inicio = time.monotonic()
+    resultado = jogos.gerar_questoes_simulado(configuracao(), max_workers=len(AREAS), usar_cache=False)
+    duracao = time.monotonic() - inicio
+
+    # Uma "rodada" de chamadas à IA, não uma por área
+    assert duracao < 0.3 * 2
+    assert ia_falsa.max_simultaneas == len(AREAS)
+    assert [item['area'] for item in resultado] == AREAS
+    assert all(len(item['questoes']) == 2 for item in resultado)
+
+def test_falha_ou_demora_de_uma_area_nao_derruba_o_simulado(ia_falsa):
+    import jogos
+
+    def responder(prompt):
+        if 'Matemática' in prompt:
+            return httpx.Response(400, json={"error": {"message": "pedido recusado", "type": "invalid_request_error"}})
+        if 'Ética' in prompt:
+            time.sleep(1)
+        return questoes(2)
+    ia_falsa.responder = responder
+
+    resultado = jogos.gerar_questoes_simulado(configuracao(), max_workers=len(AREAS), timeout=0.3, usar_cache=False)
+    por_area = {item['area']: item for item in resultado}
+
+    assert len(por_area['SUS']['questoes']) == 2
+    assert len(por_area['Epidemiologia']['questoes']) == 2
+    assert por_area['Ética']['erro'] == 'Tempo limite excedido'
+    assert 'pedido recusado' in por_area['Matemática']['erro']